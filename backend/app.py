@@ -1,19 +1,116 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Request, request, jsonify, g
 from flask_cors import CORS
+import logging
 import os
-import shutil
-from test_image_detection import recognize_items, generate_zero_waste_recipe
+import tempfile
+import threading
+import time
+from food_recognition import detect_items, recognize_items, generate_zero_waste_recipe, pantry_zero_waste_recipe
 from models import User, Food
 from datetime import datetime, timedelta
 import uuid 
 from expiration_helper import get_food_expiration, fallback_expiration
-from receipt_parser import parse_receipt
+from receipt_parser import ocr_receipt, parse_receipt_text
+from pipeline import map_stage, run_stage, StageTimeout
+from jobs import JobQueue, QueueFull
+from expiry_engine import expiry_summary, DEFAULT_WINDOWS
+from food_helper import (build_food, bulk_save_foods, delete_food, food_to_json, list_foods, merge_detected_items,
+                         DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+from pantry_summary import get_summary, record_added
+from bson import ObjectId
+from bson.errors import InvalidId
+from metrics_helper import METRICS, METRICS_ENABLED, inc, server_timing, span, start_trace
+from user_helper import get_user
+
+# LOG_LEVEL=DEBUG brings back the per-item FoodKeeper/vision lines
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "WARNING").upper(),
+                    format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+# /metrics answers loopback clients only, unless METRICS_REMOTE=1
+METRICS_REMOTE = os.getenv("METRICS_REMOTE", "0") == "1"
 
 # CRUD TO DB!!
 
+# Uploads stay in memory up to this size, then roll over to an anonymous temp
+# file that is removed when the request closes. Nothing is written under the
+# client's filename.
+UPLOAD_SPOOL_BYTES = int(os.getenv("UPLOAD_SPOOL_BYTES", str(8 * 1024 * 1024)))
+
+
+class SpooledUploadRequest(Request):
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_BYTES)
+
+
+# no_cache=1 (form field) skips the recognition cache for this request
+def wants_fresh_result():
+    return request.form.get("no_cache", "").lower() in ("1", "true", "yes")
+
+
+# background=1 (form field) queues the upload as a job and returns 202 + job_id
+def wants_background():
+    return request.form.get("background", "").lower() in ("1", "true", "yes")
+
+
+# Started on first use (an upload with background=1 or a /jobs poll), not on
+# import; starting takes over jobs left by a process that died (jobs.py).
+# `python app.py` starts it before serving.
+job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    global job_queue
+    with _job_queue_lock:
+        if job_queue is None:
+            job_queue = JobQueue().start()
+        return job_queue
+
+
+def enqueue_upload(kind, user, file):
+    try:
+        job_id = get_job_queue().submit(kind, str(user.id), file.stream.read(),
+                                        {"use_cache": not wants_fresh_result()})
+    except QueueFull as e:
+        return jsonify({"error": f"Server busy, try again shortly ({e})"}), 503, {"Retry-After": "5"}
+    return jsonify({"job_id": job_id, "status": "queued",
+                    "status_url": f"/jobs/{job_id}?user_id={user.id}"}), 202
+
+
 app = Flask(__name__)
+app.request_class = SpooledUploadRequest
 CORS(app, origins=["http://localhost:3000"])
 
+
+# Every request gets a trace; its spans come back in a Server-Timing header and
+# its total time lands in the "http.request" histogram per route and status
+@app.before_request
+def begin_trace():
+    if METRICS_ENABLED:
+        g.trace = start_trace()
+        g.started = time.perf_counter()
+
+
+@app.after_request
+def end_trace(response):
+    if METRICS_ENABLED and "started" in g:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        METRICS.observe("http.request", time.perf_counter() - g.started, route=route, status=response.status_code)
+        if g.trace:
+            response.headers["Server-Timing"] = server_timing(g.trace)
+    return response
+
+
+# Counters and latency histograms: Prometheus text, or JSON with ?format=json
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    if not METRICS_REMOTE and request.remote_addr not in ("127.0.0.1", "::1"):
+        return jsonify({"error": "Not found"}), 404
+    if request.args.get("format") == "json":
+        return jsonify(METRICS.snapshot())
+    return METRICS.render_prometheus(), 200, {"Content-Type": "text/plain; version=0.0.4"}
+
+
 # need image, user, then adds food based on image
 @app.route("/detect-food", methods=["POST"])
 def detect_food():
@@ -28,7 +125,8 @@ def detect_food():
     except ValueError:
         return jsonify({"error": "Invalid user_id format"}), 400
 
-    user = User.objects(id=user_uuid).first()
+    with span("db.find_user"):
+        user = get_user(user_uuid)
     if not user:
         return jsonify({"error": "User not found"}), 404
 
@@ -37,50 +135,94 @@ def detect_food():
         return jsonify({"result": "No file uploaded"}), 400
 
     file = request.files["file"]
-    os.makedirs("images", exist_ok=True)
-    file_path = os.path.join("images", file.filename)
-    file.save(file_path)
+    if wants_background():
+        return enqueue_upload("detect-food", user, file)
 
     # --- RUN IMAGE DETECTION ---
-    items = recognize_items(file_path)
+    items = run_stage("vision", recognize_items, file.stream, use_cache=not wants_fresh_result())
     if not items.items:
         return jsonify({"result": "Food could not be detected."})
 
-    saved_items = []  # IMPORTANT
+    # --- EXPIRATION DATES + ONE BULK SAVE ---
+    with span("foods.build"):
+        foods = [build_food(user, f.name, f.quantity) for f in items.items]
+    saved, failed = run_stage("save", bulk_save_foods, foods)
 
-    for f in items.items:
-        name = f.name or "Unknown"
-        quantity = (f.quantity or "medium").lower()
-        if quantity not in ("small", "medium", "large"):
-            quantity = "medium"
-
-        # --- EXPIRATION DATE ---
-        exp_info = get_food_expiration(name)
-        expiration_date = exp_info.get("expiration_date")
+    return jsonify({
+        "result": "success",
+        "items_saved": [food_to_json(food) for food in saved],
+        "items_failed": failed
+    })
 
-        # fallback if nothing returned
-        if not expiration_date:
-            expiration_date = fallback_expiration(name)
+# Several photos of one fridge/pantry in one request: up to DETECT_BATCH_MAX_IMAGES
+# files, at most DETECT_BATCH_CONCURRENCY vision calls in flight at once
+DETECT_BATCH_MAX_IMAGES = int(os.getenv("DETECT_BATCH_MAX_IMAGES", "10"))
+DETECT_BATCH_CONCURRENCY = int(os.getenv("DETECT_BATCH_CONCURRENCY", "4"))
+
+# need user and one or more "file" images. Items seen in several photos are
+# saved once (merged by normalized name), with one expiration lookup per
+# distinct item and one bulk write. A photo whose vision call fails is
+# reported in images_failed; the others are still saved. No background mode.
+@app.route("/detect-foods", methods=["POST"])
+def detect_foods():
+    user_id = request.form.get("user_id")
+    if not user_id:
+        return jsonify({"error": "user_id is required"}), 400
 
-        # --- SAVE TO DATABASE ---
-        food = Food(
-            user=user,
-            name=name,
-            quantity=quantity,
-            expiration_date=expiration_date
-        )
-        food.save()
+    try:
+        user_uuid = uuid.UUID(user_id)
+    except ValueError:
+        return jsonify({"error": "Invalid user_id format"}), 400
 
-        saved_items.append({
-            "name": name,
-            "quantity": quantity,
-            "expiration_date": expiration_date.isoformat(),
-            "food_id": str(food.id)
-        })
+    with span("db.find_user"):
+        user = get_user(user_uuid)
+    if not user:
+        return jsonify({"error": "User not found"}), 404
 
+    files = request.files.getlist("file")
+    if not files:
+        return jsonify({"result": "No file uploaded"}), 400
+    if len(files) > DETECT_BATCH_MAX_IMAGES:
+        return jsonify({"error": f"At most {DETECT_BATCH_MAX_IMAGES} images per request"}), 400
+
+    with span("upload.read"):
+        payloads = [file.stream.read() for file in files]
+
+    # --- VISION CALLS, BOUNDED FAN-OUT ---
+    use_cache = not wants_fresh_result()
+    results = map_stage("vision", detect_items, payloads, DETECT_BATCH_CONCURRENCY, use_cache=use_cache)
+    per_image, images_failed = [], []
+    for index, (file, result) in enumerate(zip(files, results)):
+        if isinstance(result, Exception):
+            images_failed.append({"index": index, "filename": file.filename,
+                                  "error": str(result) or type(result).__name__})
+            per_image.append([])
+        else:
+            per_image.append([(f.name, f.quantity) for f in result.items])
+    if len(images_failed) == len(files):
+        timeouts = [result for result in results if isinstance(result, StageTimeout)]
+        if timeouts:
+            raise timeouts[0]
+        return jsonify({"error": "Food detection failed for every image", "images_failed": images_failed}), 502
+
+    # --- MERGE, EXPIRATION DATES ONCE PER ITEM, ONE BULK SAVE ---
+    with span("foods.merge"):
+        merged = merge_detected_items(per_image)
+    inc("vision.batch_duplicates", sum(len(items) for items in per_image) - len(merged))
+    if not merged:
+        return jsonify({"result": "Food could not be detected.", "images_failed": images_failed})
+
+    with span("foods.build"):
+        foods = [build_food(user, item["name"], item["quantity"]) for item in merged]
+    saved, failed = run_stage("save", bulk_save_foods, foods)
+
+    seen_in = {id(food): item["images"] for food, item in zip(foods, merged)}
     return jsonify({
         "result": "success",
-        "items_saved": saved_items
+        "images": len(files),
+        "items_saved": [{**food_to_json(food), "images": seen_in[id(food)]} for food in saved],
+        "items_failed": failed,
+        "images_failed": images_failed
     })
 
 # parse receipt similar to function above
@@ -93,7 +235,8 @@ def parse_receipt_route():
 
     try:
         user_uuid = uuid.UUID(user_id)
-        user = User.objects(id=user_uuid).first()
+        with span("db.find_user"):
+            user = get_user(user_uuid)
         if not user:
             return jsonify({"error": "User not found"}), 404
     except ValueError:
@@ -104,58 +247,91 @@ def parse_receipt_route():
         return jsonify({"error": "No file uploaded"}), 400
 
     file = request.files["file"]
-    os.makedirs("receipts", exist_ok=True)
-    file_path = os.path.join("receipts", file.filename)
-    file.save(file_path)
-
-    # 3️⃣ parse receipt using utility
-    parsed_data = parse_receipt(file_path)
+    if wants_background():
+        return enqueue_upload("parse-receipt", user, file)
+
+    # 3️⃣ OCR in the process pool, then parse + USDA validation
+    with span("upload.read"):
+        payload = file.stream.read()
+    text = run_stage("ocr", ocr_receipt, payload, cpu=True)
+    parsed_data = run_stage("usda", parse_receipt_text, text)
     raw_items = parsed_data.get("items", [])
 
-    saved_items = []
-    for item in raw_items:
-        name = item.get("name", "Unknown")
-        quantity = item.get("quantity", "medium").lower()
-        if quantity not in ("small", "medium", "large"):
-            quantity = "medium"
-
-        expiration_date = get_food_expiration(name).get("expiration_date") or fallback_expiration(name)
-
-        food_obj = Food(
-            user=user,
-            name=name,
-            quantity=quantity,
-            expiration_date=expiration_date
-        )
-        food_obj.save()
-
-        saved_items.append({
-            "name": name,
-            "quantity": quantity,
-            "expiration_date": expiration_date.isoformat(),
-            "food_id": str(food_obj.id)
-        })
+    with span("foods.build"):
+        foods = [build_food(user, item.get("name", "Unknown"), item.get("quantity", "medium")) for item in raw_items]
+    saved, failed = run_stage("save", bulk_save_foods, foods)
 
     return jsonify({
         "store": parsed_data.get("store"),
         "date": parsed_data.get("date"),
-        "items_saved": saved_items
+        "items_saved": [food_to_json(food) for food in saved],
+        "items_failed": failed
     })
-# create a (zero waste) recipe 
+
+
+# Days ahead that count as "expiring" for pantry recipes
+PANTRY_RECIPE_DAYS = int(os.getenv("PANTRY_RECIPE_DAYS", "2"))
+
+# create a (zero waste) recipe from an uploaded image, or, given user_id and
+# no file, from that user's stored food expiring within `days`
 @app.route("/zero-waste-recipe", methods=["POST"])
 def zero_waste_recipe():
     if "file" not in request.files:
-        return jsonify({"result": "No file uploaded"}), 400
+        user_id = request.values.get("user_id")
+        if not user_id:
+            return jsonify({"result": "No file uploaded"}), 400
+        return pantry_recipe(user_id)
 
     file = request.files["file"]
-    os.makedirs("images", exist_ok=True)
-    file_path = os.path.join("images", file.filename)
-    file.save(file_path)
 
-    result = generate_zero_waste_recipe(file_path)
+    result = run_stage("vision", generate_zero_waste_recipe, file.stream, use_cache=not wants_fresh_result())
     return jsonify({"result": result})
 
 
+def pantry_recipe(user_id):
+    try:
+        user_uuid = uuid.UUID(user_id)
+    except ValueError:
+        return jsonify({"error": "Invalid user_id format"}), 400
+
+    user = get_user(user_uuid)
+    if not user:
+        return jsonify({"error": "User not found"}), 404
+
+    try:
+        days = int(request.values.get("days", PANTRY_RECIPE_DAYS))
+        if days < 0:
+            raise ValueError
+    except ValueError:
+        return jsonify({"error": "days must be a non-negative integer"}), 400
+
+    rows, _ = run_stage("db", list_foods, user.id, MAX_PAGE_SIZE, expiring_within=days)
+    result = run_stage("recipes", pantry_zero_waste_recipe, rows, use_cache=not wants_fresh_result())
+    return jsonify({"result": result, "expiring_items": rows})
+
+
+# a stage that ran past its timeout fails the request, not the worker
+@app.errorhandler(StageTimeout)
+def stage_timeout(e):
+    return jsonify({"error": str(e), "stage": e.stage}), 504
+
+
+# status, progress and (when done) the saved items of a background job:
+# GET /jobs/<job_id>?user_id=<uuid>, answered only for the user who uploaded it
+@app.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    try:
+        user_uuid = uuid.UUID(request.args.get("user_id", ""))
+    except ValueError:
+        return jsonify({"error": "Invalid user_id format"}), 400
+
+    job = get_job_queue().get(job_id)
+    # someone else's job is reported as missing, so ids can't be probed
+    if not job or job["user_id"] != str(user_uuid):
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job)
+
+
 # adding a user
 @app.route("/add-user", methods=['POST'])
 def add_user():
@@ -197,7 +373,7 @@ def add_food():
         return jsonify({"result": f"Invalid _id format: {e}"}), 400
 
     # Find user by UUID
-    user = User.objects(id=user_uuid).first()
+    user = get_user(user_uuid)
     if not user:
         return jsonify({"result": f"User {user_id} not found"}), 404
 
@@ -210,6 +386,7 @@ def add_food():
         expiration_date=get_food_expiration(name).get("expiration_date") or fallback_expiration(name)
     )
     food.save()
+    record_added([food])
 
     return jsonify({
         "result": f"Food {name} added for user {user.username}",
@@ -217,6 +394,45 @@ def add_food():
         "expiration_date": expiration_date.strftime("%Y-%m-%d")
     })
 
+# add many foods in one request
+@app.route("/add-foods", methods=['POST'])
+def add_foods():
+    data = request.json or {}
+
+    user_id = data.get("_id")  # UUID string from client
+    items = data.get("foods")
+
+    if not user_id or not isinstance(items, list) or not items:
+        return jsonify({"result": "_id and a non-empty foods list are required"}), 400
+
+    try:
+        user_uuid = uuid.UUID(user_id)
+    except ValueError as e:
+        return jsonify({"result": f"Invalid _id format: {e}"}), 400
+
+    user = get_user(user_uuid)
+    if not user:
+        return jsonify({"result": f"User {user_id} not found"}), 404
+
+    # Same rules as /add-food; bad items are reported per index, not fatal
+    foods = []
+    for item in items:
+        name = item.get("name") if isinstance(item, dict) else None
+        quantity = item.get("quantity") if isinstance(item, dict) else None
+        foods.append(Food(
+            user=user,
+            name=name,
+            quantity=quantity,
+            expiration_date=(get_food_expiration(name).get("expiration_date") or fallback_expiration(name)) if name else None
+        ))
+    saved, failed = bulk_save_foods(foods)
+
+    return jsonify({
+        "result": f"Added {len(saved)} of {len(items)} foods for user {user.username}",
+        "items_saved": [food_to_json(food) for food in saved],
+        "items_failed": failed
+    }), 200 if saved else 400
+
 # Get all food for a given user
 @app.route("/get-food/<user_id>", methods=["GET"])
 def get_food_by_user(user_id):
@@ -227,24 +443,97 @@ def get_food_by_user(user_id):
         return jsonify({"error": "Invalid user_id format"}), 400
 
     # Lookup user
-    user = User.objects(id=user_uuid).first()
+    user = get_user(user_uuid)
     if not user:
         return jsonify({"error": "User not found"}), 404
 
-    # Get all food items for this user
-    food_items = Food.objects(user=user)
+    # Query params: limit, cursor, before/after (ISO dates), expiring_within (days).
+    # Pagination is opt-in: without limit or cursor every matching item is returned.
+    args = request.args
+    try:
+        limit = None
+        if "limit" in args or "cursor" in args:
+            limit = min(int(args.get("limit", DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+        before = datetime.fromisoformat(args["before"]) if "before" in args else None
+        after = datetime.fromisoformat(args["after"]) if "after" in args else None
+        expiring_within = int(args["expiring_within"]) if "expiring_within" in args else None
+        if (limit is not None and limit < 1) or (expiring_within is not None and expiring_within < 0):
+            raise ValueError("limit and expiring_within must be positive")
+        food_items, next_cursor = list_foods(
+            user.id, limit=limit, cursor=args.get("cursor"),
+            before=before, after=after, expiring_within=expiring_within
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({"user": user.username, "food_items": food_items, "next_cursor": next_cursor})
+
+# within=1,2,7 -> custom day windows for the expiry summaries
+def summary_windows():
+    if "within" not in request.args:
+        return DEFAULT_WINDOWS
+    windows = [int(n) for n in request.args["within"].split(",")]
+    if not windows or min(windows) < 0:
+        raise ValueError
+    return windows
+
+# Expiry buckets and per-category counts over a user's whole pantry
+@app.route("/expiry-summary/<user_id>", methods=["GET"])
+def get_expiry_summary(user_id):
+    try:
+        user_uuid = uuid.UUID(user_id)
+    except ValueError:
+        return jsonify({"error": "Invalid user_id format"}), 400
+
+    user = get_user(user_uuid)
+    if not user:
+        return jsonify({"error": "User not found"}), 404
+
+    try:
+        windows = summary_windows()
+    except ValueError:
+        return jsonify({"error": "within must be a comma-separated list of non-negative integers"}), 400
+
+    return jsonify({"user": user.username, "summary": expiry_summary(user.id, windows)})
+
+# Same summary as /expiry-summary, read from the incrementally kept PantrySummary
+@app.route("/pantry-summary/<user_id>", methods=["GET"])
+def get_pantry_summary(user_id):
+    try:
+        user_uuid = uuid.UUID(user_id)
+    except ValueError:
+        return jsonify({"error": "Invalid user_id format"}), 400
 
-    # Build response
-    result = []
-    for food in food_items:
-        result.append({
-            "food_id": str(food.id),
-            "name": food.name,
-            "quantity": food.quantity,
-            "expiration_date": food.expiration_date.isoformat() if food.expiration_date else None
-        })
+    user = get_user(user_uuid)
+    if not user:
+        return jsonify({"error": "User not found"}), 404
+
+    try:
+        windows = summary_windows()
+    except ValueError:
+        return jsonify({"error": "within must be a comma-separated list of non-negative integers"}), 400
+
+    return jsonify({"user": user.username, "summary": get_summary(user.id, windows)})
+
+# Remove one food item: DELETE /food/<food_id>?user_id=<uuid>
+@app.route("/food/<food_id>", methods=["DELETE"])
+def remove_food(food_id):
+    try:
+        user_uuid = uuid.UUID(request.args.get("user_id", ""))
+    except ValueError:
+        return jsonify({"error": "Invalid user_id format"}), 400
+    try:
+        food_oid = ObjectId(food_id)
+    except InvalidId:
+        return jsonify({"error": "Invalid food_id format"}), 400
 
-    return jsonify({"user": user.username, "food_items": result})
+    if delete_food(user_uuid, food_oid) is None:
+        return jsonify({"error": "Food not found"}), 404
+    return jsonify({"result": "Food removed", "food_id": food_id})
 
 if __name__ == "__main__":
+    from werkzeug.serving import is_running_from_reloader
+    # debug mode serves from a reloader child; the watching parent runs no jobs
+    if is_running_from_reloader():
+        get_job_queue()
     app.run(debug=True, port=8000)
@@ -0,0 +1,93 @@
+# Several photos of one fridge: N sequential /detect-food requests vs one
+# /detect-foods request carrying all N. The fake vision model sees an
+# overlapping random subset of the same fridge in every photo, spelled the way
+# a model varies it ("Eggs", "egg"), at a fixed latency. Served over HTTP by a
+# pooled server; no_cache=1 so every photo costs a vision call.
+# Reports wall time, rows written, how many of them duplicate an item already
+# saved, and FoodKeeper expiration lookups.
+# Run from backend/: python benchmarks/bench_batch_detect.py
+import io
+import logging
+import os
+import random
+import sys
+import time
+import uuid
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+sys.path.insert(0, BENCH_DIR)
+
+from fakes import FakeOpenAI, PooledServer, use_mongomock
+
+VISION_LATENCY = 1.0     # seconds per photo
+PHOTO_COUNTS = (1, 2, 4, 8)
+WORKERS = 8
+FRIDGE = [("Milk", "milk"), ("Eggs", "egg"), ("Bananas", "banana"), ("Spinach", "spinach"),
+          ("Cheddar cheese", "cheddar cheese"), ("Greek yogurt", "greek yogurts"), ("Butter", "butter"),
+          ("Carrots", "carrot"), ("Apples", "apple"), ("Chicken breast", "chicken breasts"),
+          ("Orange juice", "orange juice"), ("Tomatoes", "tomato"), ("Lettuce", "lettuce"), ("Ham", "ham")]
+
+
+def photo_of_fridge():
+    """What one photo shows: 6 of the fridge's items, each in one of its spellings"""
+    return [(random.choice(spellings), str(random.randint(1, 6))) for spellings in random.sample(FRIDGE, 6)]
+
+
+def photo_bytes(i):
+    from PIL import Image
+    buf = io.BytesIO()
+    Image.new("RGB", (1024, 768), (20 * i % 256, 160, 60)).save(buf, "JPEG")
+    return buf.getvalue()
+
+
+if __name__ == "__main__":
+    random.seed(11)
+    use_mongomock()
+    import requests
+    import app as backend
+    import food_helper
+    import food_recognition
+    from food_helper import item_key
+    from models import Food
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    food_recognition.client = FakeOpenAI(lambda: VISION_LATENCY, items=photo_of_fridge)
+    lookups = {"n": 0}
+    for module in (food_helper, food_recognition):
+        def counted(name, _original=module.get_food_expiration):
+            lookups["n"] += 1
+            return _original(name)
+        module.get_food_expiration = counted
+    photos = [photo_bytes(i) for i in range(max(PHOTO_COUNTS))]
+
+    def run(send, n, username):
+        session = requests.Session()
+        user_id = session.post(f"{server.url}/add-user", json={"username": username, "name": username,
+                                                                "password": "x"}).json()["id"]
+        lookups["n"] = 0
+        start = time.perf_counter()
+        send(session, user_id, n)
+        elapsed = time.perf_counter() - start
+        names = [row["name"] for row in Food._get_collection().find({"user": uuid.UUID(user_id)}, {"name": 1})]
+        return elapsed, len(names), len(names) - len({item_key(name) for name in names}), lookups["n"]
+
+    def sequential(session, user_id, n):
+        for i in range(n):
+            response = session.post(f"{server.url}/detect-food", data={"user_id": user_id, "no_cache": "1"},
+                                    files={"file": (f"shot{i}.jpg", photos[i], "image/jpeg")})
+            assert response.status_code == 200, response.text
+
+    def batch(session, user_id, n):
+        response = session.post(f"{server.url}/detect-foods", data={"user_id": user_id, "no_cache": "1"},
+                                files=[("file", (f"shot{i}.jpg", photos[i], "image/jpeg")) for i in range(n)])
+        assert response.status_code == 200, response.text
+        assert not response.json()["images_failed"]
+
+    print(f"vision {VISION_LATENCY}s per photo, /detect-foods fan-out {backend.DETECT_BATCH_CONCURRENCY}")
+    print(f"{'photos':>6} {'mode':>11} {'seconds':>8} {'rows':>5} {'duplicate rows':>15} {'expiry lookups':>15}")
+    with PooledServer(backend.app, WORKERS) as server:
+        for n in PHOTO_COUNTS:
+            for label, send in (("sequential", sequential), ("batch", batch)):
+                seconds, rows, duplicates, n_lookups = run(send, n, f"{label}{n}")
+                print(f"{n:6d} {label:>11} {seconds:8.2f} {rows:5d} {duplicates:15d} {n_lookups:15d}")
@@ -0,0 +1,88 @@
+# Expiry summary over large pantries: a per-row Python loop (the
+# items_expiring_soon approach) vs the vectorized engine. Rows are read from
+# mongomock once; the table reports compute time separately so the in-memory
+# stand-in's own query speed doesn't drown the comparison.
+# Run from backend/: python benchmarks/bench_expiry_summary.py
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import date, datetime, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+sys.path.insert(0, BENCH_DIR)
+
+from fakes import use_mongomock
+
+use_mongomock()
+
+from models import Food
+from expiration_helper import get_food_category
+from expiry_engine import DEFAULT_WINDOWS, _load_rows, summarize_rows
+
+NAMES = [line.strip() for line in open(os.path.join(BENCH_DIR, "receipt_names.txt")) if line.strip()]
+PANTRY_SIZES = (1_000, 10_000, 50_000)
+BATCH_USERS, BATCH_ROWS = 500, 100
+
+
+def make_rows(user_ids, n_per_user, start=datetime(2026, 1, 1)):
+    return [{"user": user_id, "name": random.choice(NAMES), "quantity": random.choice(("small", "medium", "large")),
+             "expiration_date": start + timedelta(days=random.randint(0, 400))}
+            for user_id in user_ids for _ in range(n_per_user)]
+
+
+# Row-at-a-time reference: same numbers, computed in Python
+def python_summaries(users, names, quantities, dates, today):
+    summaries = {}
+    for user, name, quantity, expiration in zip(users, names, quantities, dates):
+        s = summaries.setdefault(user, {"total": 0, "expired": 0, "by_category": {}, "by_quantity": {},
+                                        "expiring_within": {str(n): 0 for n in DEFAULT_WINDOWS}})
+        days_left = (expiration.date() - today).days
+        s["total"] += 1
+        if days_left < 0:
+            s["expired"] += 1
+        for n in DEFAULT_WINDOWS:
+            if 0 <= days_left <= n:
+                s["expiring_within"][str(n)] += 1
+        category = get_food_category(name) or "Uncategorized"
+        s["by_category"][category] = s["by_category"].get(category, 0) + 1
+        s["by_quantity"][quantity] = s["by_quantity"].get(quantity, 0) + 1
+    return summaries
+
+
+def best_of(fn, rounds=3):
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def compare(label, user_ids, n_per_user, today):
+    collection = Food._get_collection()
+    collection.delete_many({})
+    collection.insert_many(make_rows(user_ids, n_per_user))
+    load_t, columns = best_of(lambda: _load_rows({}), rounds=1)
+    py_t, py = best_of(lambda: python_summaries(*columns, today))
+    np_t, vec = best_of(lambda: summarize_rows(*columns, today=today))
+    for user, summary in py.items():
+        assert summary["expiring_within"] == vec[user]["expiring_within"] and summary["total"] == vec[user]["total"]
+    print(f"{label:>22} {load_t * 1000:10.0f} {py_t * 1000:10.1f} {np_t * 1000:14.1f} {py_t / np_t:8.1f}x")
+
+
+if __name__ == "__main__":
+    random.seed(7)
+    today = date(2026, 6, 1)
+    with contextlib.redirect_stdout(io.StringIO()):
+        for name in NAMES:
+            get_food_category(name)     # warm the FoodKeeper cache for both paths
+
+    print(f"{'rows':>22} {'load ms':>10} {'python ms':>10} {'vectorized ms':>14} {'speedup':>9}")
+    for n in PANTRY_SIZES:
+        compare(f"1 user x {n}", [uuid.uuid4()], n, today)
+    compare(f"{BATCH_USERS} users x {BATCH_ROWS}", [uuid.uuid4() for _ in range(BATCH_USERS)], BATCH_ROWS, today)
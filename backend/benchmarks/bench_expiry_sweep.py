@@ -0,0 +1,106 @@
+# Nightly expiry sweep over a generated food collection on mongomock.
+#
+# 1. a sweep cut short with max_rows, then resumed to the end
+# 2. the same run replayed from its mid-way checkpoint, as after a crash
+#    between writing digests and saving the checkpoint
+# Both must match per-user counts computed independently in Python.
+# Run from backend/: python benchmarks/bench_expiry_sweep.py [--rows 1000000] [--users 20000]
+import argparse
+import logging
+import os
+import random
+import resource
+import sys
+import time
+import uuid
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+sys.path.insert(0, BENCH_DIR)
+
+from fakes import use_mongomock
+
+use_mongomock()
+
+from models import Food, ExpiryDigest, SweepCheckpoint
+from expiry_sweep import ExpirySweep
+
+RUN_DATE = date(2026, 6, 1)
+CHUNK = 100_000
+
+
+def generate(rows, users, spread_days=14):
+    """Insert rows food items over `users` users, expiring within +-spread_days
+    of RUN_DATE; returns their (user, expiration_date) pairs"""
+    user_ids = [uuid.uuid4() for _ in range(users)]
+    base = datetime.combine(RUN_DATE, datetime.min.time())
+    collection = Food._get_collection()
+    generated = []
+    for start in range(0, rows, CHUNK):
+        docs = [{"user": random.choice(user_ids), "name": "milk", "quantity": "small",
+                 "expiration_date": base + timedelta(days=random.randint(-spread_days, spread_days),
+                                                     hours=random.randint(0, 23))}
+                for _ in range(min(CHUNK, rows - start))]
+        collection.insert_many(docs)
+        generated += [(doc["user"], doc["expiration_date"]) for doc in docs]
+    return generated
+
+
+def expected_counts(sweep, generated):
+    expired, expiring = Counter(), Counter()
+    for user, expiration in generated:
+        if sweep.window[0] <= expiration < sweep.today:
+            expired[user] += 1
+        elif sweep.today <= expiration < sweep.window[1]:
+            expiring[user] += 1
+    return expired, expiring
+
+
+def check(sweep, expired, expiring):
+    digests = list(ExpiryDigest._get_collection().find({"run": sweep.run}).sort("_id"))
+    assert len(digests) == len(set(expired) | set(expiring)), "one digest per user in the window"
+    for d in digests:
+        assert d["expired"] == expired[d["user"]] and d["expiring"] == expiring[d["user"]], d["_id"]
+        assert len(d["items"]) == min(expiring[d["user"]], sweep.digest_items)
+    checkpoint = SweepCheckpoint.objects(id=sweep.run).first()
+    assert checkpoint.rows == sum(expired.values()) + sum(expiring.values())
+
+
+def report(label, stats):
+    print(f"{label:>28}: {stats['status']:>7} {stats['users']:7d} users {stats['rows']:8d} rows "
+          f"{stats['rows_read']:8d} read {stats['seconds']:7.1f} s {stats['rows_per_sec'] or 0:8d} rows/sec")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=20_000)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")    # the sweep's progress lines
+    random.seed(7)
+
+    start = time.perf_counter()
+    generated = generate(args.rows, args.users)
+    print(f"generated {args.rows} rows for {args.users} users in {time.perf_counter() - start:.1f} s")
+
+    sweep = ExpirySweep(RUN_DATE)
+    expired, expiring = expected_counts(sweep, generated)
+    del generated
+
+    half = (sum(expired.values()) + sum(expiring.values())) // 2
+    report("first half (max_rows)", sweep.run_once(max_rows=half, restart=True))
+    mid_checkpoint = SweepCheckpoint.objects(id=sweep.run).first().to_mongo().to_dict()
+    report("resumed", sweep.run_once())
+    check(sweep, expired, expiring)
+
+    # put back the mid-way checkpoint while keeping every digest
+    SweepCheckpoint._get_collection().replace_one({"_id": sweep.run}, mid_checkpoint)
+    report("replayed after crash", sweep.run_once())
+    check(sweep, expired, expiring)
+
+    report("full run, no checkpoint", sweep.run_once(restart=True))
+    check(sweep, expired, expiring)
+    print(f"peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB "
+          f"(mostly mongomock's in-memory collection)")
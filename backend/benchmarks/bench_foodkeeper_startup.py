@@ -0,0 +1,40 @@
+# Cold start of the FoodKeeper lookup: JSON sheet vs compiled foodkeeper.bin.
+# Each run is a fresh interpreter so import, load and index build are all counted.
+# Run from backend/ after `python foodkeeper_store.py`:
+#   python benchmarks/bench_foodkeeper_startup.py
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+RUNS = 7
+
+PROBE = """
+import contextlib, io, json, resource, time
+start = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    import expiration_helper
+    expiration_helper.get_food_expiration("milk")
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "maxrss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}))
+"""
+
+
+def run(fmt):
+    env = dict(os.environ, FOODKEEPER_FORMAT=fmt)
+    out = subprocess.run([sys.executable, "-c", PROBE], cwd=BACKEND_DIR, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    if not os.path.exists(os.path.join(BACKEND_DIR, "foodkeeper.bin")):
+        sys.exit("foodkeeper.bin missing; run `python foodkeeper_store.py` first")
+
+    for fmt in ("json", "compiled"):
+        samples = [run(fmt) for _ in range(RUNS)]
+        seconds = statistics.median(s["seconds"] for s in samples)
+        rss = statistics.median(s["maxrss_kb"] for s in samples)
+        print(f"{fmt:9s} first lookup after {seconds * 1000:7.1f} ms   peak RSS {rss / 1024:6.1f} MB")
@@ -0,0 +1,98 @@
+# FoodKeeper matching on receipt-style names: the exact/keyword/substring
+# lookup alone vs with the fuzzy fallback (foodkeeper_fuzzy.py). Reports match
+# rate, accuracy against receipt_abbreviations.txt labels, non-food lines
+# wrongly matched, and per-query latency with a cold and a warm word cache.
+# Run from backend/: python benchmarks/bench_fuzzy_match.py
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+
+import expiration_helper
+from expiration_helper import get_foodkeeper_index, load_product_data, match_product, normalize_name
+from foodkeeper_fuzzy import FuzzyFoodIndex
+
+CORPUS = os.path.join(BENCH_DIR, "receipt_abbreviations.txt")
+ROUNDS = 200
+
+
+def load_corpus():
+    """[(receipt line, [accepted Name prefixes])]; no prefixes means not a food"""
+    corpus = []
+    with open(CORPUS) as f:
+        for line in f:
+            if line.startswith("#") or not line.strip():
+                continue
+            query, expected = line.rstrip("\n").split("|")
+            corpus.append((query, [e.lower() for e in expected.split(";") if e]))
+    return corpus
+
+
+def title(row):
+    name = (row.get("Name") or "").strip()
+    return f"{name} ({row['Name_subtitle']})" if row.get("Name_subtitle") else name
+
+
+def lookup_only(query):
+    return get_foodkeeper_index().lookup(normalize_name(query))[0]
+
+
+def with_fuzzy(query):
+    return match_product(query)[0]
+
+
+def evaluate(label, matcher, corpus):
+    matched = correct = false_food = 0
+    for query, expected in corpus:
+        row = matcher(query)
+        if row is None:
+            continue
+        if not expected:
+            false_food += 1
+            continue
+        matched += 1
+        correct += title(row).lower().startswith(tuple(expected))
+    foods = sum(1 for _, expected in corpus if expected)
+    print(f"{label:>16} {matched:4d}/{foods} matched {correct:4d} correct ({correct / foods:.0%}) "
+          f"{matched - correct:3d} wrong {false_food:3d}/{len(corpus) - foods} non-food matched")
+
+
+def latencies(fn, queries, rounds=1):
+    times = []
+    for _ in range(rounds):
+        for query in queries:
+            start = time.perf_counter()
+            fn(query)
+            times.append((time.perf_counter() - start) * 1e6)
+    times.sort()
+    return statistics.median(times), times[int(len(times) * 0.99)], times[-1]
+
+
+def report(label, stats):
+    p50, p99, worst = stats
+    print(f"{label:>28} p50 {p50:7.1f} us  p99 {p99:7.1f} us  max {worst:7.1f} us")
+
+
+if __name__ == "__main__":
+    with contextlib.redirect_stdout(io.StringIO()):
+        table = load_product_data()
+    corpus = load_corpus()
+    queries = [query for query, _ in corpus]
+    print(f"{len(corpus)} receipt lines, {len(table)} FoodKeeper products")
+
+    evaluate("lookup only", lookup_only, corpus)
+    evaluate("lookup + fuzzy", with_fuzzy, corpus)
+
+    start = time.perf_counter()
+    fuzzy = FuzzyFoodIndex(table)
+    print(f"\nfuzzy index build {(time.perf_counter() - start) * 1000:.1f} ms")
+    report("fuzzy, cold word cache", latencies(fuzzy.candidates, queries))
+    report("fuzzy, warm word cache", latencies(fuzzy.candidates, queries, ROUNDS))
+    expiration_helper.FUZZY_INDEX = fuzzy
+    report("lookup only", latencies(lookup_only, queries, ROUNDS))
+    report("lookup + fuzzy", latencies(with_fuzzy, queries, ROUNDS))
@@ -0,0 +1,55 @@
+# Payload size and time to get a photo ready for the vision call: raw base64
+# (old) vs EXIF-rotate + downscale + JPEG re-encode + base64 (new).
+# Run from backend/: python benchmarks/bench_image_preprocess.py
+import base64
+import glob
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+from PIL import Image
+
+from food_recognition import encode_image, VISION_MAX_SIDE
+
+IMAGES_DIR = os.path.join(os.path.dirname(__file__), "..", "images")
+ROUNDS = 5
+
+
+def synthetic_photo(size, rotated=False):
+    """Noisy gradient, optionally tagged with EXIF orientation 6 like a portrait phone shot"""
+    img = Image.linear_gradient("L").resize(size).convert("RGB")
+    img = Image.blend(img, Image.effect_noise(size, 40).convert("RGB"), 0.5)
+    buf = io.BytesIO()
+    exif = Image.Exif()
+    if rotated:
+        exif[0x0112] = 6
+    img.save(buf, "JPEG", quality=92, exif=exif)
+    return buf.getvalue()
+
+
+def best_time(fn, data):
+    times = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        out = fn(data)
+        times.append(time.perf_counter() - start)
+    return min(times), out
+
+
+if __name__ == "__main__":
+    samples = [(os.path.basename(p), open(p, "rb").read()) for p in sorted(glob.glob(os.path.join(IMAGES_DIR, "*.jpg")))]
+    samples += [("synthetic 3MP", synthetic_photo((2048, 1536))),
+                ("synthetic 12MP", synthetic_photo((4032, 3024))),
+                ("synthetic 12MP rotated", synthetic_photo((4032, 3024), rotated=True))]
+
+    raw_encode = lambda data: base64.b64encode(data).decode("utf-8")
+    print(f"max side {VISION_MAX_SIDE}px")
+    print(f"{'image':>24} {'raw payload':>12} {'raw ms':>7} {'new payload':>12} {'new ms':>7}")
+    for name, data in samples:
+        raw_t, raw_out = best_time(raw_encode, data)
+        new_t, new_out = best_time(encode_image, data)
+        print(f"{name:>24} {len(raw_out):>12} {raw_t * 1000:7.1f} {len(new_out):>12} {new_t * 1000:7.1f}")
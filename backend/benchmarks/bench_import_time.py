@@ -0,0 +1,50 @@
+# Cold start of an API worker: wall time, RSS and the slowest imports of
+# `import app` in a fresh interpreter, next to the Gradio demo module (which
+# still loads gradio, as the API process used to). Each module is imported in
+# its own `python -X importtime` subprocess, best of ROUNDS.
+# Run from backend/: python benchmarks/bench_import_time.py
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+ROUNDS = 3
+HEAVY = ("gradio", "openai", "pytesseract", "pandas")
+
+PROBE = """
+import resource, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+loaded = [m for m in {heavy!r} if m in sys.modules]
+print(f"RESULT {{elapsed:.3f}} {{resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024}} {{','.join(loaded) or '-'}}")
+"""
+
+
+def probe(module):
+    env = dict(os.environ, OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY", "offline"))
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", PROBE.format(module=module, heavy=HEAVY)],
+                          cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True)
+    line = next(l for l in proc.stdout.splitlines() if l.startswith("RESULT"))
+    _, seconds, rss_mb, loaded = line.split()
+    imports = []
+    for row in proc.stderr.splitlines():
+        if not row.startswith("import time:") or "self [us]" in row:
+            continue
+        _, cumulative, name = row[len("import time:"):].split("|")
+        imports.append((int(cumulative), name.rstrip()))
+    return float(seconds), int(rss_mb), loaded, imports
+
+
+if __name__ == "__main__":
+    print(f"{'module':>22} {'import s':>9} {'RSS MB':>7}  heavy modules loaded")
+    for module in ("app", "test_image_detection"):
+        runs = [probe(module) for _ in range(ROUNDS)]
+        seconds, rss_mb, loaded, imports = min(runs, key=lambda r: r[0])
+        print(f"{module:>22} {seconds:9.2f} {rss_mb:7d}  {loaded}")
+        if module == "app":
+            top = sorted((i for i in imports if i[1].startswith("   ") and not i[1].startswith("     ")),
+                         reverse=True)[:8]
+            print("  slowest direct imports of app:")
+            for cumulative, name in top:
+                print(f"    {name.strip():>24} {cumulative / 1e6:6.2f} s")
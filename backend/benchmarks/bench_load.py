@@ -0,0 +1,345 @@
+# Offline end-to-end load test of the API: concurrent clients drive a weighted
+# mix of routes against app.py served by a fixed pool of worker threads, with
+# every external dependency replaced by a local stand-in of configurable
+# latency: a fake OpenAI client, a fake tesseract binary, stub USDA and
+# Spoonacular servers, and mongomock (or a local mongod with --mongo-uri).
+#
+# Reports per-route p50/p90/p99 latency, throughput and errors, and per-stage
+# time from the server's own spans (metrics_helper). --json writes the same
+# numbers, plus the run's configuration and commit, as machine-readable
+# results; --baseline compares against an earlier file and exits 1 when a
+# route or stage regressed by more than --tolerance, so hot-path regressions
+# can be tracked from run to run:
+#
+#   python benchmarks/bench_load.py --json before.json
+#   python benchmarks/bench_load.py --baseline before.json --json after.json
+#
+# Clients and server share one process, so client overhead is included in the
+# latencies; compare runs made with the same settings on the same machine.
+# Run from backend/: python benchmarks/bench_load.py [--duration 20] [--clients 16] [--mix detect-food=2,...]
+import argparse
+import io
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+sys.path.insert(0, BENCH_DIR)
+
+from fakes import FakeOpenAI, PooledServer, install_fake_tesseract, tail_latency, use_mongod, use_mongomock
+from stub_servers import StubServer, usda_respond
+
+NAMES = [line.strip() for line in open(os.path.join(BENCH_DIR, "receipt_names.txt")) if line.strip()]
+DEFAULT_MIX = "detect-food=2,parse-receipt=1,add-food=3,get-food=4,pantry-summary=2,pantry-recipe=1"
+RESULTS_VERSION = 1
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Offline load test of the Flask API")
+    parser.add_argument("--duration", type=float, default=20, help="seconds of measured load")
+    parser.add_argument("--warmup", type=float, default=3, help="seconds of unmeasured load first")
+    parser.add_argument("--clients", type=int, default=16, help="concurrent client threads")
+    parser.add_argument("--workers", type=int, default=8, help="server request threads")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="route=weight,... (routes: %s)" % ", ".join(ROUTES))
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--pantry", type=int, default=200, help="food items seeded per user")
+    parser.add_argument("--vision-latency", type=float, default=0.3, help="seconds per vision call")
+    parser.add_argument("--vision-tail", type=float, default=0.0, help="share of vision calls taking 10x as long")
+    parser.add_argument("--ocr-latency", type=float, default=0.1, help="seconds per tesseract run")
+    parser.add_argument("--usda-latency", type=float, default=0.05, help="seconds per USDA request")
+    parser.add_argument("--recipe-latency", type=float, default=0.2, help="seconds per Spoonacular request")
+    parser.add_argument("--mongo-uri", help="use this mongod (scratch database, emptied) instead of mongomock")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="write machine-readable results here")
+    parser.add_argument("--baseline", help="earlier --json results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown vs --baseline")
+    return parser.parse_args()
+
+
+def photo_bytes(color):
+    from PIL import Image
+    buf = io.BytesIO()
+    Image.new("RGB", (1024, 768), color).save(buf, "JPEG")
+    return buf.getvalue()
+
+
+def receipt_bytes():
+    from PIL import Image
+    buf = io.BytesIO()
+    Image.new("RGB", (600, 360), (235, 235, 235)).save(buf, "JPEG")
+    return buf.getvalue()
+
+
+# route name -> send(session, url, user_id, rng, fixtures) -> response
+ROUTES = {
+    "detect-food": lambda s, url, user_id, rng, fx: s.post(
+        f"{url}/detect-food", data={"user_id": user_id, "no_cache": "1"},
+        files={"file": ("fridge.jpg", rng.choice(fx["photos"]), "image/jpeg")}),
+    "detect-foods": lambda s, url, user_id, rng, fx: s.post(
+        f"{url}/detect-foods", data={"user_id": user_id, "no_cache": "1"},
+        files=[("file", (f"shot{i}.jpg", photo, "image/jpeg")) for i, photo in enumerate(rng.sample(fx["photos"], 3))]),
+    "parse-receipt": lambda s, url, user_id, rng, fx: s.post(
+        f"{url}/parse-receipt", data={"user_id": user_id},
+        files={"file": ("receipt.jpg", fx["receipt"], "image/jpeg")}),
+    "add-food": lambda s, url, user_id, rng, fx: s.post(
+        f"{url}/add-food", json={"_id": user_id, "name": rng.choice(NAMES),
+                                 "quantity": rng.choice(("small", "medium", "large"))}),
+    "get-food": lambda s, url, user_id, rng, fx: s.get(
+        f"{url}/get-food/{user_id}", params={"limit": 50, "expiring_within": 7}),
+    "pantry-summary": lambda s, url, user_id, rng, fx: s.get(f"{url}/pantry-summary/{user_id}"),
+    "pantry-recipe": lambda s, url, user_id, rng, fx: s.post(
+        f"{url}/zero-waste-recipe", data={"user_id": user_id, "no_cache": "1"}),
+}
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        route, _, weight = part.partition("=")
+        if route not in ROUTES:
+            raise SystemExit(f"unknown route {route!r}; known: {', '.join(ROUTES)}")
+        mix[route] = float(weight or 1)
+    return mix
+
+
+def spoonacular_respond(path, query):
+    ingredients = query.get("ingredients", [""])[0].split(",")
+    return [{"id": i, "title": f"{ingredients[i % len(ingredients)]} bake", "missedIngredientCount": i % 3,
+             "usedIngredients": [{"name": name, "amount": 100, "unit": "g"} for name in ingredients[:i + 1]]}
+            for i in range(int(query.get("number", ["3"])[0]))]
+
+
+def seed_users(backend, n_users, pantry, rng):
+    from models import Food, User
+    import pantry_summary
+
+    client = backend.app.test_client()
+    user_ids = []
+    now = datetime.now()
+    for i in range(n_users):
+        user_ids.append(client.post("/add-user", json={"username": f"load{i}", "name": f"Load {i}",
+                                                        "password": "x"}).json["id"])
+    users = list(User.objects(username__in=[f"load{i}" for i in range(n_users)]))
+    rows = [{"user": user.id, "name": rng.choice(NAMES), "quantity": rng.choice(("small", "medium", "large")),
+             "expiration_date": now + timedelta(days=rng.randint(-5, 30))}
+            for user in users for _ in range(pantry)]
+    if rows:
+        Food._get_collection().insert_many(rows)
+    Food.ensure_indexes()
+    pantry_summary.rebuild([user.id for user in users])
+    return user_ids
+
+
+def drive(url, user_ids, mix, fixtures, clients, duration, seed):
+    """Closed-loop clients for `duration` seconds; returns [(route, status or None, seconds)]"""
+    import requests
+
+    routes, weights = list(mix), list(mix.values())
+    results = []
+    lock = threading.Lock()
+    stop_at = time.time() + duration
+
+    def client(index):
+        rng = random.Random(seed + index)
+        session = requests.Session()
+        while True:
+            if time.time() >= stop_at:
+                return
+            route = rng.choices(routes, weights)[0]
+            started = time.perf_counter()
+            try:
+                status = ROUTES[route](session, url, rng.choice(user_ids), rng, fixtures).status_code
+            except requests.RequestException:
+                status = None
+            elapsed = time.perf_counter() - started
+            with lock:
+                results.append((route, status, elapsed))
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+def route_stats(samples, duration):
+    latencies = sorted(seconds for _, seconds in samples)
+    statuses = Counter(str(status) for status, _ in samples)
+    errors = sum(n for status, n in statuses.items() if not status.startswith("2"))
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "statuses": dict(statuses),
+        "throughput_rps": round((len(samples) - errors) / duration, 2),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p90_ms": round(percentile(latencies, 0.90) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2),
+    }
+
+
+def stage_stats(snapshot, measured_requests):
+    """Server-side spans: count, mean, total and per-request share of each"""
+    stages = {}
+    for name, h in snapshot["histograms"].items():
+        if name.startswith("http.request") or not h["count"]:
+            continue
+        stages[name] = {
+            "count": h["count"],
+            "mean_ms": round(h["mean"] * 1000, 3),
+            "p95_le_ms": round(h["p95"] * 1000, 3) if h["p95"] is not None else None,
+            "max_ms": round(h["max"] * 1000, 3),
+            "total_s": round(h["sum"], 3),
+            "ms_per_request": round(h["sum"] * 1000 / max(measured_requests, 1), 3),
+        }
+    return stages
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, tolerance):
+    """[(what, metric, before, after)] that got worse by more than tolerance"""
+    regressions = []
+    for route, after in results["routes"].items():
+        before = baseline.get("routes", {}).get(route)
+        if not before:
+            continue
+        for metric in ("p50_ms", "p99_ms"):
+            if after[metric] > before[metric] * (1 + tolerance):
+                regressions.append((route, metric, before[metric], after[metric]))
+        if after["throughput_rps"] < before["throughput_rps"] * (1 - tolerance):
+            regressions.append((route, "throughput_rps", before["throughput_rps"], after["throughput_rps"]))
+        if after["errors"] > before["errors"]:
+            regressions.append((route, "errors", before["errors"], after["errors"]))
+    for stage, after in results["stages"].items():
+        before = baseline.get("stages", {}).get(stage)
+        # sub-millisecond spans are too noisy to gate on
+        if before and max(before["mean_ms"], after["mean_ms"]) >= 1 \
+                and after["mean_ms"] > before["mean_ms"] * (1 + tolerance):
+            regressions.append((stage, "mean_ms", before["mean_ms"], after["mean_ms"]))
+    return regressions
+
+
+def print_report(results):
+    print(f"\n{'route':>16} {'requests':>9} {'errors':>7} {'req/s':>7} {'p50 ms':>8} {'p90 ms':>8} "
+          f"{'p99 ms':>8} {'max ms':>8}")
+    for route, r in results["routes"].items():
+        print(f"{route:>16} {r['requests']:9d} {r['errors']:7d} {r['throughput_rps']:7.1f} {r['p50_ms']:8.1f} "
+              f"{r['p90_ms']:8.1f} {r['p99_ms']:8.1f} {r['max_ms']:8.1f}")
+    print(f"\n{'stage':>34} {'count':>7} {'mean ms':>9} {'p95<= ms':>9} {'max ms':>9} {'ms/request':>11}")
+    for stage, s in sorted(results["stages"].items(), key=lambda item: -item[1]["total_s"]):
+        p95 = f"{s['p95_le_ms']:9.1f}" if s["p95_le_ms"] is not None else f"{'-':>9}"
+        print(f"{stage:>34} {s['count']:7d} {s['mean_ms']:9.2f} {p95} {s['max_ms']:9.1f} {s['ms_per_request']:11.2f}")
+
+
+def main():
+    args = parse_args()
+    mix = parse_mix(args.mix)
+    rng = random.Random(args.seed)
+    tmp = tempfile.TemporaryDirectory()
+
+    # every stand-in is configured before the app (and its settings) are imported
+    usda = StubServer(usda_respond, args.usda_latency).__enter__()
+    spoonacular = StubServer(spoonacular_respond, args.recipe_latency).__enter__()
+    install_fake_tesseract(tmp.name, NAMES, args.ocr_latency)
+    os.environ.update(
+        USDA_API_KEY="bench", USDA_API_URL=usda.url + "/fdc/v1/foods/search",
+        USDA_CACHE_PATH=os.path.join(tmp.name, "usda.sqlite3"),
+        SPOONACULAR_API_KEY="bench", SPOONACULAR_API_URL=spoonacular.url + "/recipes/findByIngredients",
+        VISION_CACHE_PATH=os.path.join(tmp.name, "vision.sqlite3"),
+    )
+    if args.mongo_uri:
+        use_mongod(args.mongo_uri)
+    else:
+        use_mongomock()
+
+    import app as backend
+    import food_recognition
+    import metrics_helper
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)     # no access log line per request
+    food_recognition.client = FakeOpenAI(tail_latency(args.vision_latency, args.vision_latency * 10,
+                                                      args.vision_tail))
+    user_ids = seed_users(backend, args.users, args.pantry, rng)
+    fixtures = {"photos": [photo_bytes((rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+                           for _ in range(8)],
+                "receipt": receipt_bytes()}
+
+    print(f"{args.clients} clients, {args.workers} workers, {args.warmup:g}s warmup + {args.duration:g}s; "
+          f"mix {args.mix}; {'mongod' if args.mongo_uri else 'mongomock'}")
+    with PooledServer(backend.app, args.workers) as server:
+        # warm up first, then measure with the span histograms cleared
+        drive(server.url, user_ids, mix, fixtures, args.clients, args.warmup, args.seed)
+        metrics_helper.METRICS.clear()
+        samples = drive(server.url, user_ids, mix, fixtures, args.clients, args.duration, args.seed + 1000)
+        snapshot = metrics_helper.METRICS.snapshot()
+
+    by_route = {}
+    for route, status, seconds in samples:
+        by_route.setdefault(route, []).append((status, seconds))
+    results = {
+        "version": RESULTS_VERSION,
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "config": {key: value for key, value in vars(args).items() if key not in ("json", "baseline")},
+        },
+        "routes": {route: route_stats(by_route[route], args.duration) for route in mix if route in by_route},
+        "stages": stage_stats(snapshot, len(samples)),
+        "counters": snapshot["counters"],
+        "upstream_calls": {"vision": food_recognition.client.calls, "usda": usda.calls,
+                           "spoonacular": spoonacular.calls},
+    }
+    results["routes"]["all"] = route_stats([(status, seconds) for _, status, seconds in samples], args.duration)
+    print_report(results)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nresults written to {args.json}")
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        print(f"\nvs {args.baseline} ({baseline['meta'].get('commit')}), tolerance {args.tolerance:.0%}: "
+              f"{len(regressions) or 'no'} regressions")
+        for what, metric, before, after in regressions:
+            print(f"  {what:>32} {metric:>14} {before:>10} -> {after}")
+        status = 1 if regressions else 0
+
+    usda.__exit__(None, None, None)
+    spoonacular.__exit__(None, None, None)
+    tmp.cleanup()
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
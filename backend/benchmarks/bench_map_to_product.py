@@ -0,0 +1,69 @@
+# Per-lookup latency of map_to_product's exact/keyword/partial tier: sheet-order
+# linear scan vs precompiled index. (Names neither finds then go to the fuzzy
+# matcher; see bench_fuzzy_match.py.)
+# Run from backend/: python benchmarks/bench_map_to_product.py
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import expiration_helper
+from expiration_helper import load_foodkeeper_data, normalize_name
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "receipt_names.txt")
+ROUNDS = 20
+
+
+# The pre-index implementation, kept here as the baseline
+def linear_map_to_product(name_raw: str):
+    data = load_foodkeeper_data()
+    normalized = normalize_name(name_raw)
+    for row in data["sheets"][2]["data"]:
+        row_dict = {k: v for d in row for k, v in d.items()}
+        name_field = (row_dict.get("Name") or "").lower()
+        if normalized == name_field:
+            return row_dict
+        keywords = (row_dict.get("Keywords") or "").lower()
+        if keywords:
+            keyword_list = [k.strip() for k in keywords.split(',')]
+            if normalized in keyword_list:
+                return row_dict
+        if normalized in name_field or normalized in keywords:
+            return row_dict
+    return None
+
+
+def indexed_lookup(name_raw: str):
+    return expiration_helper.get_foodkeeper_index().lookup(normalize_name(name_raw))[0]
+
+
+def time_per_lookup(fn, names):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for name in names:
+            fn(name)
+    return (time.perf_counter() - start) / (ROUNDS * len(names))
+
+
+if __name__ == "__main__":
+    with open(CORPUS_PATH) as f:
+        names = [line.strip() for line in f if line.strip()]
+
+    # Silence the DEBUG prints so only lookup cost is measured
+    with contextlib.redirect_stdout(io.StringIO()):
+        load_foodkeeper_data()
+        expiration_helper.get_foodkeeper_index()
+        for name in names:
+            expected = linear_map_to_product(name)
+            found = indexed_lookup(name)
+            assert (found or {}).get("ID") == (expected or {}).get("ID"), name
+        linear = time_per_lookup(linear_map_to_product, names)
+        indexed = time_per_lookup(indexed_lookup, names)
+
+    print(f"corpus: {len(names)} names x {ROUNDS} rounds")
+    print(f"linear scan:  {linear * 1e6:9.1f} us/lookup")
+    print(f"indexed:      {indexed * 1e6:9.1f} us/lookup")
+    print(f"speedup:      {linear / indexed:9.1f}x")
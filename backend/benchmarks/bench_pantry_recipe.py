@@ -0,0 +1,83 @@
+# /zero-waste-recipe latency: image mode (vision call on every request) vs
+# pantry mode (stored food expiring soon, no vision call). Vision and
+# Spoonacular are local fakes with fixed latencies; no_cache=1 keeps either
+# mode from being answered out of a cache. The fake vision model's items
+# aren't expiring within two days, so image mode never reaches Spoonacular:
+# its latency is a lower bound.
+# Run from backend/: python benchmarks/bench_pantry_recipe.py
+import io
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+sys.path.insert(0, BENCH_DIR)
+
+from fakes import FakeOpenAI, use_mongomock
+from stub_servers import StubServer
+
+VISION_LATENCY = 1.5     # seconds; a typical gpt-4o-mini image call
+RECIPE_LATENCY = 0.2
+REQUESTS = 10
+PANTRY_ROWS = 300
+
+
+def spoonacular_respond(path, query):
+    ingredients = query.get("ingredients", [""])[0].split(",")
+    return [{"id": i, "title": f"{ingredients[i % len(ingredients)]} bake", "missedIngredientCount": i % 3,
+             "usedIngredients": [{"name": name, "amount": 100, "unit": "g"} for name in ingredients[:i + 1]]}
+            for i in range(int(query.get("number", ["3"])[0]))]
+
+
+def photo_bytes():
+    from PIL import Image
+    buf = io.BytesIO()
+    Image.new("RGB", (1024, 768), (30, 160, 60)).save(buf, "JPEG")
+    return buf.getvalue()
+
+
+def timed_requests(send):
+    latencies = []
+    for _ in range(REQUESTS):
+        start = time.perf_counter()
+        response = send()
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.json
+    return latencies
+
+
+if __name__ == "__main__":
+    with StubServer(spoonacular_respond, RECIPE_LATENCY) as stub:
+        os.environ.update(SPOONACULAR_API_KEY="bench", SPOONACULAR_API_URL=stub.url + "/recipes/findByIngredients")
+        use_mongomock()
+        import app as backend
+        import food_recognition
+        from models import Food, User
+
+        vision = FakeOpenAI(lambda: VISION_LATENCY)
+        food_recognition.client = vision
+        client = backend.app.test_client()
+        user_id = client.post("/add-user", json={"username": "bench", "name": "Bench", "password": "x"}).json["id"]
+        user = User.objects(username="bench").first()
+        names = ["milk", "bananas", "eggs", "spinach", "cheddar cheese", "yogurt", "bread", "chicken breast"]
+        now = datetime.now()
+        Food._get_collection().insert_many([
+            {"user": user.id, "name": names[i % len(names)], "quantity": "medium",
+             "expiration_date": now + timedelta(days=i % 30)} for i in range(PANTRY_ROWS)
+        ])
+
+        image = photo_bytes()
+        image_ms = timed_requests(lambda: client.post(
+            "/zero-waste-recipe", data={"no_cache": "1", "file": (io.BytesIO(image), "fridge.jpg")}))
+        vision_calls, recipe_calls = vision.calls, stub.calls
+        pantry_ms = timed_requests(lambda: client.post(
+            "/zero-waste-recipe", data={"no_cache": "1", "user_id": user_id}))
+
+        print(f"{'mode':>8} {'p50 ms':>8} {'max ms':>8} {'vision calls':>13} {'recipe calls':>13}")
+        print(f"{'image':>8} {statistics.median(image_ms) * 1000:8.0f} {max(image_ms) * 1000:8.0f} "
+              f"{vision_calls:13d} {recipe_calls:13d}")
+        print(f"{'pantry':>8} {statistics.median(pantry_ms) * 1000:8.0f} {max(pantry_ms) * 1000:8.0f} "
+              f"{vision.calls - vision_calls:13d} {stub.calls - recipe_calls:13d}")
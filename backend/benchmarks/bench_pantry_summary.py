@@ -0,0 +1,123 @@
+# Pantry summary read cost: /expiry-summary, which recomputes over the user's
+# whole history, vs /pantry-summary, which reads the incrementally kept
+# PantrySummary (pantry_summary.py), as the history grows. On mongomock, so
+# absolute times are the stand-in's; the shape of the curve is the point.
+#
+# Before timing, a random mix of /add-food, /add-foods and DELETE /food
+# requests is replayed and the kept summary checked against a full
+# recomputation, today and on later days (which exercises the daily fold).
+# Run from backend/: python benchmarks/bench_pantry_summary.py
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+sys.path.insert(0, BENCH_DIR)
+
+from fakes import count_mongo_operations, use_mongomock
+
+use_mongomock()
+OPERATIONS = count_mongo_operations()
+
+import app as backend
+import pantry_summary
+from expiry_engine import expiry_summary
+from models import Food, PantrySummary, User
+
+NAMES = [line.strip() for line in open(os.path.join(BENCH_DIR, "receipt_names.txt")) if line.strip()]
+HISTORY_SIZES = (100, 1_000, 10_000, 50_000)
+CHECK_REQUESTS = 300
+ROUNDS = 20
+
+
+def add_user(client, username):
+    user_id = client.post("/add-user", json={"username": username, "name": username, "password": "x"}).json["id"]
+    return user_id, User.objects(username=username).first()
+
+
+def check_incremental(client):
+    user_id, user = add_user(client, "incremental")
+    food_ids = []
+    for _ in range(CHECK_REQUESTS):
+        roll = random.random()
+        if roll < 0.3 and food_ids:
+            food_id = food_ids.pop(random.randrange(len(food_ids)))
+            assert client.delete(f"/food/{food_id}?user_id={user_id}").status_code == 200
+        elif roll < 0.6:
+            response = client.post("/add-food", json={"_id": user_id, "name": random.choice(NAMES),
+                                                      "quantity": random.choice(("small", "medium", "large"))})
+            food_ids.append(response.json["food_id"])
+        else:
+            foods = [{"name": random.choice(NAMES), "quantity": random.choice(("small", "large", "huge"))}
+                     for _ in range(random.randint(1, 8))]
+            response = client.post("/add-foods", json={"_id": user_id, "foods": foods})
+            food_ids += [item["food_id"] for item in response.json["items_saved"]]
+    assert client.delete(f"/food/{food_ids[0]}?user_id={user_id}").status_code == 200
+    assert client.delete(f"/food/{food_ids[0]}?user_id={user_id}").status_code == 404
+
+    assert client.get(f"/pantry-summary/{user_id}?within=1,5").json["summary"] == expiry_summary(user.id, (1, 5))
+    today = date.today()
+    for offset in (0, 0, 1, 3, 10, 40, 400):
+        day = today + timedelta(days=offset)
+        kept = pantry_summary.get_summary(user.id, today=day)
+        assert kept == expiry_summary(user.id, today=day), (day, kept)
+    doc = PantrySummary._get_collection().find_one({"_id": user.id})
+    print(f"{CHECK_REQUESTS} add/remove requests, {len(food_ids)} items left: summary matches a full "
+          f"recomputation on 7 days; {len(doc['by_date'])} days kept after folding to {doc['as_of']}")
+
+
+def seed_history(user, n):
+    start = datetime.now() - timedelta(days=365)
+    Food._get_collection().insert_many([
+        {"user": user.id, "name": random.choice(NAMES), "quantity": random.choice(("small", "medium", "large")),
+         "expiration_date": start + timedelta(days=random.randint(0, 400))}
+        for _ in range(n)
+    ])
+    # written behind the app's back: the summary is seeded by the first read
+
+
+def latency_ms(send):
+    times = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        response = send()
+        times.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.get_json()
+    return statistics.median(times)
+
+
+def round_trips(send):
+    before = sum(OPERATIONS.values())
+    send()
+    return sum(OPERATIONS.values()) - before
+
+
+if __name__ == "__main__":
+    random.seed(7)
+    client = backend.app.test_client()
+    Food.ensure_indexes()
+    check_incremental(client)
+
+    print(f"\n{'items':>7} {'expiry-summary ms':>18} {'pantry-summary ms':>18} {'speedup':>8} {'round trips':>12} {'summary days':>13}")
+    for n in HISTORY_SIZES:
+        user_id, user = add_user(client, f"history{n}")
+        seed_history(user, n)
+        full = latency_ms(lambda: client.get(f"/expiry-summary/{user_id}"))
+        kept = latency_ms(lambda: client.get(f"/pantry-summary/{user_id}"))
+        assert client.get(f"/pantry-summary/{user_id}").json == client.get(f"/expiry-summary/{user_id}").json
+        trips = round_trips(lambda: client.get(f"/pantry-summary/{user_id}"))
+        doc = PantrySummary._get_collection().find_one({"_id": user.id})
+        print(f"{n:7d} {full:18.2f} {kept:18.2f} {full / kept:7.0f}x {trips:12d} {len(doc['by_date']):13d}")
+
+    write = lambda: client.post("/add-foods", json={"_id": user_id, "foods": [
+        {"name": random.choice(NAMES), "quantity": "medium"} for _ in range(10)]})
+    with_summary = latency_ms(write)
+    backend_record = sys.modules["food_helper"].record_added
+    sys.modules["food_helper"].record_added = lambda foods: None
+    without_summary = latency_ms(write)
+    sys.modules["food_helper"].record_added = backend_record
+    print(f"\n/add-foods, 10 items: {without_summary:.2f} ms without the summary update, {with_summary:.2f} ms with")
@@ -0,0 +1,79 @@
+# Throughput of receipt text parsing (without OCR or USDA validation): the old
+# three passes with per-line uncompiled regexes vs the single-pass classifier.
+# Run from backend/: python benchmarks/bench_receipt_lines.py
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from receipt_parser import classify_lines, ITEM
+
+ITEMS = [line.strip().upper() for line in open(os.path.join(os.path.dirname(__file__), "receipt_names.txt")) if line.strip()]
+SIZES = (1_000, 10_000, 100_000)
+
+
+def synthetic_dump(n_lines):
+    lines = ["FRESH MART #112", "123 MAIN ST", "10/14/2025 5:42 PM"]
+    for i in range(n_lines):
+        if i % 25 == 24:
+            lines += ["SUBTOTAL $52.10", "TAX $1.20", ""]
+        else:
+            qty = ("", f"{i % 4 + 1} LB ", f"x{i % 6 + 1} ")[i % 3]
+            lines.append(f"{ITEMS[i % len(ITEMS)]} {qty}${i % 9 + 1}.{i % 100:02d}")
+    return "\n".join(lines)
+
+
+# The previous parse_receipt text handling, minus USDA filtering
+def legacy_parse(text):
+    lines = text.split("\n")
+    result = {"store": None, "date": None, "items": []}
+    for line in lines:
+        if line.strip():
+            result["store"] = line.strip()
+            break
+    for line in lines:
+        for pattern in [r"(\d{1,2}/\d{1,2}/\d{4})", r"(\d{4}-\d{1,2}-\d{1,2})"]:
+            match = re.search(pattern, line)
+            if match:
+                result["date"] = match.group(1)
+                break
+        if result["date"]:
+            break
+    for line in lines:
+        line = line.strip()
+        if not line or re.search(r"total|cash|change|tax|loyalty", line, re.I):
+            continue
+        line_no_price = re.sub(r"\$?\d+\.\d{2}", "", line)
+        qty_match = re.search(r"(\d+\s*(?:oz|lb|g|kg|ml|l)?)|x(\d+)", line_no_price, re.I)
+        if qty_match:
+            quantity = qty_match.group(0)
+            name = line_no_price.replace(quantity, "").strip()
+        else:
+            quantity, name = "1", line_no_price.strip()
+        if name:
+            result["items"].append({"name": name.lower(), "quantity": quantity})
+    return result
+
+
+def single_pass(text):
+    return [line.fields for line in classify_lines(text) if line.kind == ITEM]
+
+
+def throughput(fn, text, n_lines, rounds=5):
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - start)
+    return n_lines / best
+
+
+if __name__ == "__main__":
+    print(f"{'lines':>8} {'old lines/s':>13} {'new lines/s':>13} {'speedup':>8}")
+    for n in SIZES:
+        text = synthetic_dump(n)
+        old = throughput(legacy_parse, text, n)
+        new = throughput(single_pass, text, n)
+        print(f"{n:8d} {old:13,.0f} {new:13,.0f} {new / old:7.1f}x")
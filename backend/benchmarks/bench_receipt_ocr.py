@@ -0,0 +1,124 @@
+# Wall-clock time and line accuracy of receipt OCR: one Tesseract pass over
+# the raw image (RECEIPT_OCR_MODE=single) vs preprocessing + parallel bands
+# (RECEIPT_OCR_MODE=bands), on the fixture receipts in benchmarks/receipts/
+# (<name>.jpg and the lines printed on it in <name>.txt).
+#
+# The fixtures are photo-like renders, not phone photos: printed lines on a
+# sheet that is skewed, unevenly lit, noisy and JPEG-compressed over a dark
+# table. --write-fixtures regenerates them (deterministic).
+# Needs the tesseract binary. Run from backend/: python benchmarks/bench_receipt_ocr.py
+import difflib
+import os
+import random
+import shutil
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from PIL import Image, ImageDraw, ImageFilter
+
+import receipt_ocr
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_DIR = os.path.join(BENCH_DIR, "receipts")
+ITEMS = [line.strip().upper() for line in open(os.path.join(BENCH_DIR, "receipt_names.txt")) if line.strip()]
+MATCH_RATIO = 0.8
+
+# name: (item lines, skew degrees, font px, lighting falloff 0..1, noise sigma, blur radius)
+FIXTURES = {
+    "scan_short": (18, 0.0, 30, 0.0, 0, 0),
+    "photo_short": (24, 2.5, 28, 0.35, 18, 0.6),
+    "photo_long": (70, -1.5, 28, 0.45, 20, 0.8),
+    "photo_very_long": (130, 2.0, 26, 0.5, 22, 0.7),
+    "photo_dense": (60, -3.0, 22, 0.3, 15, 0.5),
+}
+
+
+def receipt_lines(n_items, rng):
+    lines = ["FRESH MART #112", "10/14/2025 5:42 PM"]
+    for _ in range(n_items):
+        lines.append(f"{rng.choice(ITEMS)}  {rng.randint(1, 3)}  ${rng.randint(0, 19)}.{rng.randint(0, 99):02d}")
+    lines += ["SUBTOTAL $52.10", "TAX $1.20", "TOTAL $53.30"]
+    return lines
+
+
+def render_receipt(lines, skew, font_size, falloff, noise, blur):
+    pitch = int(font_size * 1.5)
+    paper = Image.new("L", (30 * font_size, 60 + pitch * len(lines)), 235)
+    draw = ImageDraw.Draw(paper)
+    for i, line in enumerate(lines):
+        draw.text((font_size, 30 + pitch * i), line, fill=30, font_size=font_size)
+    sheet = paper.rotate(skew, resample=Image.BICUBIC, expand=True, fillcolor=60)
+    photo = Image.new("L", (sheet.width + 240, sheet.height + 240), 60)
+    photo.paste(sheet, (120, 120))
+    if falloff:
+        # light from the top left: darken towards the bottom right
+        ramp = Image.linear_gradient("L")
+        shade = Image.blend(ramp, ramp.transpose(Image.Transpose.ROTATE_90), 0.5).resize(photo.size)
+        photo = Image.composite(photo.point(lambda p: p * (1 - falloff)), photo, shade)
+    if noise:
+        grain = Image.effect_noise(photo.size, noise)
+        photo = Image.blend(photo, grain, 0.15)
+    if blur:
+        photo = photo.filter(ImageFilter.GaussianBlur(blur))
+    return photo.convert("RGB")
+
+
+def write_fixtures():
+    rng = random.Random(112)
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    for name, (n_items, *look) in FIXTURES.items():
+        lines = receipt_lines(n_items, rng)
+        render_receipt(lines, *look).save(os.path.join(FIXTURE_DIR, f"{name}.jpg"), quality=80)
+        with open(os.path.join(FIXTURE_DIR, f"{name}.txt"), "w") as f:
+            f.write("\n".join(lines) + "\n")
+
+
+def load_fixture(name):
+    """(image, expected lines) of one fixture receipt"""
+    with open(os.path.join(FIXTURE_DIR, f"{name}.txt")) as f:
+        expected = [line for line in f.read().splitlines() if line.strip()]
+    with Image.open(os.path.join(FIXTURE_DIR, f"{name}.jpg")) as img:
+        img.load()
+    return img, expected
+
+
+def line_accuracy(expected, text):
+    """Share of expected lines that some OCR'd line matches (difflib ratio >= MATCH_RATIO)"""
+    got = [" ".join(line.split()).lower() for line in text.splitlines() if line.strip()]
+    hits = 0
+    for line in expected:
+        want = " ".join(line.split()).lower()
+        if any(difflib.SequenceMatcher(None, want, g).ratio() >= MATCH_RATIO for g in got):
+            hits += 1
+    return hits / len(expected)
+
+
+def timed(fn, img):
+    start = time.perf_counter()
+    text = fn(img)
+    return time.perf_counter() - start, text
+
+
+if __name__ == "__main__":
+    if "--write-fixtures" in sys.argv:
+        write_fixtures()
+        sys.exit()
+    if not shutil.which("tesseract"):
+        sys.exit("tesseract binary not found on PATH")
+    workers = receipt_ocr.OCR_BAND_WORKERS
+    print(f"{os.cpu_count()} cores, {workers} band workers per receipt")
+    print(f"{'receipt':>16} {'lines':>6} {'single s':>9} {'acc':>5} {'bands s':>8} {'acc':>5}")
+    totals = [0.0, 0.0, 0, 0.0, 0.0]
+    for name in FIXTURES:
+        img, expected = load_fixture(name)
+        single_t, single_text = timed(receipt_ocr.ocr_single, img)
+        bands_t, bands_text = timed(lambda img: receipt_ocr.ocr_bands(img, workers), img)
+        single_acc, bands_acc = line_accuracy(expected, single_text), line_accuracy(expected, bands_text)
+        print(f"{name:>16} {len(expected):6d} {single_t:9.2f} {single_acc:5.0%} {bands_t:8.2f} {bands_acc:5.0%}")
+        for i, value in enumerate((single_t, single_acc * len(expected), len(expected), bands_t,
+                                   bands_acc * len(expected))):
+            totals[i] += value
+    single_t, single_hits, n, bands_t, bands_hits = totals
+    print(f"{'all':>16} {n:6d} {single_t:9.2f} {single_hits / n:5.0%} {bands_t:8.2f} {bands_hits / n:5.0%}")
@@ -0,0 +1,62 @@
+# End-to-end parse latency of receipt text vs receipt length, with USDA
+# validation served by a local stub at a fixed latency. Compares the old
+# one-blocking-request-per-line path with the concurrent, cached path.
+# Run from backend/: python benchmarks/bench_receipt_validation.py
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from stub_servers import StubServer, usda_respond
+
+LATENCY = 0.05   # seconds per USDA request
+LENGTHS = (5, 10, 20, 40, 80)
+ITEMS = [line.strip() for line in open(os.path.join(os.path.dirname(__file__), "receipt_names.txt")) if line.strip()]
+
+
+def synthetic_receipt(n_lines):
+    lines = ["FRESH MART #112", "10/14/2025 5:42 PM"]
+    lines += [f"{ITEMS[i % len(ITEMS)]} {i % 3 + 1} ${i % 9 + 1}.{i % 100:02d}" for i in range(n_lines)]
+    lines += ["SUBTOTAL $52.10", "TAX $1.20", "TOTAL $53.30"]
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    with StubServer(usda_respond, LATENCY) as stub, tempfile.TemporaryDirectory() as tmp:
+        os.environ.update(USDA_API_KEY="bench", USDA_API_URL=stub.url + "/fdc/v1/foods/search",
+                          USDA_CACHE_PATH=os.path.join(tmp, "usda.sqlite3"))
+        import requests
+        import receipt_parser
+
+        # The pre-change validator: one blocking request per line, no session or cache
+        def sequential_validate(names):
+            return {n.strip().lower(): len(requests.get(f"{receipt_parser.USDA_SEARCH_URL}?query={n}&api_key=x")
+                                           .json().get("foods", [])) > 0 for n in names}
+
+        def timed_parse(text, validate):
+            original = receipt_parser.validate_foods
+            receipt_parser.validate_foods = validate
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    start = time.perf_counter()
+                    receipt_parser.parse_receipt_text(text)
+                    return time.perf_counter() - start
+            finally:
+                receipt_parser.validate_foods = original
+
+        print(f"USDA stub latency {LATENCY * 1000:.0f} ms, {receipt_parser.USDA_MAX_WORKERS} workers")
+        print(f"{'lines':>5} {'sequential':>12} {'concurrent':>12} {'cached':>10}")
+        for n in LENGTHS:
+            text = synthetic_receipt(n)
+            # Start every length from a cold cache
+            receipt_parser._get_cache()._conn.execute("DELETE FROM usda_foods")
+            sequential = timed_parse(text, sequential_validate)
+            cold = timed_parse(text, receipt_parser.validate_foods)
+            warm = timed_parse(text, receipt_parser.validate_foods)
+            print(f"{n:5d} {sequential * 1000:10.1f}ms {cold * 1000:10.1f}ms {warm * 1000:8.1f}ms")
+        print(f"stub served {stub.calls} requests")
@@ -0,0 +1,67 @@
+# Concurrent zero-waste recipe lookups against a local Spoonacular stub:
+# upstream request counts and wall time for the old one-request-per-call
+# get_recipes vs the cached, coalesced one. The workload repeats a few
+# ingredient sets in varying order/case, as different users' fridges would.
+# Run from backend/: python benchmarks/bench_recipe_cache.py
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from stub_servers import StubServer, spoonacular_respond
+
+LATENCY = 0.2       # seconds per Spoonacular request
+REQUESTS = 400
+CONCURRENCY = 32
+DISTINCT_SETS = 12
+PANTRY = ["milk", "eggs", "spinach", "bananas", "cheddar cheese", "chicken breast", "tomatoes",
+          "yogurt", "bread", "carrots", "rice", "ground beef", "lettuce", "apples"]
+
+
+def workload():
+    random.seed(3)
+    sets = [random.sample(PANTRY, random.randint(2, 4)) for _ in range(DISTINCT_SETS)]
+    calls = []
+    for _ in range(REQUESTS):
+        names = list(random.choice(sets))
+        random.shuffle(names)
+        calls.append([name.upper() if random.random() < 0.3 else name for name in names])
+    return calls
+
+
+def run(label, get_recipes, stub, calls):
+    before = stub.calls
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as pool:
+        results = list(pool.map(get_recipes, calls))
+    elapsed = time.perf_counter() - start
+    assert all(len(r) == 3 for r in results)
+    print(f"{label:>22} {stub.calls - before:9d} {elapsed:8.2f} {REQUESTS / elapsed:8.0f}")
+
+
+if __name__ == "__main__":
+    with StubServer(spoonacular_respond, LATENCY) as stub:
+        os.environ.update(SPOONACULAR_API_KEY="bench", SPOONACULAR_API_URL=stub.url + "/recipes/findByIngredients")
+        import requests
+        import recipe_helper
+
+        # The pre-change lookup: a fresh blocking request per call, no session or cache
+        def uncached_get_recipes(names, number=3):
+            url = (f"{recipe_helper.SPOONACULAR_URL}?ingredients={','.join(names)}"
+                   f"&number={number}&apiKey={recipe_helper.spoonacular_api_key}")
+            return requests.get(url).json()
+
+        calls = workload()
+        print(f"{REQUESTS} lookups, {CONCURRENCY} threads, {DISTINCT_SETS} distinct ingredient sets, "
+              f"{LATENCY * 1000:.0f} ms upstream latency")
+        print(f"{'':>22} {'upstream':>9} {'wall s':>8} {'req/s':>8}")
+        run("uncached", uncached_get_recipes, stub, calls)
+        run("single-flight only", lambda names: recipe_helper.get_recipes(names, use_cache=False), stub, calls)
+        recipe_helper.RECIPE_CACHE.clear()
+        run("cache + single-flight", recipe_helper.get_recipes, stub, calls)
+        run("warm cache", recipe_helper.get_recipes, stub, calls)
+        print(recipe_helper.recipe_stats())
@@ -0,0 +1,93 @@
+# Ranking and scaling many candidate recipes against large pantries: the old
+# nested-loop substring matching (applied to every recipe) vs recipe_ranking's
+# indexed pantry. Synthetic Spoonacular-shaped recipes and pantry items.
+# Run from backend/: python benchmarks/bench_recipe_ranking.py
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from recipe_ranking import PantryIndex, rank_recipes
+
+RECIPE_COUNTS = (100, 300, 600)
+PANTRY_SIZES = (100, 300, 600)
+BASES = ["milk", "egg", "spinach", "banana", "cheddar cheese", "chicken breast", "tomato", "yogurt", "bread",
+         "carrot", "rice", "ground beef", "lettuce", "apple", "onion", "garlic", "butter", "flour", "potato",
+         "mushroom", "zucchini", "bell pepper", "salmon", "tofu", "cream", "basil", "lemon", "lime", "cucumber",
+         "broccoli", "cauliflower", "pork chop", "bacon", "ham", "turkey", "oat", "honey", "pear", "peach", "plum"]
+MODIFIERS = ["", "fresh", "chopped", "organic", "sliced", "whole", "low fat", "baby", "red", "green", "frozen"]
+RECIPE_UNITS = [("g", 50, 500), ("ml", 50, 500), ("cups", 1, 3), ("tbsp", 1, 4), ("", 1, 6), ("oz", 2, 16)]
+PANTRY_QUANTITIES = ["500g", "1 l", "2 cups", "12", "250 ml", "1 lb", "3", "medium", "small", "large"]
+
+
+def make_recipes(n, rng):
+    recipes = []
+    for i in range(n):
+        names = rng.sample(BASES, rng.randint(6, 14))
+        ingredients = []
+        for name in names:
+            unit, lo, hi = rng.choice(RECIPE_UNITS)
+            ingredients.append({"name": f"{rng.choice(MODIFIERS)} {name}".strip(), "amount": rng.randint(lo, hi),
+                                "unit": unit})
+        split = rng.randint(1, len(ingredients))
+        recipes.append({"id": i, "title": f"recipe {i}", "usedIngredients": ingredients[:split],
+                        "missedIngredients": ingredients[split:], "missedIngredientCount": len(ingredients) - split})
+    return recipes
+
+
+def make_pantry(n, rng):
+    today = date.today()
+    return [SimpleNamespace(name=f"{rng.choice(MODIFIERS)} {rng.choice(BASES)}".strip(),
+                            quantity=rng.choice(PANTRY_QUANTITIES),
+                            expiration=today + timedelta(days=rng.randint(-2, 20)))
+            for _ in range(n)]
+
+
+# The pre-change path, applied to every recipe: nested loop with substring
+# checks, "g"/"ml" stripped for quantities, min ratio as the scale.
+def old_scale_recipe(recipe, fridge_items):
+    scaling_factors = []
+    for r_item in recipe['usedIngredients']:
+        for f_item in fridge_items:
+            if f_item.name.lower() in r_item['name'].lower():
+                qty_str = f_item.quantity.replace("g", "").replace("ml", "").strip()
+                try:
+                    scaling_factors.append(float(qty_str) / r_item['amount'])
+                except Exception:
+                    scaling_factors.append(1.0)
+    scale = min(scaling_factors) if scaling_factors else 1.0
+    return [f"{r['name']}: {r['amount'] * scale:.2f} {r['unit']}" for r in recipe['usedIngredients']]
+
+
+def old_rank(recipes, fridge_items, k=3):
+    def score(recipe):
+        used = recipe["usedIngredients"]
+        return sum(1 for item in fridge_items if any(item.name.lower() in r["name"].lower() for r in used))
+    ranked = sorted(recipes, key=score, reverse=True)[:k]
+    return [(recipe, old_scale_recipe(recipe, fridge_items)) for recipe in ranked]
+
+
+def best_of(fn, rounds=3):
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == "__main__":
+    rng = random.Random(11)
+    print(f"{'recipes':>8} {'pantry':>7} {'old ms':>9} {'indexed ms':>11} {'speedup':>8}")
+    for n_recipes in RECIPE_COUNTS:
+        recipes = make_recipes(n_recipes, rng)
+        for n_pantry in PANTRY_SIZES:
+            pantry = make_pantry(n_pantry, rng)
+            old_t = best_of(lambda: old_rank(recipes, pantry))
+            # index build included: it is rebuilt per request
+            new_t = best_of(lambda: rank_recipes(recipes, PantryIndex(pantry), k=3))
+            print(f"{n_recipes:8d} {n_pantry:7d} {old_t * 1000:9.1f} {new_t * 1000:11.1f} {old_t / new_t:7.1f}x")
@@ -0,0 +1,96 @@
+# Sustained /detect-food throughput with the same number of server workers,
+# without a vision timeout (the old behaviour) and with one. The fake vision
+# model has a slow tail, like a real upstream; the timeout frees the request
+# worker from a tail call instead of holding it for the full 5s.
+# Run from backend/: python benchmarks/bench_stage_timeouts.py
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+sys.path.insert(0, BENCH_DIR)
+
+WORKERS = 4          # server request threads in both runs
+CLIENTS = 16
+DURATION = 10        # seconds of load per run
+BASE_LATENCY, TAIL_LATENCY, TAIL_SHARE = 0.2, 5.0, 0.05
+VISION_TIMEOUT = 1.0
+
+
+def photo_bytes():
+    from PIL import Image
+    buf = io.BytesIO()
+    Image.new("RGB", (640, 480), (200, 40, 40)).save(buf, "JPEG")
+    return buf.getvalue()
+
+
+def run_load():
+    """Child process: serve the app and drive it; prints one JSON line."""
+    import requests
+    from fakes import FakeOpenAI, PooledServer, tail_latency, use_mongomock
+
+    use_mongomock()
+    import app as backend
+    import food_recognition
+    food_recognition.client = FakeOpenAI(tail_latency(BASE_LATENCY, TAIL_LATENCY, TAIL_SHARE))
+
+    user_id = backend.app.test_client().post(
+        "/add-user", json={"username": "bench", "name": "Bench", "password": "x"}).json["id"]
+    image = photo_bytes()
+    results = []
+    lock = threading.Lock()
+
+    def client(url, stop_at):
+        session = requests.Session()
+        while time.time() < stop_at:
+            start = time.perf_counter()
+            status = session.post(f"{url}/detect-food", data={"user_id": user_id},
+                                  files={"file": ("fridge.jpg", image, "image/jpeg")}).status_code
+            with lock:
+                results.append((status, time.perf_counter() - start))
+
+    with PooledServer(backend.app, WORKERS) as server:
+        stop_at = time.time() + DURATION
+        threads = [threading.Thread(target=client, args=(server.url, stop_at)) for _ in range(CLIENTS)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    latencies = sorted(latency for _, latency in results)
+    ok = sum(1 for status, _ in results if status == 200)
+    print(json.dumps({
+        "requests": len(results),
+        "ok": ok,
+        "timeouts": sum(1 for status, _ in results if status == 504),
+        "ok_per_sec": ok / DURATION,
+        "p50": statistics.median(latencies),
+        "p99": latencies[int(len(latencies) * 0.99) - 1],
+    }))
+
+
+if __name__ == "__main__":
+    if "--child" in sys.argv:
+        run_load()
+        sys.exit()
+
+    print(f"{WORKERS} workers, {CLIENTS} clients, {DURATION}s; vision {BASE_LATENCY}s "
+          f"({TAIL_SHARE:.0%} take {TAIL_LATENCY}s)")
+    print(f"{'timeout':>8} {'requests':>9} {'ok':>6} {'504':>5} {'ok/s':>7} {'p50 ms':>8} {'p99 ms':>8}")
+    for timeout in (0, VISION_TIMEOUT):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, VISION_TIMEOUT=str(timeout), VISION_CACHE="off",
+                       VISION_CACHE_PATH=os.path.join(tmp, "vision.sqlite3"))
+            out = subprocess.run([sys.executable, __file__, "--child"], env=env, cwd=os.path.join(BENCH_DIR, ".."),
+                                 capture_output=True, text=True, check=True).stdout
+        r = json.loads(next(line for line in out.splitlines() if line.startswith('{"requests"')))
+        label = f"{timeout:g}s" if timeout else "none"
+        print(f"{label:>8} {r['requests']:9d} {r['ok']:6d} {r['timeouts']:5d} {r['ok_per_sec']:7.1f} "
+              f"{r['p50'] * 1000:8.0f} {r['p99'] * 1000:8.0f}")
@@ -0,0 +1,112 @@
+# Cost of the tracing layer (metrics_helper) and of the FoodKeeper debug
+# output, then one traced /detect-food request and the /metrics it leaves.
+#
+# 1. map_to_product per call: the old DEBUG prints (stdout sent to /dev/null),
+#    levelled logging with DEBUG off, and the same with METRICS=off
+# 2. a bare span, for scale
+# 3. /detect-food on mongomock with a fake vision model: its Server-Timing
+#    header and the stage histograms served on /metrics?format=json
+# Run from backend/: python benchmarks/bench_tracing.py
+import contextlib
+import io
+import logging
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+sys.path.insert(0, BENCH_DIR)
+
+from fakes import FakeOpenAI, use_mongomock
+
+import expiration_helper
+import metrics_helper
+from expiration_helper import match_product, normalize_name
+
+CORPUS_PATH = os.path.join(BENCH_DIR, "receipt_names.txt")
+ROUNDS = 50
+VISION_LATENCY = 0.05
+
+
+# The pre-change map_to_product: always formats and prints its DEBUG lines
+def printing_map_to_product(name_raw):
+    print(f"DEBUG: Looking for '{name_raw}' -> normalized: '{normalize_name(name_raw)}'")
+    row_dict, kind, score = match_product(name_raw)
+    if kind == "keyword":
+        print(f"DEBUG: Found keyword match: {row_dict.get('Keywords')}")
+    elif kind:
+        print(f"DEBUG: Found {kind} match: {row_dict.get('Name')}")
+    else:
+        print("DEBUG: No match found")
+    return row_dict
+
+
+def per_call_us(fn, names):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for name in names:
+            fn(name)
+    return (time.perf_counter() - start) / (ROUNDS * len(names)) * 1e6
+
+
+def span_us(n=200_000):
+    start = time.perf_counter()
+    for _ in range(n):
+        with metrics_helper.span("bench"):
+            pass
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def photo_bytes():
+    from PIL import Image
+    buf = io.BytesIO()
+    Image.new("RGB", (1024, 768), (30, 160, 60)).save(buf, "JPEG")
+    return buf.getvalue()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    with open(CORPUS_PATH) as f:
+        names = [line.strip() for line in f if line.strip()]
+    for name in names:      # warm the indexes and the fuzzy word cache
+        match_product(name)
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        printed = per_call_us(printing_map_to_product, names)
+    logged = per_call_us(expiration_helper.map_to_product, names)
+    metrics_helper.METRICS_ENABLED = False
+    untraced = per_call_us(expiration_helper.map_to_product, names)
+    no_span = span_us()
+    metrics_helper.METRICS_ENABLED = True
+    with_span = span_us()
+
+    print(f"map_to_product, {len(names)} receipt names x {ROUNDS} rounds (us/call)")
+    print(f"{'DEBUG prints':>32} {printed:8.1f}")
+    print(f"{'logging off, metrics on':>32} {logged:8.1f}")
+    print(f"{'logging off, METRICS=off':>32} {untraced:8.1f}")
+    print(f"span: {with_span:.2f} us on, {no_span:.2f} us off")
+
+    use_mongomock()
+    import app as backend
+    import food_recognition
+
+    food_recognition.client = FakeOpenAI(lambda: VISION_LATENCY)
+    metrics_helper.METRICS.clear()
+    client = backend.app.test_client()
+    user_id = client.post("/add-user", json={"username": "bench", "name": "Bench", "password": "x"}).json["id"]
+    response = client.post("/detect-food", data={"user_id": user_id, "no_cache": "1",
+                                                 "file": (io.BytesIO(photo_bytes()), "fridge.jpg")})
+    assert response.status_code == 200, response.json
+    print(f"\n/detect-food Server-Timing: {response.headers['Server-Timing']}")
+
+    snapshot = client.get("/metrics?format=json").json
+    print(f"\n{'histogram':>40} {'count':>6} {'mean ms':>8} {'max ms':>8}")
+    for name, h in snapshot["histograms"].items():
+        print(f"{name:>40} {h['count']:6d} {h['mean'] * 1000:8.2f} {h['max'] * 1000:8.2f}")
+    print(f"\n{'counter':>40} {'value':>6}")
+    for name, value in snapshot["counters"].items():
+        print(f"{name:>40} {value:6d}")
+    text = client.get("/metrics").get_data(as_text=True)
+    print(f"\nPrometheus text: {len(text.splitlines())} lines, e.g.")
+    print("\n".join(line for line in text.splitlines() if "stage_vision_seconds" in line)[-400:])
@@ -0,0 +1,74 @@
+# Peak memory and latency of getting an uploaded photo to base64, for the old
+# save-under-client-filename-then-reopen path vs the spooled in-memory stream.
+# Run from backend/: python benchmarks/bench_upload_handling.py
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+from PIL import Image
+
+import app as backend
+from food_recognition import encode_image
+
+SIZES = ((1600, 1200), (3000, 2250), (4032, 3024))   # up to a 12 MP phone photo
+ROUNDS = 5
+
+
+def make_photo(size):
+    noise = Image.effect_noise(size, 60).convert("RGB")
+    buf = io.BytesIO()
+    noise.save(buf, "JPEG", quality=92)
+    return buf.getvalue()
+
+
+def upload(data, handle):
+    with backend.app.test_request_context(
+        "/detect-food", method="POST", data={"file": (io.BytesIO(data), "fridge.jpg")}
+    ):
+        return handle(backend.request.files["file"])
+
+
+def via_disk(workdir):
+    def handle(file):
+        os.makedirs(os.path.join(workdir, "images"), exist_ok=True)
+        file_path = os.path.join(workdir, "images", file.filename)
+        file.save(file_path)
+        return encode_image(file_path)
+    return handle
+
+
+def via_stream(file):
+    return encode_image(file.stream)
+
+
+def measure(data, handle):
+    times, peaks = [], []
+    for _ in range(ROUNDS):
+        tracemalloc.start()
+        start = time.perf_counter()
+        upload(data, handle)
+        times.append(time.perf_counter() - start)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return min(times), max(peaks)
+
+
+if __name__ == "__main__":
+    workdir = tempfile.mkdtemp()
+    try:
+        print(f"{'photo':>12} {'bytes':>10} {'disk ms':>9} {'disk MB':>8} {'stream ms':>10} {'stream MB':>10}")
+        for size in SIZES:
+            data = make_photo(size)
+            disk_t, disk_mem = measure(data, via_disk(workdir))
+            stream_t, stream_mem = measure(data, via_stream)
+            print(f"{size[0]:>5}x{size[1]:<6} {len(data):>10} {disk_t * 1000:9.1f} {disk_mem / 2**20:8.1f} "
+                  f"{stream_t * 1000:10.1f} {stream_mem / 2**20:10.1f}")
+    finally:
+        shutil.rmtree(workdir)
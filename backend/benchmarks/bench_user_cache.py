@@ -0,0 +1,84 @@
+# MongoDB round trips per request, with and without the user cache
+# (user_helper), on mongomock with every collection call counted as one round
+# trip. Also the per-row dereference the Food listing avoids: Food.objects
+# with food.user read per row vs food_helper.list_foods.
+# Run from backend/: python benchmarks/bench_user_cache.py
+import os
+import sys
+from collections import Counter
+from datetime import datetime, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+sys.path.insert(0, BENCH_DIR)
+
+from fakes import count_mongo_operations, use_mongomock
+
+use_mongomock()
+OPERATIONS = count_mongo_operations()
+
+import app as backend
+import user_helper
+from food_helper import list_foods
+from models import Food, User
+
+REQUESTS = 20
+PANTRY_ROWS = 50
+
+
+def measure(send):
+    before = Counter(OPERATIONS)
+    for _ in range(REQUESTS):
+        response = send()
+        assert response.status_code == 200, response.get_json()
+    delta = Counter(OPERATIONS)
+    delta.subtract(before)
+    return {op: n / REQUESTS for op, n in delta.items() if n}
+
+
+def describe(ops):
+    return ", ".join(f"{op} {n:g}" for op, n in sorted(ops.items()))
+
+
+if __name__ == "__main__":
+    client = backend.app.test_client()
+    user_id = client.post("/add-user", json={"username": "bench", "name": "Bench", "password": "x"}).json["id"]
+    user = User.objects(username="bench").first()
+    now = datetime.now()
+    Food._get_collection().insert_many([
+        {"user": user.id, "name": "milk", "quantity": "medium", "expiration_date": now + timedelta(days=i % 10)}
+        for i in range(PANTRY_ROWS)
+    ])
+    Food.ensure_indexes()
+
+    routes = {
+        "GET /get-food": lambda: client.get(f"/get-food/{user_id}?limit=20"),
+        "GET /expiry-summary": lambda: client.get(f"/expiry-summary/{user_id}"),
+        "POST /add-foods": lambda: client.post("/add-foods", json={
+            "_id": user_id, "foods": [{"name": "milk", "quantity": "small"}, {"name": "eggs", "quantity": "large"}]}),
+        "POST /add-food": lambda: client.post("/add-food", json={"_id": user_id, "name": "yogurt",
+                                                                 "quantity": "small"}),
+    }
+    print(f"round trips per request, mean of {REQUESTS}")
+    print(f"{'route':>22} {'no cache':>9} {'cache':>6}  cached-path operations")
+    for label, send in routes.items():
+        user_helper.USER_CACHE_ENABLED = False
+        uncached = measure(send)
+        user_helper.USER_CACHE_ENABLED = True
+        user_helper.USER_CACHE.clear()
+        cached = measure(send)
+        print(f"{label:>22} {sum(uncached.values()):9.2f} {sum(cached.values()):6.2f}  {describe(cached)}")
+
+    # a write through the document drops the cached copy
+    user.name = "Renamed"
+    user.save()
+    assert user_helper.get_user(user.id).name == "Renamed"
+    print(f"user cache {user_helper.USER_CACHE.stats()}")
+
+    before = Counter(OPERATIONS)
+    rows = [{"name": food.name, "user": food.user.username} for food in Food.objects(user=user.id).limit(20)]
+    dereferencing = sum(Counter(OPERATIONS).values()) - sum(before.values())
+    before = Counter(OPERATIONS)
+    items, _ = list_foods(user.id, limit=20)
+    projected = sum(Counter(OPERATIONS).values()) - sum(before.values())
+    print(f"\n20 food rows: Food.objects + food.user {dereferencing} round trips, list_foods {projected}")
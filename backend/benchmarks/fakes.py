@@ -0,0 +1,169 @@
+# Offline stand-ins for the backend's external dependencies, shared by the
+# benchmarks: a fake OpenAI client, a fake tesseract binary, an in-memory
+# MongoDB (with an operation counter) and a WSGI server with a fixed number of
+# worker threads.
+import json
+import os
+import random
+import stat
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+os.environ.setdefault("OPENAI_API_KEY", "offline")
+
+DEFAULT_ITEMS = (("milk", "1"), ("bananas", "6"), ("eggs", "12"), ("spinach", "1"), ("cheddar cheese", "1"))
+
+
+class FakeOpenAI:
+    """Answers client.beta.chat.completions.parse(...) after `latency()` seconds.
+    `items` is a sequence of (name, quantity), or a callable returning one per call."""
+
+    def __init__(self, latency=lambda: 0.0, items=DEFAULT_ITEMS):
+        self.latency = latency
+        self.items = items
+        self.calls = 0
+        self._lock = threading.Lock()
+        self.beta = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(parse=self._parse)))
+
+    def _parse(self, response_format, **kwargs):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency())
+        items = self.items() if callable(self.items) else self.items
+        parsed = response_format.model_validate({"items": [{"name": n, "quantity": q} for n, q in items]})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(parsed=parsed))])
+
+
+def tail_latency(base, tail, tail_share):
+    """Latency sampler: `base` seconds, except `tail_share` of calls take `tail`."""
+    return lambda: tail if random.random() < tail_share else base
+
+
+# Called by pytesseract as: tesseract <image> <output base> [options...] txt
+FAKE_TESSERACT = """#!{python}
+import json, random, sys, time
+time.sleep({latency!r})
+header, lines, per_receipt = json.loads({payload!r})
+body = [f"{{name.upper()}}  {{random.randint(1, 3)}}  ${{random.randint(1, 9)}}.{{random.randint(0, 99):02d}}"
+        for name in random.sample(lines, min(per_receipt, len(lines)))]
+with open(sys.argv[2] + ".txt", "w") as out:
+    out.write("\\n".join(header + body + ["SUBTOTAL $52.10", "TAX $1.20", "TOTAL $53.30"]) + "\\n")
+"""
+
+
+def install_fake_tesseract(directory, item_names, latency=0.0, items_per_receipt=8):
+    """Write a `tesseract` executable into `directory` and put it first on PATH
+    (inherited by OCR worker processes). Each call sleeps `latency` seconds and
+    "reads" a receipt of items_per_receipt random names from item_names."""
+    payload = json.dumps([["FRESH MART #112", "10/14/2025 5:42 PM"], list(item_names), items_per_receipt])
+    path = os.path.join(directory, "tesseract")
+    with open(path, "w") as f:
+        f.write(FAKE_TESSERACT.format(python=sys.executable, latency=latency, payload=payload))
+    os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR)
+    os.environ["PATH"] = directory + os.pathsep + os.environ.get("PATH", "")
+    return path
+
+
+def use_mongomock():
+    """Point mongoengine at an in-memory mongomock client."""
+    import mongoengine
+    import mongomock
+    import mongomock.collection
+    import models  # noqa: F401  (registers the documents, opens the default alias)
+
+    # mongomock re-encodes documents with default codec options, which reject
+    # native UUIDs; the real driver is configured for them below
+    mongomock.collection.BSON = None
+
+    # mongomock's Cursor.__next__ copies the remaining results on every call,
+    # which makes iterating a large cursor quadratic; index into them instead
+    def cursor_next(cursor):
+        results = cursor._compute_results()
+        position = cursor._skip + cursor._emitted
+        if position >= len(results) or (cursor._limit and cursor._emitted >= abs(cursor._limit)):
+            raise StopIteration
+        cursor._emitted += 1
+        return results[position]
+
+    mongomock.collection.Cursor.__next__ = mongomock.collection.Cursor.next = cursor_next
+    mongoengine.disconnect()
+    mongoengine.connect("freshly-yours-bench", host="mongodb://localhost",
+                        mongo_client_class=mongomock.MongoClient, uuidRepresentation="standard")
+
+
+def use_mongod(uri, db="freshly-yours-bench"):
+    """Point mongoengine at a local mongod, in a scratch database emptied first."""
+    import mongoengine
+    import models  # noqa: F401
+
+    mongoengine.disconnect()
+    mongoengine.connect(db, host=uri, uuidRepresentation="standard")
+    mongoengine.get_connection().drop_database(db)
+
+
+# Collection methods that each cost the real driver (at least) one round trip
+MONGO_OPERATIONS = ("find", "find_one", "insert_one", "insert_many", "update_one", "update_many", "replace_one",
+                    "delete_one", "delete_many", "count_documents", "aggregate", "bulk_write",
+                    "find_one_and_update", "find_one_and_delete", "create_index")
+
+
+def count_mongo_operations():
+    """Count calls to mongomock collection methods, as "<collection>.<method>";
+    returns the Counter, which keeps counting for the life of the process"""
+    import mongomock.collection
+
+    counts = Counter()
+    nested = threading.local()      # mongomock's find_one calls find: count the outer call only
+    for method in MONGO_OPERATIONS:
+        original = getattr(mongomock.collection.Collection, method)
+
+        def counted(collection, *args, _method=method, _original=original, **kwargs):
+            if getattr(nested, "active", False):
+                return _original(collection, *args, **kwargs)
+            counts[f"{collection.name}.{_method}"] += 1
+            nested.active = True
+            try:
+                return _original(collection, *args, **kwargs)
+            finally:
+                nested.active = False
+
+        setattr(mongomock.collection.Collection, method, counted)
+    return counts
+
+
+class PooledServer:
+    """Serve a WSGI app on 127.0.0.1 with exactly `workers` request threads."""
+
+    def __init__(self, app, workers):
+        from werkzeug.serving import BaseWSGIServer
+
+        pool = ThreadPoolExecutor(max_workers=workers)
+
+        class Server(BaseWSGIServer):
+            request_queue_size = 1024
+
+            def process_request(self, request, client_address):
+                pool.submit(self._handle, request, client_address)
+
+            def _handle(self, request, client_address):
+                try:
+                    self.finish_request(request, client_address)
+                finally:
+                    self.shutdown_request(request)
+
+        self.pool = pool
+        self.server = Server("127.0.0.1", 0, app)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+        self.pool.shutdown(wait=False, cancel_futures=True)
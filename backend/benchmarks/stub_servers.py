@@ -0,0 +1,68 @@
+# Local stand-ins for the external HTTP APIs the backend calls, with a
+# configurable per-request latency. Used by the benchmarks and tests.
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+NON_FOOD_WORDS = ("bag", "receipt", "store", "card", "visa", "thank")
+
+
+class StubServer:
+    """ThreadingHTTPServer on 127.0.0.1 that answers every GET via `respond`."""
+
+    def __init__(self, respond, latency=0.0):
+        self.respond = respond
+        self.latency = latency
+        self.calls = 0
+        self._calls_lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"   # keep-alive, so client pooling is exercised
+
+            def do_GET(self):
+                with stub._calls_lock:
+                    stub.calls += 1
+                time.sleep(stub.latency)
+                url = urlparse(self.path)
+                body = json.dumps(stub.respond(url.path, parse_qs(url.query))).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        ThreadingHTTPServer.request_queue_size = 128
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}"
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def usda_respond(path, query):
+    """FoodData Central search: anything not obviously non-food is a food."""
+    name = query.get("query", [""])[0].lower()
+    if any(word in name for word in NON_FOOD_WORDS):
+        return {"foods": []}
+    return {"foods": [{"description": name}]}
+
+
+def spoonacular_respond(path, query):
+    """findByIngredients: `number` recipes that use every ingredient asked for."""
+    ingredients = query.get("ingredients", [""])[0].split(",")
+    number = int(query.get("number", ["3"])[0])
+    return [{"id": i, "title": f"{ingredients[0]} dish {i}",
+             "usedIngredients": [{"name": name, "amount": 100, "unit": "g"} for name in ingredients]}
+            for i in range(number)]
@@ -1,6 +1,15 @@
+from collections import OrderedDict
 from datetime import datetime, timedelta
 import json
+import logging
 import os
+import threading
+from foodkeeper_fuzzy import FuzzyFoodIndex
+from foodkeeper_store import ProductTable, load_product_table
+from metrics_helper import inc, timed
+from text_helper import normalize_name
+
+logger = logging.getLogger(__name__)
 
 # Load JSON once at module level
 FOODKEEPER_DATA = None
@@ -12,50 +21,148 @@ def load_foodkeeper_data():
         try:
             with open(foodkeeper_path) as f:
                 FOODKEEPER_DATA = json.load(f)
-            print("DEBUG: Total products loaded:", len(FOODKEEPER_DATA["sheets"][2]["data"]))
+            logger.debug("Total products loaded: %d", len(FOODKEEPER_DATA["sheets"][2]["data"]))
         except FileNotFoundError:
-            print("WARNING: foodkeeper.json not found. Using default expiration dates.")
+            logger.warning("foodkeeper.json not found. Using default expiration dates.")
             FOODKEEPER_DATA = {"sheets": [None, None, {"data": []}]}
     return FOODKEEPER_DATA
 
-# Normalize text
-def normalize_name(name_raw: str) -> str:
-    name = name_raw.lower()
-    name = "".join(c for c in name if c.isalnum() or c.isspace())
-    for word in ["fresh", "organic", "bag", "pack", "slice", "sliced"]:
-        name = name.replace(word, "")
-    return name.strip()
+# Product sheet only, from foodkeeper.bin when compiled (see foodkeeper_store.py)
+PRODUCT_TABLE = None
+
+def load_product_data():
+    global PRODUCT_TABLE
+    if PRODUCT_TABLE is None:
+        try:
+            PRODUCT_TABLE = load_product_table()
+            logger.debug("Total products loaded: %d", len(PRODUCT_TABLE))
+        except FileNotFoundError:
+            logger.warning("foodkeeper.json not found. Using default expiration dates.")
+            PRODUCT_TABLE = ProductTable(0, {})
+    return PRODUCT_TABLE
+
+# Drop the loaded data, its index and every cached resolution so the next
+# lookup re-reads the FoodKeeper files
+def reload_foodkeeper_data():
+    global FOODKEEPER_DATA, PRODUCT_TABLE, FOODKEEPER_INDEX, FUZZY_INDEX
+    FOODKEEPER_DATA = None
+    PRODUCT_TABLE = None
+    FOODKEEPER_INDEX = None
+    FUZZY_INDEX = None
+    EXPIRATION_CACHE.clear()
+    return load_product_data()
+
+# Precompiled lookup structures over the Product sheet, built once per load
+class FoodKeeperIndex:
+    def __init__(self, table):
+        self.table = table      # ProductTable, rows in sheet order
+        self.names = []         # lowercased Name per row
+        self.haystacks = []     # lowercased Name + Keywords per row (partial tier)
+        self.exact = {}         # name -> first row index
+        self.keywords = {}      # keyword -> first row index
+        self.trigrams = {}      # trigram -> set of row indexes
+
+        for idx in range(len(table)):
+            name_field = (table.get("Name", idx) or "").lower()
+            keywords = (table.get("Keywords", idx) or "").lower()
+
+            self.names.append(name_field)
+            # normalize_name turns every run of whitespace into one space, so no
+            # query contains "\n" and none can match across the two fields
+            haystack = name_field + "\n" + keywords
+            self.haystacks.append(haystack)
+
+            self.exact.setdefault(name_field, idx)
+            if keywords:
+                for k in keywords.split(","):
+                    self.keywords.setdefault(k.strip(), idx)
+
+            for i in range(len(haystack) - 2):
+                self.trigrams.setdefault(haystack[i:i + 3], set()).add(idx)
+
+    def _candidates(self, normalized, limit):
+        if len(normalized) < 3:
+            return range(limit)
+        postings = []
+        for i in range(len(normalized) - 2):
+            rows = self.trigrams.get(normalized[i:i + 3])
+            if not rows:
+                return ()
+            postings.append(rows)
+        postings.sort(key=len)
+        found = set(postings[0])
+        for rows in postings[1:]:
+            found &= rows
+            if not found:
+                return ()
+        return sorted(idx for idx in found if idx < limit)
+
+    # Same row the sheet-order scan would return: the earliest row whose Name or
+    # Keywords match exactly, by keyword, or by substring. Returns (row, kind).
+    def lookup(self, normalized):
+        limit = len(self.table)
+        best = min(self.exact.get(normalized, limit), self.keywords.get(normalized, limit))
+
+        for idx in self._candidates(normalized, best):
+            if normalized in self.haystacks[idx]:
+                best = idx
+                break
+
+        if best == limit:
+            return None, None
+        keywords = self.haystacks[best][len(self.names[best]) + 1:]
+        if normalized == self.names[best]:
+            kind = "exact"
+        elif keywords and normalized in [k.strip() for k in keywords.split(",")]:
+            kind = "keyword"
+        else:
+            kind = "partial"
+        return self.table.row(best), kind
+
+
+FOODKEEPER_INDEX = None
+
+def get_foodkeeper_index():
+    global FOODKEEPER_INDEX
+    if FOODKEEPER_INDEX is None:
+        FOODKEEPER_INDEX = FoodKeeperIndex(load_product_data())
+    return FOODKEEPER_INDEX
+
+FUZZY_INDEX = None
+
+def get_fuzzy_index():
+    global FUZZY_INDEX
+    if FUZZY_INDEX is None:
+        FUZZY_INDEX = FuzzyFoodIndex(load_product_data())
+    return FUZZY_INDEX
+
+# (product row, kind, score): exact/keyword/partial lookup first, then the
+# fuzzy matcher for abbreviated or misspelled names ("bnls chkn brst"). Both
+# see only the normalized name, which is what resolve_food caches on.
+def match_product(name_raw: str):
+    normalized = normalize_name(name_raw)
+    row_dict, kind = get_foodkeeper_index().lookup(normalized)
+    if row_dict is not None:
+        return row_dict, kind, 1.0
+    row_dict, score = get_fuzzy_index().match(normalized)
+    return row_dict, "fuzzy" if row_dict is not None else None, score
 
 # Map name to product row
+@timed("foodkeeper.match")
 def map_to_product(name_raw: str):
-    data = load_foodkeeper_data()
-    normalized = normalize_name(name_raw)
-    print(f"DEBUG: Looking for '{name_raw}' -> normalized: '{normalized}'")
-
-    for row in data["sheets"][2]["data"]:
-        row_dict = {k: v for d in row for k, v in d.items()}
-
-        # Exact name match
-        name_field = (row_dict.get("Name") or "").lower()
-        if normalized == name_field:
-            print(f"DEBUG: Found exact match: {row_dict.get('Name')}")
-            return row_dict
-
-        # Keyword match
-        keywords = (row_dict.get("Keywords") or "").lower()
-        if keywords:
-            keyword_list = [k.strip() for k in keywords.split(',')]
-            if normalized in keyword_list:
-                print(f"DEBUG: Found keyword match: {row_dict.get('Keywords')}")
-                return row_dict
-
-        # Partial match
-        if normalized in name_field or normalized in keywords:
-            print(f"DEBUG: Found partial match: {row_dict.get('Name')}")
-            return row_dict
-
-    print("DEBUG: No match found")
-    return None
+    row_dict, kind, score = match_product(name_raw)
+    inc("foodkeeper.matches", kind=kind or "none")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Looking for %r -> normalized: %r", name_raw, normalize_name(name_raw))
+        if kind == "keyword":
+            logger.debug("Found keyword match: %s", row_dict.get("Keywords"))
+        elif kind == "fuzzy":
+            logger.debug("Found fuzzy match: %s (score %.2f)", row_dict.get("Name"), score)
+        elif kind:
+            logger.debug("Found %s match: %s", kind, row_dict.get("Name"))
+        else:
+            logger.debug("No match found (best fuzzy score %.2f)", score)
+    return row_dict
 
 # If no expiration...fallback?
 def fallback_expiration(name: str):
@@ -115,30 +222,99 @@ def convert_to_days(value, metric):
     else:
         return value  # default to days if unknown
 
-# Compute expiration date
-def get_expiration_date(product_row):
+# Shelf life in days for a product row, or None
+def get_shelf_life_days(product_row):
     if not product_row:
         return None
     refrig_info = get_refrigeration_info(product_row)
     if not refrig_info:
-        print("DEBUG: No refrigeration info available")
+        logger.debug("No refrigeration info available")
         return None
     days = convert_to_days(refrig_info["days"], refrig_info["metric"])
     if days is None:
-        print("DEBUG: Could not convert days")
+        logger.debug("Could not convert days")
+        return None
+    return days
+
+# Compute expiration date
+def get_expiration_date(product_row):
+    return expiration_from_days(get_shelf_life_days(product_row))
+
+def expiration_from_days(days):
+    if days is None:
         return None
     expiration_date = datetime.now() + timedelta(days=days)
     return expiration_date.date()  # Return date object instead of string
 
+# Bounded, thread-safe LRU of normalized name -> (product row, shelf-life days, source).
+# Only the shelf life is cached; the date is recomputed against now on every hit.
+class ExpirationCache:
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
+
+
+EXPIRATION_CACHE = ExpirationCache(int(os.getenv("EXPIRATION_CACHE_SIZE", "1024")))
+
+# (product row, shelf-life days, source) for a food name, through the cache
+def resolve_food(food_name: str):
+    key = normalize_name(food_name)
+    entry = EXPIRATION_CACHE.get(key)
+    if entry is None:
+        product_row = map_to_product(food_name)
+        refrig_info = get_refrigeration_info(product_row) if product_row else None
+        entry = (product_row, get_shelf_life_days(product_row), refrig_info['source'] if refrig_info else None)
+        EXPIRATION_CACHE.put(key, entry)
+    return entry
+
+# FoodKeeper category name, or None when the food isn't matched
+def get_food_category(food_name: str):
+    product_row = resolve_food(food_name)[0]
+    return product_row.get("Category_Name") if product_row else None
+
 # Full pipeline
 def get_food_expiration(food_name: str):
-    product_row = map_to_product(food_name)
-    expiration_date = get_expiration_date(product_row)
-    refrig_info = get_refrigeration_info(product_row) if product_row else None
+    product_row, days, source = resolve_food(food_name)
 
     return {
         "raw_name": food_name,
-        "expiration_date": expiration_date,
+        "expiration_date": expiration_from_days(days),
         "product_found": product_row is not None,
-        "data_source": refrig_info['source'] if refrig_info else None
-    }
\ No newline at end of file
+        "data_source": source
+    }
@@ -0,0 +1,119 @@
+# expiry_engine.py
+# "What expires soon?" over whole pantries, computed in one vectorized pass.
+#
+# Rows come straight off the food collection, projected to the four fields
+# needed. Days-left, expiring-within-N buckets and per-category/quantity
+# counts are then NumPy operations over the whole batch, grouped by user with
+# bincount. This works the same for one user's history or for every user.
+from datetime import date
+
+import numpy as np
+
+from models import Food
+from expiration_helper import get_food_category
+
+DEFAULT_WINDOWS = (0, 1, 2, 3, 7)      # days
+UNCATEGORIZED = "Uncategorized"
+
+
+def _load_rows(query):
+    users, names, quantities, dates = [], [], [], []
+    cursor = Food._get_collection().find(
+        query, {"_id": 0, "user": 1, "name": 1, "quantity": 1, "expiration_date": 1}
+    ).batch_size(5000)
+    for row in cursor:
+        if row.get("expiration_date") is None:
+            continue
+        users.append(str(row["user"]))
+        names.append(row.get("name") or "")
+        quantities.append(row.get("quantity") or "")
+        dates.append(row["expiration_date"])
+    return users, names, quantities, dates
+
+
+def _factorize(values):
+    """(distinct values in first-seen order, int index of each value)"""
+    codes = {}
+    idx = np.fromiter((codes.setdefault(v, len(codes)) for v in values), np.int64, len(values))
+    return list(codes), idx
+
+
+def _grouped_counts(group_idx, n_groups, code_idx, n_codes, mask=None):
+    """(n_groups, n_codes) matrix counting rows per (group, code), optionally masked"""
+    flat = group_idx * n_codes + code_idx
+    if mask is not None:
+        flat = flat[mask]
+    return np.bincount(flat, minlength=n_groups * n_codes).reshape(n_groups, n_codes)
+
+
+def expiry_summaries(user_ids=None, windows=DEFAULT_WINDOWS, today=None):
+    """{user_id: summary} for the given users (all users when None).
+
+    A summary has total, expired, expiring_within {N: count of items with
+    0 <= days_left <= N}, next_expiration, and by_category/by_quantity counts
+    of total and expiring items (within the largest window).
+    """
+    query = {} if user_ids is None else {"user": {"$in": list(user_ids)}}
+    return summarize_rows(*_load_rows(query), windows=windows, today=today)
+
+
+def summarize_rows(users, names, quantities, dates, windows=DEFAULT_WINDOWS, today=None):
+    """The computation behind expiry_summaries, over parallel column lists."""
+    if not users:
+        return {}
+
+    windows = sorted(set(windows))
+    today = today or date.today()
+    # proleptic ordinals: much cheaper than converting datetimes to datetime64
+    days_left = np.fromiter((d.toordinal() for d in dates), np.int64, len(dates)) - today.toordinal()
+
+    user_keys, user_idx = _factorize(users)
+    n_users = len(user_keys)
+
+    # categories are resolved once per distinct name, not per row
+    name_keys, name_idx = _factorize(names)
+    category_keys, name_category = _factorize([get_food_category(name) or UNCATEGORIZED for name in name_keys])
+    category_idx = name_category[name_idx]
+
+    quantity_keys, quantity_idx = _factorize(quantities)
+
+    upcoming = days_left >= 0
+    soon = upcoming & (days_left <= windows[-1])
+    totals = np.bincount(user_idx, minlength=n_users)
+    expired = np.bincount(user_idx, weights=~upcoming, minlength=n_users).astype(np.int64)
+    within = {n: np.bincount(user_idx, weights=upcoming & (days_left <= n), minlength=n_users).astype(np.int64)
+              for n in windows}
+
+    # soonest non-expired date per user
+    next_days = np.full(n_users, np.iinfo(np.int64).max)
+    np.minimum.at(next_days, user_idx[upcoming], days_left[upcoming])
+
+    by_category = _grouped_counts(user_idx, n_users, category_idx, len(category_keys))
+    by_category_soon = _grouped_counts(user_idx, n_users, category_idx, len(category_keys), soon)
+    by_quantity = _grouped_counts(user_idx, n_users, quantity_idx, len(quantity_keys))
+
+    summaries = {}
+    for u, user_id in enumerate(user_keys):
+        summaries[user_id] = {
+            "total": int(totals[u]),
+            "expired": int(expired[u]),
+            "expiring_within": {str(n): int(within[n][u]) for n in windows},
+            "next_expiration": (date.fromordinal(today.toordinal() + int(next_days[u])).isoformat()
+                                if next_days[u] != np.iinfo(np.int64).max else None),
+            "by_category": {
+                category_keys[c]: {"total": int(by_category[u, c]), "expiring": int(by_category_soon[u, c])}
+                for c in np.flatnonzero(by_category[u])
+            },
+            "by_quantity": {quantity_keys[q]: int(by_quantity[u, q]) for q in np.flatnonzero(by_quantity[u])},
+        }
+    return summaries
+
+
+def expiry_summary(user_id, windows=DEFAULT_WINDOWS, today=None):
+    """Summary for one user (see expiry_summaries); an empty one if they have no food."""
+    summary = expiry_summaries([user_id], windows, today).get(str(user_id))
+    if summary is None:
+        windows = sorted(set(windows))
+        summary = {"total": 0, "expired": 0, "expiring_within": {str(n): 0 for n in windows},
+                   "next_expiration": None, "by_category": {}, "by_quantity": {}}
+    return summary
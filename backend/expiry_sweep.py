@@ -0,0 +1,157 @@
+# expiry_sweep.py
+# Nightly "expiring soon" digests for every user.
+#
+# One cursor walks the food items that expire between SWEEP_EXPIRED_DAYS ago
+# and SWEEP_HORIZON_DAYS from now, in (user, expiration_date) order, which the
+# food index serves directly. Each user's rows arrive together, so a digest is
+# complete as soon as the user changes: only the current user's digest is held
+# in memory, plus the finished ones waiting to be written. Those are written
+# every SWEEP_BATCH_ROWS rows, followed by a checkpoint naming the last
+# finished user. A sweep that stops early resumes after that user. Digests are
+# keyed by run and user, so a batch replayed after a crash adds nothing twice.
+#
+# python expiry_sweep.py [--date YYYY-MM-DD] [--max-rows N] [--restart]
+import argparse
+import logging
+import os
+import time
+from datetime import date, datetime, timedelta
+
+from pymongo.errors import BulkWriteError
+
+from models import Food, ExpiryDigest, SweepCheckpoint
+
+logger = logging.getLogger(__name__)
+
+SWEEP_HORIZON_DAYS = int(os.getenv("SWEEP_HORIZON_DAYS", "3"))
+SWEEP_EXPIRED_DAYS = int(os.getenv("SWEEP_EXPIRED_DAYS", "7"))      # expired items still worth a reminder
+SWEEP_BATCH_ROWS = int(os.getenv("SWEEP_BATCH_ROWS", "10000"))      # rows between checkpoints
+SWEEP_DIGEST_ITEMS = int(os.getenv("SWEEP_DIGEST_ITEMS", "20"))     # items listed per digest
+
+DUPLICATE_KEY = 11000
+
+
+def _write_digests(digests):
+    if not digests:
+        return
+    try:
+        ExpiryDigest._get_collection().insert_many(digests, ordered=False)
+    except BulkWriteError as e:
+        # written by an earlier attempt that stopped before its checkpoint
+        if any(err.get("code") != DUPLICATE_KEY for err in e.details.get("writeErrors", [])):
+            raise
+
+
+class ExpirySweep:
+    def __init__(self, run_date=None, horizon_days=SWEEP_HORIZON_DAYS, expired_days=SWEEP_EXPIRED_DAYS,
+                 batch_rows=SWEEP_BATCH_ROWS, digest_items=SWEEP_DIGEST_ITEMS):
+        run_date = run_date or date.today()
+        self.run = run_date.isoformat()
+        self.today = datetime.combine(run_date, datetime.min.time())
+        self.window = (self.today - timedelta(days=expired_days), self.today + timedelta(days=horizon_days + 1))
+        self.batch_rows = batch_rows
+        self.digest_items = digest_items
+
+    def _digest(self, user):
+        return {"_id": f"{self.run}:{user}", "run": self.run, "user": user,
+                "expired": 0, "expiring": 0, "next_expiration": None, "items": []}
+
+    def _add(self, digest, row):
+        expiration = row["expiration_date"]
+        if expiration < self.today:
+            digest["expired"] += 1
+            return
+        digest["expiring"] += 1
+        if digest["next_expiration"] is None:       # rows arrive soonest first
+            digest["next_expiration"] = expiration
+        if len(digest["items"]) < self.digest_items:
+            digest["items"].append({"food_id": str(row["_id"]), "name": row.get("name"),
+                                    "quantity": row.get("quantity"), "expiration_date": expiration})
+
+    def _cursor(self, after_user):
+        query = {"expiration_date": {"$gte": self.window[0], "$lt": self.window[1]}}
+        if after_user is not None:
+            query["user"] = {"$gt": after_user}
+        return Food._get_collection().find(
+            query, {"user": 1, "name": 1, "quantity": 1, "expiration_date": 1}
+        ).sort([("user", 1), ("expiration_date", 1), ("_id", 1)]).batch_size(min(self.batch_rows, 10000))
+
+    def _flush(self, checkpoint, finished, done):
+        _write_digests(finished)
+        checkpoint.rows += sum(d["expired"] + d["expiring"] for d in finished)
+        checkpoint.users += len(finished)
+        if finished:
+            checkpoint.last_user = finished[-1]["user"]
+        checkpoint.status = "done" if done else "running"
+        checkpoint.updated_at = datetime.utcnow()
+        checkpoint.save()
+        finished.clear()
+
+    def run_once(self, max_rows=None, restart=False):
+        """Sweep, resuming this run's checkpoint if there is one; returns stats.
+
+        With max_rows, stop at the first user boundary after reading that many
+        rows (status "running"); calling again carries on from there.
+        """
+        if restart:
+            SweepCheckpoint.objects(id=self.run).delete()
+            ExpiryDigest.objects(run=self.run).delete()
+        checkpoint = SweepCheckpoint.objects(id=self.run).first() or SweepCheckpoint(id=self.run, status="running")
+        if checkpoint.status == "done":
+            return self._stats(checkpoint, 0, 0.0)
+
+        start = mark = time.perf_counter()
+        rows_read = rows_pending = 0
+        finished, current, done = [], None, True
+        for row in self._cursor(checkpoint.last_user):
+            if current is None or row["user"] != current["user"]:
+                if current is not None:
+                    finished.append(current)
+                    if max_rows is not None and rows_read >= max_rows:
+                        done = False
+                        break
+                    if rows_pending >= self.batch_rows:
+                        now = time.perf_counter()
+                        checkpoint.elapsed += now - mark
+                        mark = now
+                        self._flush(checkpoint, finished, done=False)
+                        rows_pending = 0
+                        logger.info("Sweep %s: %d users, %d rows, %.0f rows/sec", self.run,
+                                    checkpoint.users, checkpoint.rows, rows_read / (now - start))
+                current = self._digest(row["user"])
+            self._add(current, row)
+            rows_read += 1
+            rows_pending += 1
+        else:
+            if current is not None:
+                finished.append(current)
+
+        checkpoint.elapsed += time.perf_counter() - mark
+        self._flush(checkpoint, finished, done=done)
+        return self._stats(checkpoint, rows_read, time.perf_counter() - start)
+
+    def _stats(self, checkpoint, rows_read, seconds):
+        return {
+            "run": self.run,
+            "status": checkpoint.status,
+            "users": checkpoint.users,
+            "rows": checkpoint.rows,
+            "rows_read": rows_read,
+            "seconds": round(seconds, 3),
+            "rows_per_sec": round(rows_read / seconds) if seconds else None,
+            "total_seconds": round(checkpoint.elapsed, 3),
+        }
+
+
+def run_sweep(run_date=None, max_rows=None, restart=False, **options):
+    return ExpirySweep(run_date, **options).run_once(max_rows=max_rows, restart=restart)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write per-user expiring-soon digests.")
+    parser.add_argument("--date", type=date.fromisoformat, default=None, help="run date (default today)")
+    parser.add_argument("--max-rows", type=int, default=None, help="stop after about this many rows")
+    parser.add_argument("--restart", action="store_true", help="discard this run's checkpoint and digests")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    print(run_sweep(args.date, max_rows=args.max_rows, restart=args.restart))
@@ -0,0 +1,184 @@
+# food_helper.py
+# Building, persisting and listing Food documents for the routes in app.py.
+import base64
+from datetime import datetime, time, timedelta
+from bson import ObjectId
+from mongoengine import ValidationError
+from pymongo.errors import BulkWriteError
+from models import Food
+from expiration_helper import get_food_expiration, fallback_expiration
+from metrics_helper import inc, span
+from pantry_summary import record_added, record_removed
+from text_helper import normalize_name, singular
+
+QUANTITIES = ("small", "medium", "large")
+
+
+def normalize_quantity(quantity):
+    quantity = (quantity or "medium").lower()
+    return quantity if quantity in QUANTITIES else "medium"
+
+
+# Food document for one detected/parsed item, with its expiration resolved
+def build_food(user, name, quantity):
+    name = name or "Unknown"
+    quantity = normalize_quantity(quantity)
+    expiration_date = get_food_expiration(name).get("expiration_date") or fallback_expiration(name)
+    return Food(user=user, name=name, quantity=quantity, expiration_date=expiration_date)
+
+
+# Items are the same food when their normalized names match word for word,
+# singular or plural: "Eggs", "egg" and "Fresh eggs" are one item
+def item_key(name):
+    words = normalize_name(name or "").split()
+    return " ".join(singular(word) for word in words) or (name or "").strip().lower()
+
+
+# Merge the items detected in several photos (one list of (name, quantity)
+# per photo) by item_key, since overlapping shots of one fridge see the same
+# food twice. Returns [{"name", "quantity", "images"}] in first-seen order:
+# the first spelling of a name is kept, the largest quantity wins, and
+# "images" lists the photo indexes it was seen in.
+def merge_detected_items(per_image):
+    merged = {}
+    for index, items in enumerate(per_image):
+        for name, quantity in items:
+            key, quantity = item_key(name), normalize_quantity(quantity)
+            item = merged.get(key)
+            if item is None:
+                merged[key] = {"name": name, "quantity": quantity, "images": [index]}
+                continue
+            if QUANTITIES.index(quantity) > QUANTITIES.index(item["quantity"]):
+                item["quantity"] = quantity
+            if item["images"][-1] != index:
+                item["images"].append(index)
+    return list(merged.values())
+
+
+def food_to_json(food):
+    return {
+        "name": food.name,
+        "quantity": food.quantity,
+        "expiration_date": food.expiration_date.isoformat(),
+        "food_id": str(food.id)
+    }
+
+
+# Validate every Food, then write the valid ones with a single insert_many.
+# Returns (saved, failed): saved is a list of Foods with their ids set, failed
+# a list of {"index", "name", "error"} using each item's position in `foods`.
+def bulk_save_foods(foods):
+    saved, failed, pending = [], [], []
+    for index, food in enumerate(foods):
+        try:
+            food.validate()
+            pending.append((index, food))
+        except ValidationError as e:
+            failed.append({"index": index, "name": food.name, "error": str(e)})
+
+    if not pending:
+        return saved, failed
+
+    docs = [food.to_mongo() for _, food in pending]
+    write_errors = {}
+    try:
+        # unordered: one bad document doesn't stop the rest of the batch
+        with span("db.insert_foods"):
+            Food._get_collection().insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        write_errors = {err["index"]: err.get("errmsg", "write failed") for err in e.details.get("writeErrors", [])}
+
+    for pos, (index, food) in enumerate(pending):
+        if pos in write_errors:
+            failed.append({"index": index, "name": food.name, "error": write_errors[pos]})
+            continue
+        # as QuerySet.insert(load_bulk=False) does: only the primary key is set
+        food.pk = docs[pos]["_id"]
+        saved.append(food)
+
+    failed.sort(key=lambda f: f["index"])
+    record_added(saved)
+    inc("db.foods", len(saved), result="saved")
+    inc("db.foods", len(failed), result="failed")
+    return saved, failed
+
+
+# Delete one of the user's foods by id. Returns the removed row, or None if
+# the user has no such food.
+def delete_food(user_id, food_id):
+    with span("db.delete_food"):
+        row = Food._get_collection().find_one_and_delete(
+            {"_id": food_id, "user": user_id},
+            projection={"user": 1, "name": 1, "quantity": 1, "expiration_date": 1}
+        )
+    if row is not None:
+        record_removed([row])
+        inc("db.foods", result="deleted")
+    return row
+
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 1000
+LIST_FIELDS = ("name", "quantity", "expiration_date")
+
+
+# Opaque keyset cursor: the (expiration_date, _id) of the last row on a page
+def encode_cursor(expiration_date, food_id):
+    raw = f"{expiration_date.isoformat()}|{food_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        expiration, food_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(expiration), ObjectId(food_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+# A user's food, filtered in the query and projected to LIST_FIELDS. The user
+# is matched by id, never dereferenced. With a limit, one page sorted by
+# (expiration_date, _id); with limit=None, every match in stored order, as
+# /get-food has always returned them. Returns (items, next_cursor);
+# next_cursor is None on the last page and when not paginating.
+def list_foods(user_id, limit=None, cursor=None, before=None, after=None, expiring_within=None):
+    expiry = {}
+    if after is not None:
+        expiry["$gt"] = after
+    if before is not None:
+        expiry["$lt"] = before
+    if expiring_within is not None:
+        today = datetime.combine(datetime.now().date(), time.min)
+        expiry["$gte"] = today
+        end = today + timedelta(days=expiring_within + 1)
+        expiry["$lt"] = min(end, expiry.get("$lt", end))
+
+    query = {"user": user_id}
+    if expiry:
+        query["expiration_date"] = expiry
+    if cursor and limit is None:
+        limit = DEFAULT_PAGE_SIZE
+    if cursor:
+        last_expiration, last_id = decode_cursor(cursor)
+        query["$or"] = [
+            {"expiration_date": {"$gt": last_expiration}},
+            {"expiration_date": last_expiration, "_id": {"$gt": last_id}},
+        ]
+
+    rows = Food._get_collection().find(query, {field: 1 for field in LIST_FIELDS})
+    if limit is not None:
+        rows = rows.sort([("expiration_date", 1), ("_id", 1)]).limit(limit + 1)
+    rows = list(rows)
+
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["expiration_date"], rows[-1]["_id"])
+
+    items = [{
+        "food_id": str(row["_id"]),
+        "name": row.get("name"),
+        "quantity": row.get("quantity"),
+        "expiration_date": row["expiration_date"].isoformat() if row.get("expiration_date") else None
+    } for row in rows]
+    return items, next_cursor
@@ -0,0 +1,254 @@
+# food_recognition.py
+# Food recognition and zero-waste recipes for the API: image preprocessing,
+# the cached vision-model call, FoodKeeper expiration dates and the recipe
+# built from expiring items. Nothing heavy happens at import: the OpenAI
+# client (and the openai package) load on the first vision call. The Gradio
+# demo lives in test_image_detection.py.
+from pydantic import BaseModel
+import base64
+import hashlib
+import io
+import logging
+import threading
+from typing import List, Optional
+from dotenv import load_dotenv
+import os
+from datetime import date, timedelta
+from PIL import Image, ImageOps, UnidentifiedImageError
+from expiration_helper import get_food_expiration
+from cache_helper import TTLCache, DiskCache, TieredCache
+from recipe_helper import zero_waste_recipe
+from metrics_helper import inc, span
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+# -------------------- Utilities --------------------
+def read_image(image):
+    """Raw bytes of an image given as a path, bytes, or a readable file-like object."""
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        return bytes(image)
+    if hasattr(image, "read"):
+        if hasattr(image, "seek"):
+            image.seek(0)
+        return image.read()
+    with open(image, "rb") as image_file:
+        return image_file.read()
+
+
+# "detail": "low" means the model sees at most a 512x512 version of the image,
+# so anything larger is only extra upload and encode time.
+VISION_MAX_SIDE = int(os.getenv("VISION_MAX_SIDE", "512"))
+VISION_JPEG_QUALITY = int(os.getenv("VISION_JPEG_QUALITY", "85"))
+
+
+def preprocess_image(image) -> bytes:
+    """
+    Apply EXIF orientation, shrink to VISION_MAX_SIDE on the long edge and
+    re-encode as JPEG. Bytes Pillow can't read are passed through unchanged.
+    """
+    raw = read_image(image)
+    try:
+        with Image.open(io.BytesIO(raw)) as img:
+            # let libjpeg decode at a reduced scale instead of full resolution
+            img.draft("RGB", (VISION_MAX_SIDE, VISION_MAX_SIDE))
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail((VISION_MAX_SIDE, VISION_MAX_SIDE), Image.LANCZOS)
+            if img.mode != "RGB":
+                img = img.convert("RGB")
+            out = io.BytesIO()
+            img.save(out, "JPEG", quality=VISION_JPEG_QUALITY, optimize=True)
+    except (UnidentifiedImageError, OSError) as e:
+        logger.debug("Sending original image bytes, could not preprocess: %s", e)
+        return raw
+    return out.getvalue()
+
+
+def encode_image(image):
+    return base64.b64encode(preprocess_image(image)).decode('utf-8')
+
+
+openai_api_key = os.getenv("OPENAI_API_KEY")
+
+# Built on first use; assign a client here to substitute one (benchmarks do)
+client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global client
+    with _client_lock:
+        if client is None:
+            from openai import OpenAI
+            client = OpenAI(api_key=openai_api_key)
+        return client
+
+
+# -------------------- Data Models --------------------
+class Food(BaseModel):
+    name: str
+    quantity: str
+    expiration: Optional[date] = date.today() + timedelta(days=1)
+
+
+class Items(BaseModel):
+    items: List[Food]
+
+
+# -------------------- Food Recognition --------------------
+VISION_MODEL = "gpt-4o-mini"
+RECOGNITION_PROMPT = (
+    "You are an expert in recognising individual food items and their quantity. "
+    "Give count(number) for countable items and an estimate for liquid/mixed items. "
+    "Return items as name and quantity without duplicates."
+)
+
+# Parsed model output keyed by image content + prompt/model. Expiration dates
+# are not part of the cached value; they are recomputed on every call.
+RECOGNITION_CACHE = TieredCache(
+    TTLCache(maxsize=int(os.getenv("VISION_CACHE_SIZE", "256")),
+             ttl=int(os.getenv("VISION_CACHE_TTL", str(24 * 3600)))),
+    DiskCache(os.getenv("VISION_CACHE_PATH", os.path.join(os.path.dirname(__file__), "vision_cache.sqlite3")),
+              table="recognitions",
+              ttl=int(os.getenv("VISION_CACHE_TTL", str(24 * 3600)))),
+)
+VISION_CACHE_ENABLED = os.getenv("VISION_CACHE", "on") != "off"
+
+
+def recognition_cache_key(image_bytes: bytes) -> str:
+    digest = hashlib.sha256()
+    for part in (VISION_MODEL, RECOGNITION_PROMPT):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    digest.update(image_bytes)
+    return digest.hexdigest()
+
+
+def detect_items(image, use_cache: bool = True) -> Items:
+    """
+    The vision model's items for an image, without expiration dates (each keeps
+    the model default). `image` may be a file path, raw bytes or a file-like
+    object. Repeat images are answered from RECOGNITION_CACHE unless `use_cache` is False.
+    """
+    with span("vision.preprocess"):
+        image_bytes = preprocess_image(image)
+    use_cache = use_cache and VISION_CACHE_ENABLED
+    cache_key = recognition_cache_key(image_bytes) if use_cache else None
+
+    cached = RECOGNITION_CACHE.get(cache_key) if use_cache else None
+    if cached is not None:
+        inc("vision.cache", result="hit")
+        return Items.model_validate(cached)
+    inc("vision.cache", result="miss" if use_cache else "skipped")
+    with span("vision.model"):
+        foods = _call_vision_model(image_bytes)
+    if use_cache:
+        RECOGNITION_CACHE.set(cache_key, foods.model_dump(mode="json", exclude={"items": {"__all__": {"expiration"}}}))
+    return foods
+
+
+def recognize_items(image, use_cache: bool = True) -> Items:
+    """
+    Recognize food items in an image and ensure each Food object has a valid expiration date.
+    `image` may be a file path, raw bytes or a file-like object. Repeat images are
+    answered from RECOGNITION_CACHE unless `use_cache` is False.
+    """
+    foods = detect_items(image, use_cache)
+
+    # Update expiration dates using FoodKeeper data
+    with span("vision.expiration"):
+        for f in foods.items:
+            expiration_info = get_food_expiration(f.name)
+            if expiration_info["expiration_date"]:
+                f.expiration = expiration_info["expiration_date"]
+                logger.debug("Set expiration for %s to %s", f.name, f.expiration)
+            else:
+                # Fallback to default if no FoodKeeper data found
+                f.expiration = date.today() + timedelta(days=1)  # Default to 1 day
+                logger.debug("Using default expiration for %s", f.name)
+
+    if not foods.items:
+        foods.items.append(Food(
+            name="Unknown",
+            quantity="Unknown",
+            expiration=date.today() + timedelta(days=1)
+        ))
+
+    return foods
+
+
+def _call_vision_model(image_bytes: bytes) -> Items:
+    base64_image = base64.b64encode(image_bytes).decode('utf-8')
+    messages = [
+        {
+            "role": "user",
+            "content": [
+                {
+                    "type": "text",
+                    "text": RECOGNITION_PROMPT,
+                },
+                {
+                    "type": "image_url",
+                    "image_url": {
+                        "url": f"data:image/jpeg;base64,{base64_image}",
+                        "detail": "low",
+                    },
+                },
+            ],
+        }
+    ]
+
+    response = get_client().beta.chat.completions.parse(
+        model=VISION_MODEL,
+        messages=messages,
+        response_format=Items,
+        max_tokens=300,
+        temperature=0.1
+    )
+
+    return response.choices[0].message.parsed
+
+
+# -------------------- Expiring Items --------------------
+def items_expiring_soon(items: Items, days: int = 2):
+    today = date.today()
+    expiring_items = [
+        item for item in items.items
+        if item.expiration and 0 <= (item.expiration - today).days <= days
+    ]
+    return expiring_items
+
+
+# -------------------- Zero-Waste Recipe --------------------
+def generate_zero_waste_recipe(image, use_cache: bool = True) -> str:
+    """
+    Generate a zero-waste recipe based on expiring items in the uploaded image
+    (a file path, raw bytes or a file-like object).
+    """
+
+    recognized = recognize_items(image, use_cache=use_cache)
+
+    expiring = items_expiring_soon(recognized)
+    if not expiring:
+        return "No items are expiring soon. Try regular recipes."
+
+    expiring = [item for item in expiring if item.name.lower() != "unknown"]
+    if not expiring:
+        return "No valid expiring items found for recipe generation."
+
+    return zero_waste_recipe(expiring, use_cache=use_cache)
+
+
+def pantry_zero_waste_recipe(rows, use_cache: bool = True) -> str:
+    """
+    The same recipe from a user's stored food rows (dicts as returned by
+    food_helper.list_foods, soonest first) instead of an image: no vision call.
+    """
+    expiring = [
+        Food(name=row["name"], quantity=row["quantity"],
+             expiration=date.fromisoformat(row["expiration_date"][:10]) if row.get("expiration_date") else None)
+        for row in rows if row.get("name") and row["name"].lower() != "unknown"
+    ]
+    if not expiring:
+        return "No items are expiring soon. Try regular recipes."
+    return zero_waste_recipe(expiring, use_cache=use_cache)
@@ -0,0 +1,168 @@
+# foodkeeper_fuzzy.py
+# Fuzzy FoodKeeper matching for names the exact/keyword/substring lookup in
+# expiration_helper misses, mostly abbreviated receipt lines: "bnls chkn brst",
+# "grk yog", "org bananas 3lb", "brocoli".
+#
+# Built once per product table, over the words of every row's Name, Name_subtitle
+# and Keywords (lowercase, made singular):
+#   word -> rows having it in the Name or subtitle, and rows having it only in Keywords
+#   word -> inverse document frequency, so "chicken" outweighs "whole"
+#   first letter -> words, for prefixes ("yog") and abbreviations ("chkn")
+#   padded character trigram -> words, for misspellings ("brocoli")
+# A query is split into words, dropping sizes, counts and store noise ("3lb",
+# "12ct", "org", "gal"). Each word resolves to scored vocabulary words: exact
+# 1.0, prefix 0.9, abbreviation (same first letter, letters in order) 0.8, and
+# only when none of those hit, trigram similarity. A row scores the IDF-weighted
+# share of query words it matches (a Keywords-only word counts KEYWORD_WEIGHT),
+# times a factor favouring rows whose Name is mostly covered, so "Milk" beats
+# "Soy milk". Word resolutions are memoized, so repeated receipt vocabulary
+# costs a dict lookup.
+import math
+import os
+import re
+from functools import lru_cache
+
+from text_helper import singular
+
+FUZZY_MIN_SCORE = float(os.getenv("FUZZY_MIN_SCORE", "0.5"))
+
+PREFIX_SCORE = 0.9
+ABBREVIATION_SCORE = 0.8
+MIN_TRIGRAM_SIMILARITY = 0.45
+KEYWORD_WEIGHT = 0.85
+PRECISION_WEIGHT = 0.2
+UNKNOWN_WEIGHT = 1.0
+
+WORD_RE = re.compile(r"[a-z]+")
+VOWELS = frozenset("aeiou")
+STOPWORDS = frozenset("a an and as at etc for in into of on or such the to with without".split())
+# receipt tokens that say nothing about the food
+NOISE = frozenset("""org organic fresh natural lb lbs oz fl ct pk pkg pack bag bunch gal ea each lg sm med large
+                     small medium xl jumbo family size value store brand club pc pcs bx btl can""".split())
+
+
+def _words(text):
+    return [singular(word) for word in WORD_RE.findall(text.lower()) if word not in STOPWORDS and len(word) > 1]
+
+
+def query_words(name):
+    """Food words of a receipt line: tokens containing digits, sizes and store noise dropped"""
+    words = []
+    for token in name.lower().split():
+        if any(c.isdigit() for c in token):
+            continue
+        words += [w for w in _words(token) if w not in NOISE]
+    return words
+
+
+def _trigrams(word):
+    padded = f" {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# "chkn" for chicken, "tortla" for tortilla: the letters in order, and either
+# vowels dropped or the first three letters kept ("fee" is not "flaxseed")
+def _is_abbreviation(short, word):
+    if short[0] != word[0] or len(short) >= len(word) or len(short) * 3 < len(word):
+        return False
+    if VOWELS.intersection(short[1:]) and not (len(short) > 3 and word.startswith(short[:3])):
+        return False
+    position = 0
+    for c in short:
+        position = word.find(c, position) + 1
+        if not position:
+            return False
+    return True
+
+
+class FuzzyFoodIndex:
+    def __init__(self, table, min_score=None):
+        self.table = table
+        self.min_score = FUZZY_MIN_SCORE if min_score is None else min_score
+        self.name_words = []        # distinct Name words per row
+        self.postings = {}          # word -> {row: 1.0 (in Name) or KEYWORD_WEIGHT (Keywords only)}
+        self.by_letter = {}         # first letter -> words
+        self.trigrams = {}          # trigram -> words
+
+        for idx in range(len(table)):
+            name = set(_words(table.get("Name", idx) or ""))
+            title = name | set(_words(table.get("Name_subtitle", idx) or ""))
+            keywords = set(_words(table.get("Keywords", idx) or "")) - title
+            self.name_words.append(name)
+            for word in title:
+                self.postings.setdefault(word, {})[idx] = 1.0
+            for word in keywords:
+                self.postings.setdefault(word, {})[idx] = KEYWORD_WEIGHT
+
+        rows = max(len(table), 1)
+        self.idf = {word: math.log(1 + rows / len(hits)) for word, hits in self.postings.items()}
+        for word in self.postings:
+            self.by_letter.setdefault(word[0], []).append(word)
+            for gram in _trigrams(word):
+                self.trigrams.setdefault(gram, []).append(word)
+        self.resolve = lru_cache(maxsize=4096)(self._resolve)
+
+    def _resolve(self, word):
+        """((vocabulary word, similarity), ...) for one query word"""
+        found = {word: 1.0} if word in self.postings else {}
+        for candidate in self.by_letter.get(word[0], ()):
+            if candidate == word:
+                continue
+            if candidate.startswith(word):
+                if len(word) >= 3:
+                    found[candidate] = PREFIX_SCORE
+            elif _is_abbreviation(word, candidate):
+                found[candidate] = ABBREVIATION_SCORE
+        if not found:
+            grams = _trigrams(word)
+            shared = {}
+            for gram in grams:
+                for candidate in self.trigrams.get(gram, ()):
+                    shared[candidate] = shared.get(candidate, 0) + 1
+            for candidate, common in shared.items():
+                similarity = common / (len(grams) + len(_trigrams(candidate)) - common)
+                if similarity >= MIN_TRIGRAM_SIMILARITY:
+                    found[candidate] = similarity
+        return tuple(found.items())
+
+    def candidates(self, name, limit=5):
+        """Up to limit (score, row index) pairs, best first, above no threshold"""
+        words = query_words(name)
+        if not words:
+            return []
+        resolved = [self.resolve(word) for word in words]
+        # a word that resolves nowhere (brands, "xfirm", "unslt") still counts against coverage, lightly
+        weights = [max((self.idf[w] for w, _ in matches), default=UNKNOWN_WEIGHT) for matches in resolved]
+        total = sum(weights)
+
+        best = {}       # row -> [per query word: best similarity]
+        used = {}       # row -> Name words matched
+        for position, matches in enumerate(resolved):
+            for vocab_word, similarity in matches:
+                for row, field_weight in self.postings[vocab_word].items():
+                    scores = best.get(row)
+                    if scores is None:
+                        scores = best[row] = [0.0] * len(words)
+                        used[row] = set()
+                    scores[position] = max(scores[position], similarity * field_weight)
+                    if field_weight == 1.0:
+                        used[row].add(vocab_word)
+
+        scored = []
+        for row, scores in best.items():
+            coverage = sum(s * w for s, w in zip(scores, weights)) / total
+            name_words = self.name_words[row]
+            precision = len(used[row] & name_words) / len(name_words) if name_words else 0.0
+            scored.append((round(coverage * (1 - PRECISION_WEIGHT + PRECISION_WEIGHT * precision), 4), -row))
+        scored.sort(reverse=True)
+        return [(score, -neg_row) for score, neg_row in scored[:limit]]
+
+    def match(self, name):
+        """(product row, score) for the best candidate at or above min_score, else (None, score)"""
+        found = self.candidates(name, limit=1)
+        if not found:
+            return None, 0.0
+        score, idx = found[0]
+        if score < self.min_score:
+            return None, score
+        return self.table.row(idx), score
@@ -0,0 +1,199 @@
+# foodkeeper_store.py
+# Columnar copy of the FoodKeeper Product sheet.
+#
+# foodkeeper.json carries all six sheets as nested lists of single-key dicts.
+# The backend only needs the Product sheet's names, keywords, categories and
+# shelf-life columns, so `python foodkeeper_store.py` compiles those into
+# foodkeeper.bin: numeric columns as float64 arrays and text columns as indexes
+# into one interned string table. Loading it is a single read plus one
+# array.frombytes per column. The JSON sheet is still used when the compiled
+# file is missing or FOODKEEPER_FORMAT=json.
+import array
+import hashlib
+import json
+import logging
+import math
+import os
+import struct
+import sys
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(__file__)
+JSON_PATH = os.path.join(BASE_DIR, "foodkeeper.json")
+COMPILED_PATH = os.path.join(BASE_DIR, "foodkeeper.bin")
+
+MAGIC = b"FKPC"
+VERSION = 2      # 2: Category_Name joined from the Category sheet
+# magic, version, rows, columns, strings, sha256 of the source JSON
+HEADER = struct.Struct("<4sHIHI32s")
+COLUMN = struct.Struct("<IB")
+FLOAT, STRING = 0, 1
+NO_STRING = 0xFFFFFFFF
+CATEGORY_SHEET = 1
+PRODUCT_SHEET = 2
+
+
+class ProductTable:
+    def __init__(self, nrows, columns):
+        self.nrows = nrows
+        self.columns = columns      # name -> (type, values)
+
+    def __len__(self):
+        return self.nrows
+
+    def get(self, name, idx):
+        kind, values = self.columns[name]
+        if kind == FLOAT:
+            value = values[idx]
+            return None if math.isnan(value) else value
+        return values[idx]
+
+    # Row as a plain dict, same keys/values as the JSON sheet (minus tips text)
+    def row(self, idx):
+        return {name: self.get(name, idx) for name in self.columns}
+
+
+def _is_tips(column):
+    return column.lower().endswith("tips")
+
+
+def _source_digest(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).digest()
+
+
+# Product sheet of an already parsed foodkeeper.json -> ProductTable, with the
+# Category sheet's Category_Name joined in on Category_ID
+def table_from_json(data):
+    rows = [{k: v for d in row for k, v in d.items()} for row in data["sheets"][PRODUCT_SHEET]["data"]]
+    categories = {}
+    for row in data["sheets"][CATEGORY_SHEET]["data"]:
+        row_dict = {k: v for d in row for k, v in d.items()}
+        categories[row_dict.get("ID")] = row_dict.get("Category_Name")
+    for row in rows:
+        row["Category_Name"] = categories.get(row.get("Category_ID"))
+    names = [k for k in (rows[0] if rows else {}) if not _is_tips(k)]
+
+    columns = {}
+    for name in names:
+        values = [row.get(name) for row in rows]
+        if all(v is None or isinstance(v, (int, float)) for v in values):
+            columns[name] = (FLOAT, array.array("d", (math.nan if v is None else float(v) for v in values)))
+        else:
+            columns[name] = (STRING, [None if v is None else sys.intern(str(v)) for v in values])
+    return ProductTable(len(rows), columns)
+
+
+def load_json_table(path=JSON_PATH):
+    with open(path) as f:
+        return table_from_json(json.load(f))
+
+
+def write_compiled(table, path=COMPILED_PATH, digest=b"\0" * 32):
+    strings = {}
+
+    def intern_id(value):
+        if value is None:
+            return NO_STRING
+        return strings.setdefault(value, len(strings))
+
+    descriptors = [(intern_id(name), kind) for name, (kind, _) in table.columns.items()]
+    payloads = []
+    for kind, values in table.columns.values():
+        if kind == FLOAT:
+            payloads.append(array.array("d", values))
+        else:
+            payloads.append(array.array("I", (intern_id(v) for v in values)))
+
+    offsets = array.array("I", [0])
+    blob = bytearray()
+    for value in strings:
+        blob += value.encode("utf-8")
+        offsets.append(len(blob))
+    blob += b"\0" * (-len(blob) % 8)
+
+    if sys.byteorder != "little":
+        for arr in [offsets] + payloads:
+            arr.byteswap()
+
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, table.nrows, len(descriptors), len(strings), digest))
+        for name_id, kind in descriptors:
+            f.write(COLUMN.pack(name_id, kind))
+        f.write(offsets.tobytes())
+        f.write(blob)
+        for arr in payloads:
+            f.write(arr.tobytes())
+
+
+def load_compiled_table(path=COMPILED_PATH):
+    with open(path, "rb") as f:
+        buf = memoryview(f.read())
+
+    magic, version, nrows, ncols, nstrings, _ = HEADER.unpack_from(buf, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} compiled FoodKeeper file")
+    pos = HEADER.size
+
+    descriptors = [COLUMN.unpack_from(buf, pos + i * COLUMN.size) for i in range(ncols)]
+    pos += ncols * COLUMN.size
+
+    def read_array(typecode, count):
+        nonlocal pos
+        arr = array.array(typecode)
+        arr.frombytes(buf[pos:pos + count * arr.itemsize])
+        if sys.byteorder != "little":
+            arr.byteswap()
+        pos += count * arr.itemsize
+        return arr
+
+    offsets = read_array("I", nstrings + 1)
+    blob = bytes(buf[pos:pos + offsets[-1]])
+    strings = [sys.intern(blob[offsets[i]:offsets[i + 1]].decode("utf-8")) for i in range(nstrings)]
+    pos += offsets[-1] + (-offsets[-1] % 8)
+
+    columns = {}
+    for name_id, kind in descriptors:
+        if kind == FLOAT:
+            columns[strings[name_id]] = (FLOAT, read_array("d", nrows))
+        else:
+            ids = read_array("I", nrows)
+            columns[strings[name_id]] = (STRING, [None if i == NO_STRING else strings[i] for i in ids])
+    return ProductTable(nrows, columns)
+
+
+# Compiled file unless missing or FOODKEEPER_FORMAT=json, then the JSON sheet
+def load_product_table():
+    if os.getenv("FOODKEEPER_FORMAT", "compiled") != "json" and os.path.exists(COMPILED_PATH):
+        try:
+            return load_compiled_table()
+        except (OSError, ValueError, struct.error) as e:
+            logger.warning("could not load %s (%s), falling back to JSON.", COMPILED_PATH, e)
+    return load_json_table()
+
+
+def compile_foodkeeper(src=JSON_PATH, dst=COMPILED_PATH):
+    table = load_json_table(src)
+    write_compiled(table, dst, _source_digest(src))
+    return table
+
+
+# True when foodkeeper.bin was built from the current foodkeeper.json
+def compiled_is_current(src=JSON_PATH, dst=COMPILED_PATH):
+    try:
+        with open(dst, "rb") as f:
+            header = HEADER.unpack(f.read(HEADER.size))
+    except (OSError, struct.error):
+        return False
+    return header[0] == MAGIC and header[1] == VERSION and header[5] == _source_digest(src)
+
+
+if __name__ == "__main__":
+    if "--check" in sys.argv:
+        ok = compiled_is_current()
+        print(f"{COMPILED_PATH} is {'up to date' if ok else 'stale or missing'}")
+        sys.exit(0 if ok else 1)
+    table = compile_foodkeeper()
+    print(f"Wrote {len(table)} products, {len(table.columns)} columns to {COMPILED_PATH} "
+          f"({os.path.getsize(COMPILED_PATH)} bytes)")
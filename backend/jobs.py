@@ -0,0 +1,328 @@
+# jobs.py
+# Background processing for the upload routes.
+#
+# With background=1, /detect-food and /parse-receipt store the upload as a job
+# and answer 202 with its id straight away. A bounded thread pool works the
+# queue: Tesseract runs in the pipeline's process pool, vision/USDA/DB calls in
+# the job thread. Jobs and their uploads live in SQLite (jobs.sqlite3), shared
+# by every server process on the host. Poll GET /jobs/<job_id>?user_id=<uuid>
+# for status, progress and the saved items.
+#
+# Each job is leased by the process that holds it (`owner`, its pid), which
+# refreshes `updated_at` every JOB_HEARTBEAT seconds while the job is queued
+# or running there. A job whose lease is older than JOB_LEASE belongs to a
+# process that died: any live process takes it over and runs it again, at
+# start and on every heartbeat. Finished jobs are deleted after JOB_RETENTION.
+#
+# A handler only builds the foods to save. Before writing them, the queue
+# gives each one its id and stores them in the job row (`checkpoint`), so a
+# process that dies during or after the write leaves a job that the taking
+# process finishes from the checkpoint: foods already stored are reported as
+# saved, the rest are written, and none is stored twice.
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from bson import ObjectId, json_util
+from bson.binary import UuidRepresentation
+
+from models import Food
+from user_helper import get_user
+from food_helper import build_food, bulk_save_foods, food_to_json
+from receipt_parser import ocr_receipt, parse_receipt_text
+from pipeline import cpu_executor
+from metrics_helper import span
+from food_recognition import recognize_items
+
+logger = logging.getLogger(__name__)
+
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join(os.path.dirname(__file__), "jobs.sqlite3"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "64"))     # queued + running jobs per process
+JOB_HEARTBEAT = float(os.getenv("JOB_HEARTBEAT", "10"))     # seconds between lease renewals
+JOB_LEASE = float(os.getenv("JOB_LEASE", "60"))             # seconds without a renewal before a job is taken over
+JOB_RETENTION = float(os.getenv("JOB_RETENTION", str(7 * 24 * 3600)))   # seconds a finished job stays pollable
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+# checkpoints hold Food documents: ObjectIds, datetimes and the user's UUID
+CHECKPOINT_JSON = json_util.JSONOptions(uuid_representation=UuidRepresentation.STANDARD)
+
+
+class QueueFull(Exception):
+    pass
+
+
+class JobStore:
+    def __init__(self, path=JOB_DB_PATH):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, kind TEXT, user_id TEXT, options TEXT, payload BLOB,"
+            " status TEXT, stage TEXT, progress REAL, result TEXT, error TEXT,"
+            " created_at REAL, updated_at REAL)"
+        )
+        # stores created before jobs had an owner
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")]
+        if "owner" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN owner INTEGER")
+        # ... or a save checkpoint
+        if "checkpoint" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN checkpoint TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, updated_at)")
+        self._conn.commit()
+
+    def create(self, kind, user_id, payload, options, owner):
+        job_id = str(uuid.uuid4())
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, user_id, options, payload, status, stage, progress,"
+                " created_at, updated_at, owner) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, user_id, json.dumps(options), payload, QUEUED, QUEUED, 0.0, now, now, owner),
+            )
+            self._conn.commit()
+        return job_id
+
+    def claim(self, job_id, owner):
+        """Mark a queued job of `owner` running; returns (kind, user_id, options, payload, checkpoint) or None"""
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ? AND status = ? AND owner = ?",
+                (RUNNING, time.time(), job_id, QUEUED, owner),
+            )
+            self._conn.commit()
+            if cur.rowcount == 0:
+                return None
+            kind, user_id, options, payload, checkpoint = self._conn.execute(
+                "SELECT kind, user_id, options, payload, checkpoint FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return kind, user_id, json.loads(options), payload, json_util.loads(checkpoint, json_options=CHECKPOINT_JSON) if checkpoint else None
+
+    def checkpoint(self, job_id, checkpoint):
+        """Keep what a job is about to save (BSON types allowed) in its row"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET checkpoint = ?, updated_at = ? WHERE id = ?",
+                (json_util.dumps(checkpoint, json_options=CHECKPOINT_JSON), time.time(), job_id),
+            )
+            self._conn.commit()
+
+    def progress(self, job_id, stage, progress):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET stage = ?, progress = ?, updated_at = ? WHERE id = ?",
+                (stage, progress, time.time(), job_id),
+            )
+            self._conn.commit()
+
+    def finish(self, job_id, result=None, error=None):
+        # the upload is no longer needed once the job has an outcome
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, stage = ?, progress = ?, result = ?, error = ?,"
+                " payload = NULL, checkpoint = NULL, updated_at = ? WHERE id = ?",
+                (FAILED if error else DONE, FAILED if error else DONE, 1.0,
+                 json.dumps(result) if result is not None else None, error, time.time(), job_id),
+            )
+            self._conn.commit()
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, kind, user_id, status, stage, progress, result, error, created_at, updated_at"
+                " FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        keys = ("job_id", "kind", "user_id", "status", "stage", "progress", "result", "error",
+                "created_at", "updated_at")
+        job = dict(zip(keys, row))
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def renew(self, job_ids, owner):
+        """Extend owner's lease on these jobs"""
+        if not job_ids:
+            return
+        placeholders = ",".join("?" * len(job_ids))
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET updated_at = ? WHERE owner = ? AND status IN (?, ?) AND id IN ({placeholders})",
+                [time.time(), owner, QUEUED, RUNNING, *job_ids],
+            )
+            self._conn.commit()
+
+    def take_over_expired(self, owner, lease=JOB_LEASE):
+        """Queue for `owner` the unfinished jobs whose lease ran out, oldest first; returns their ids"""
+        cutoff = time.time() - lease
+        taken = []
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM jobs WHERE status IN (?, ?) AND updated_at < ? ORDER BY created_at",
+                (QUEUED, RUNNING, cutoff),
+            ).fetchall()
+            for (job_id,) in rows:
+                # conditional, so of several processes taking over at once only one gets each job
+                cur = self._conn.execute(
+                    "UPDATE jobs SET status = ?, owner = ?, updated_at = ?"
+                    " WHERE id = ? AND status IN (?, ?) AND updated_at < ?",
+                    (QUEUED, owner, time.time(), job_id, QUEUED, RUNNING, cutoff),
+                )
+                if cur.rowcount:
+                    taken.append(job_id)
+            self._conn.commit()
+        return taken
+
+    def purge_finished(self, retention=JOB_RETENTION):
+        """Delete jobs that finished more than `retention` seconds ago; returns how many"""
+        with self._lock:
+            cur = self._conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (DONE, FAILED, time.time() - retention),
+            )
+            self._conn.commit()
+        return cur.rowcount
+
+
+# -------------------- Job handlers --------------------
+# Each returns the Food documents to save and the other fields of the result;
+# JobQueue saves them (see save_checkpointed) and adds items_saved/items_failed.
+def run_detect_job(user, payload, options, report):
+    report("recognizing", 0.1)
+    with span("stage.vision"):
+        items = recognize_items(payload, use_cache=options.get("use_cache", True))
+    if not items.items:
+        return [], {"result": "Food could not be detected."}
+    with span("foods.build"):
+        foods = [build_food(user, f.name, f.quantity) for f in items.items]
+    return foods, {"result": "success"}
+
+
+def run_receipt_job(user, payload, options, report):
+    report("ocr", 0.1)
+    with span("stage.ocr"):
+        text = cpu_executor().submit(ocr_receipt, payload).result()
+    report("validating", 0.5)
+    with span("stage.usda"):
+        parsed_data = parse_receipt_text(text)
+    with span("foods.build"):
+        foods = [build_food(user, item.get("name", "Unknown"), item.get("quantity", "medium"))
+                 for item in parsed_data.get("items", [])]
+    return foods, {"store": parsed_data.get("store"), "date": parsed_data.get("date")}
+
+
+HANDLERS = {"detect-food": run_detect_job, "parse-receipt": run_receipt_job}
+
+
+def save_checkpointed(checkpoint):
+    """Save the foods in a job's checkpoint that are not stored yet; returns (saved, failed)"""
+    foods = [Food._from_son(doc) for doc in checkpoint["foods"]]
+    stored = set(Food.objects(id__in=[food.id for food in foods]).scalar("id"))
+    if not stored:
+        return bulk_save_foods(foods)
+    # a previous run wrote these before it died
+    pending = [(index, food) for index, food in enumerate(foods) if food.id not in stored]
+    saved, failed = bulk_save_foods([food for _, food in pending])
+    for failure in failed:
+        failure["index"] = pending[failure["index"]][0]
+    saved_ids = {food.id for food in saved} | stored
+    return [food for food in foods if food.id in saved_ids], failed
+
+
+class JobQueue:
+    def __init__(self, store=None, workers=JOB_WORKERS, maxsize=JOB_QUEUE_SIZE):
+        self.store = store or JobStore()
+        self.maxsize = maxsize
+        self.owner = os.getpid()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="jobs")
+        self._held = set()      # ids of this process's queued and running jobs
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def start(self):
+        """Take over jobs left by dead processes, then renew leases every JOB_HEARTBEAT seconds"""
+        self.maintain()
+        threading.Thread(target=self._heartbeat, name="jobs-heartbeat", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def submit(self, kind, user_id, payload, options=None):
+        """Store and queue a job; raises QueueFull when maxsize jobs are already waiting or running"""
+        if kind not in HANDLERS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        with self._lock:
+            if len(self._held) >= self.maxsize:
+                raise QueueFull(f"{len(self._held)} jobs already queued")
+            job_id = self.store.create(kind, user_id, payload, options or {}, self.owner)
+            self._held.add(job_id)
+        self._executor.submit(self._run, job_id)
+        return job_id
+
+    def resume(self):
+        """Queue the jobs whose owner stopped renewing their lease; returns how many"""
+        job_ids = self.store.take_over_expired(self.owner)
+        with self._lock:
+            self._held.update(job_ids)
+        for job_id in job_ids:
+            self._executor.submit(self._run, job_id)
+        return len(job_ids)
+
+    def maintain(self):
+        """One heartbeat: renew this process's leases, take over expired jobs, purge old finished ones"""
+        with self._lock:
+            held = list(self._held)
+        self.store.renew(held, self.owner)
+        self.resume()
+        self.store.purge_finished()
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def depth(self):
+        with self._lock:
+            return len(self._held)
+
+    def _heartbeat(self):
+        while not self._stop.wait(JOB_HEARTBEAT):
+            try:
+                self.maintain()
+            except Exception:
+                logger.exception("Job queue heartbeat failed")
+
+    def _run(self, job_id):
+        try:
+            claimed = self.store.claim(job_id, self.owner)
+            if claimed is None:
+                return
+            kind, user_id, options, payload, checkpoint = claimed
+            if checkpoint is None:
+                user = get_user(uuid.UUID(user_id))
+                if not user:
+                    self.store.finish(job_id, error=f"User {user_id} not found")
+                    return
+                foods, fields = HANDLERS[kind](user, payload, options,
+                                               lambda stage, progress: self.store.progress(job_id, stage, progress))
+                for food in foods:
+                    food.id = ObjectId()
+                checkpoint = {"fields": fields, "foods": [food.to_mongo() for food in foods]}
+                self.store.checkpoint(job_id, checkpoint)
+            self.store.progress(job_id, "saving", 0.8)
+            with span("stage.save"):
+                saved, failed = save_checkpointed(checkpoint)
+            self.store.finish(job_id, result={**checkpoint["fields"],
+                                              "items_saved": [food_to_json(f) for f in saved],
+                                              "items_failed": failed})
+        except Exception as e:
+            self.store.finish(job_id, error=f"{type(e).__name__}: {e}")
+        finally:
+            with self._lock:
+                self._held.discard(job_id)
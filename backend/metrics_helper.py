@@ -0,0 +1,245 @@
+# metrics_helper.py
+# In-process counters and latency histograms for the ingestion pipeline, and
+# timing spans that feed them.
+#
+#   with span("usda.validate"):        # time a block
+#       ...
+#   @timed("foodkeeper.match")         # time every call
+#   inc("foodkeeper.matches", kind="fuzzy")
+#
+# A span records its duration in the "<name>" histogram, counts "<name>.errors"
+# when the block raises, and appends (name, seconds) to the current request's
+# trace when there is one (see start_trace). app.py serves everything on
+# GET /metrics (Prometheus text, or JSON with ?format=json) and puts the trace,
+# one entry per span name and at most SERVER_TIMING_MAX_LENGTH characters, in a
+# Server-Timing header. METRICS=off turns spans and counters into no-ops.
+import bisect
+import contextvars
+import functools
+import os
+import re
+import threading
+import time
+
+METRICS_ENABLED = os.getenv("METRICS", "on") != "off"
+SERVER_TIMING_MAX_LENGTH = int(os.getenv("SERVER_TIMING_MAX_LENGTH", "1024"))    # characters
+
+# seconds; the last bucket is +Inf
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram, thread-safe."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        position = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[position] += 1
+            self.count += 1
+            self.sum += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th observation (max for +Inf)"""
+        with self._lock:
+            if not self.count:
+                return None
+            rank = q * self.count
+            seen = 0
+            for position, n in enumerate(self.counts):
+                seen += n
+                if seen >= rank and n:
+                    return self.buckets[position] if position < len(self.buckets) else self.max
+            return self.max
+
+    def snapshot(self):
+        with self._lock:
+            count, total, worst, counts = self.count, self.sum, self.max, list(self.counts)
+        return {
+            "count": count,
+            "sum": round(total, 6),
+            "mean": round(total / count, 6) if count else None,
+            "max": round(worst, 6),
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": dict(zip([str(b) for b in self.buckets] + ["+Inf"], counts)),
+        }
+
+
+class Metrics:
+    """Named counters and histograms; labels are folded into the key."""
+
+    def __init__(self):
+        self._counters = {}       # (name, labels) -> int
+        self._histograms = {}     # (name, labels) -> Histogram
+        self._lock = threading.Lock()
+
+    def inc(self, name, n=1, **labels):
+        key = (name, tuple(sorted(labels.items())) if labels else ())
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + n
+
+    def histogram(self, name, **labels):
+        key = (name, tuple(sorted(labels.items())) if labels else ())
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram())
+        return histogram
+
+    def observe(self, name, seconds, **labels):
+        self.histogram(name, **labels).observe(seconds)
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def snapshot(self):
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = dict(self._histograms)
+        return {
+            "counters": {_label(name, labels): value for (name, labels), value in sorted(counters.items())},
+            "histograms": {_label(name, labels): h.snapshot() for (name, labels), h in sorted(histograms.items())},
+        }
+
+    def render_prometheus(self, prefix="freshly_"):
+        """Counters and histograms in the Prometheus text exposition format"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items())
+        lines = []
+        for (name, labels), value in counters:
+            metric = prefix + _metric_name(name) + "_total"
+            lines.append(f"{metric}{_prom_labels(labels)} {value}")
+        for (name, labels), histogram in histograms:
+            metric = prefix + _metric_name(name) + "_seconds"
+            snapshot = histogram.snapshot()
+            cumulative = 0
+            for bound, n in snapshot["buckets"].items():
+                cumulative += n
+                lines.append(f"{metric}_bucket{_prom_labels(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{metric}_sum{_prom_labels(labels)} {snapshot['sum']}")
+            lines.append(f"{metric}_count{_prom_labels(labels)} {snapshot['count']}")
+        return "\n".join(lines) + "\n"
+
+
+def _label(name, labels):
+    if not labels:
+        return name
+    return name + "{" + ",".join(f"{k}={v}" for k, v in labels) + "}"
+
+
+def _metric_name(name):
+    return re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+def _prom_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"') for _, v in labels)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + "}"
+
+
+METRICS = Metrics()
+
+# (name, seconds) spans of the request being handled, or None outside one
+_trace = contextvars.ContextVar("trace", default=None)
+
+
+def start_trace():
+    """Collect spans for the current request; returns the list they land in"""
+    spans = []
+    _trace.set(spans)
+    return spans
+
+
+def inc(name, n=1, **labels):
+    if METRICS_ENABLED:
+        METRICS.inc(name, n, **labels)
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        if exc_type is not None:
+            METRICS.inc(self.name + ".errors")
+        METRICS.observe(self.name, elapsed)
+        spans = _trace.get()
+        if spans is not None:
+            spans.append((self.name, elapsed))
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(name):
+    """Context manager timing its block as `name`"""
+    return _Span(name) if METRICS_ENABLED else _NO_SPAN
+
+
+def timed(name):
+    """Decorator: run every call inside span(name)"""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def server_timing(spans, max_length=SERVER_TIMING_MAX_LENGTH):
+    """Server-Timing header value for a request's spans, in the order they first finished.
+
+    Spans sharing a name are combined: total duration, and desc="xN" for N
+    calls. When the entries don't fit in max_length characters, the longest
+    ones that do are kept.
+    """
+    totals = {}
+    for name, seconds in spans:
+        total = totals.setdefault(name, [0.0, 0])
+        total[0] += seconds
+        total[1] += 1
+    entries = []
+    for name, (seconds, count) in totals.items():
+        entry = f"{_metric_name(name)};dur={seconds * 1000:.1f}"
+        entries.append((seconds, entry + f';desc="x{count}"' if count > 1 else entry))
+
+    kept, length = set(), -2
+    for position in sorted(range(len(entries)), key=lambda i: -entries[i][0]):
+        if length + 2 + len(entries[position][1]) <= max_length:
+            kept.add(position)
+            length += 2 + len(entries[position][1])
+    return ", ".join(entry for position, (_, entry) in enumerate(entries) if position in kept)
@@ -4,12 +4,17 @@ import uuid
 from datetime import datetime
 from dotenv import load_dotenv
 from mongoengine import (
-    connect,
+    register_connection,
     Document,
     StringField,
     UUIDField,
     DateTimeField,
-    ReferenceField
+    ReferenceField,
+    IntField,
+    FloatField,
+    ListField,
+    DictField,
+    BooleanField
 )
 import certifi
 
@@ -19,12 +24,30 @@ load_dotenv()
 MONGO_URI = os.getenv("MONGO_URI")
 MONGO_DB = os.getenv("MONGO_DB")
 
-# Connect with certifi SSL
+# Connection pool, per process. Sized for the pipeline's I/O threads
+# (PIPELINE_IO_WORKERS) plus background jobs, with timeouts below the
+# pipeline's DB stage timeout so an unreachable server fails fast.
+MONGO_POOL = {
+    "maxPoolSize": int(os.getenv("MONGO_MAX_POOL_SIZE", "40")),
+    "minPoolSize": int(os.getenv("MONGO_MIN_POOL_SIZE", "0")),
+    "maxIdleTimeMS": int(os.getenv("MONGO_MAX_IDLE_MS", "60000")),
+    "waitQueueTimeoutMS": int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "5000")),   # waiting for a free connection
+    "connectTimeoutMS": int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000")),
+    "serverSelectionTimeoutMS": int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000")),
+}
+# per-operation socket timeout; unset by default so long sweeps aren't cut off
+if os.getenv("MONGO_SOCKET_TIMEOUT_MS"):
+    MONGO_POOL["socketTimeoutMS"] = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS"))
+
+# Connect with certifi SSL. Only the settings are registered here: the client
+# is created (and the server resolved) on the first query, not at import.
 CA = certifi.where()
-connect(
+register_connection(
+    "default",
     db=MONGO_DB,
     host=MONGO_URI,
-    tlsCAFile=CA
+    tlsCAFile=CA,
+    **MONGO_POOL
 )
 
 # -----------------------------
@@ -47,4 +70,52 @@ class Food(Document):
     quantity = StringField(required=True, choices=("small", "medium", "large"))
     expiration_date = DateTimeField(required=True)
 
-    meta = {"collection": "food"}
+    meta = {
+        "collection": "food",
+        # per-user listings sorted/filtered by expiry, _id as the keyset tie-breaker
+        "indexes": [("user", "expiration_date", "id")]
+    }
+
+# -----------------------------
+# Expiry sweep (expiry_sweep.py)
+# -----------------------------
+class ExpiryDigest(Document):
+    id = StringField(primary_key=True)  # "<run>:<user id>"
+    run = StringField(required=True)
+    user = ReferenceField(User, required=True)
+    expired = IntField(default=0)
+    expiring = IntField(default=0)
+    next_expiration = DateTimeField()
+    items = ListField(DictField())      # soonest expiring items, earliest first
+
+    meta = {"collection": "expiry_digests", "indexes": [("user", "run")]}
+
+
+class SweepCheckpoint(Document):
+    id = StringField(primary_key=True)  # run
+    status = StringField(required=True, choices=("running", "done"))
+    last_user = UUIDField()             # every user up to and including this one is digested
+    rows = IntField(default=0)
+    users = IntField(default=0)
+    elapsed = FloatField(default=0.0)   # seconds, summed over resumed attempts
+    started_at = DateTimeField(default=datetime.utcnow)
+    updated_at = DateTimeField(default=datetime.utcnow)
+
+    meta = {"collection": "sweep_checkpoints"}
+
+# -----------------------------
+# Pantry summary (pantry_summary.py)
+# -----------------------------
+class PantrySummary(Document):
+    id = UUIDField(primary_key=True)    # user id
+    total = IntField(default=0)
+    past = IntField(default=0)          # items whose date was folded out of by_date
+    by_date = DictField()               # "YYYY-MM-DD" expiration date -> items
+    by_quantity = DictField()           # quantity -> items
+    by_category = DictField()           # FoodKeeper category -> items
+    by_category_date = DictField()      # category -> {expiration date -> items}
+    as_of = StringField()               # "YYYY-MM-DD": dates before this are folded into past
+    version = IntField(default=0)       # bumped by every write, for compare-and-set folds and seeding
+    seeded = BooleanField(default=False)  # counts cover the user's whole history
+
+    meta = {"collection": "pantry_summaries"}
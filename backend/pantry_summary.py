@@ -0,0 +1,287 @@
+# pantry_summary.py
+# A per-user pantry summary kept up to date as food is written, so reading it
+# costs one small document however long the user's history is.
+#
+# PantrySummary (models.py) holds running counts: total, by_quantity,
+# by_category, and by_date / by_category_date, the number of items expiring on
+# each day. Every insert or removal in food_helper adds its deltas with one
+# $inc, so concurrent writers never conflict. The expired / expiring within N
+# days buckets and next_expiration depend on today's date, so they are not
+# stored: get_summary derives them from by_date, giving the same result as
+# expiry_engine.expiry_summary.
+#
+# Writes never create a summary. A user's first read seeds it by counting
+# their food once, so food written before summaries existed (or before the
+# user's first read) is included. Until it is seeded a summary takes no
+# deltas; a write then only bumps `version`, and the seed, a compare-and-set
+# on `version`, rescans when one landed during its scan. One window remains:
+# a write whose rows are inserted before the scan but whose $inc arrives after
+# the seed is counted twice, which needs a whole seed to run between a
+# write's insert and its summary update.
+#
+# A daily fold keeps the document small: days before today move out of by_date
+# into `past` (and out of by_category_date), and as_of records when. get_summary
+# folds a summary whose as_of is stale; `python pantry_summary.py --fold` folds
+# every user's, e.g. nightly next to expiry_sweep. A fold is a compare-and-set
+# on `version`, which every write bumps, so it never loses a concurrent write;
+# it just waits for the next read. by_date then only holds upcoming days.
+#
+# `python pantry_summary.py --rebuild [--user UUID]` recomputes summaries from
+# the food collection, to repair one after a failed update (logged, and counted
+# in pantry_summary.errors). A write landing during its scan can be lost, so
+# run it while writes are quiet.
+#
+# python pantry_summary.py (--fold [--date YYYY-MM-DD] | --rebuild [--user UUID])
+import argparse
+import logging
+import uuid
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from expiration_helper import get_food_category
+from expiry_engine import DEFAULT_WINDOWS, UNCATEGORIZED
+from metrics_helper import inc, span
+from models import Food, PantrySummary
+
+logger = logging.getLogger(__name__)
+
+COUNT_FIELDS = ("by_quantity", "by_category", "by_date")
+SEED_ATTEMPTS = 5       # scans per read before a busy user's summary is left unseeded
+
+
+# Mongo field names can't contain "." or start with "$", and can't be empty
+def _key(text):
+    return text.replace("%", "%25").replace(".", "%2E").replace("$", "%24") or "%"
+
+
+def _unkey(key):
+    return "" if key == "%" else key.replace("%24", "$").replace("%2E", ".").replace("%25", "%")
+
+
+def _day(value):
+    return (value.date() if isinstance(value, datetime) else value).isoformat()
+
+
+def _deltas(rows, sign):
+    """{user id: {dotted field: delta}} for (user, name, quantity, expiration_date) rows"""
+    deltas = defaultdict(Counter)
+    for user, name, quantity, expiration in rows:
+        if expiration is None:
+            continue
+        day = _day(expiration)
+        category = _key(get_food_category(name or "") or UNCATEGORIZED)
+        delta = deltas[user]
+        delta["total"] += sign
+        delta[f"by_quantity.{_key(quantity or '')}"] += sign
+        delta[f"by_category.{category}"] += sign
+        delta[f"by_date.{day}"] += sign
+        delta[f"by_category_date.{category}.{day}"] += sign
+    return deltas
+
+
+def _apply(deltas):
+    collection = PantrySummary._get_collection()
+    for user, delta in deltas.items():
+        update = {field: n for field, n in delta.items() if n}
+        update["version"] = 1
+        try:
+            with span("db.pantry_summary"):
+                # a seed may complete between the two updates; then count into it
+                for _ in range(2):
+                    if collection.update_one({"_id": user, "seeded": True}, {"$inc": update}).matched_count:
+                        break
+                    # unseeded: make a seed in progress rescan. No summary: its first read counts this write
+                    if collection.update_one({"_id": user, "seeded": {"$ne": True}},
+                                             {"$inc": {"version": 1}}).matched_count:
+                        break
+        except PyMongoError:
+            inc("pantry_summary.errors")
+            logger.exception("Pantry summary update failed for user %s; rebuild it with pantry_summary.py", user)
+
+
+def record_added(foods):
+    """Count saved Food documents into their users' summaries"""
+    _apply(_deltas(((food.user.pk, food.name, food.quantity, food.expiration_date) for food in foods), 1))
+
+
+def record_removed(rows):
+    """Take deleted food rows (raw documents with user, name, quantity, expiration_date) back out"""
+    _apply(_deltas(((row["user"], row.get("name"), row.get("quantity"), row.get("expiration_date"))
+                    for row in rows), -1))
+
+
+def _nest(delta):
+    """A {dotted field: n} delta as a summary document's count fields"""
+    doc = {"total": delta.get("total", 0), "past": 0, "by_category_date": {}}
+    for field in COUNT_FIELDS:
+        doc[field] = {}
+    for field, n in delta.items():
+        parts = field.split(".")
+        if len(parts) == 2:
+            doc[parts[0]][parts[1]] = n
+        elif len(parts) == 3:
+            doc["by_category_date"].setdefault(parts[1], {})[parts[2]] = n
+    return doc
+
+
+def _scan(query):
+    cursor = Food._get_collection().find(
+        query, {"_id": 0, "user": 1, "name": 1, "quantity": 1, "expiration_date": 1}
+    ).batch_size(5000)
+    return _deltas(((row["user"], row.get("name"), row.get("quantity"), row.get("expiration_date"))
+                    for row in cursor), 1)
+
+
+def rebuild(user_ids=None):
+    """Recompute summaries from the food collection (every user's when None); returns how many were written"""
+    query = {} if user_ids is None else {"user": {"$in": list(user_ids)}}
+    deltas = _scan(query)
+    if user_ids is not None:
+        for user_id in user_ids:
+            deltas.setdefault(user_id, Counter())
+    collection = PantrySummary._get_collection()
+    for user, delta in deltas.items():
+        collection.update_one({"_id": user},
+                              {"$set": {**_nest(delta), "as_of": None, "seeded": True}, "$inc": {"version": 1}},
+                              upsert=True)
+    if user_ids is None:
+        # users whose food is all gone
+        collection.update_many({"_id": {"$nin": list(deltas)}},
+                               {"$set": {**_nest({}), "as_of": None, "seeded": True}, "$inc": {"version": 1}})
+    return len(deltas)
+
+
+def _seed(user_id, doc=None):
+    """Count the user's food into their summary, unless it is seeded already; returns the summary document"""
+    collection = PantrySummary._get_collection()
+    if doc is None:
+        # from here on writes bump its version, so a scan they land during is retried
+        try:
+            collection.insert_one({"_id": user_id, "version": 0, "seeded": False})
+        except DuplicateKeyError:
+            pass
+        doc = collection.find_one({"_id": user_id})
+    seeded = None
+    for _ in range(SEED_ATTEMPTS):
+        if doc.get("seeded"):
+            return doc
+        version = doc.get("version", 0)
+        seeded = {**_nest(_scan({"user": user_id}).get(user_id, {})), "as_of": None, "seeded": True}
+        result = collection.update_one({"_id": user_id, "version": version, "seeded": {"$ne": True}},
+                                       {"$set": seeded, "$inc": {"version": 1}})
+        if result.modified_count:
+            inc("pantry_summary.seeds", result="done")
+            return {"_id": user_id, **seeded, "version": version + 1}
+        # a write (or another seed) landed during the scan
+        doc = collection.find_one({"_id": user_id})
+    # writes keep arriving: answer from the last scan and seed on a later read
+    inc("pantry_summary.seeds", result="conflict")
+    return {"_id": user_id, **seeded, "seeded": False}
+
+
+def fold(doc, today=None):
+    """Move days before today out of a summary document's by_date.
+
+    Returns False when a concurrent write changed the summary since `doc` was
+    read; the fold is then left for later. Zero counts are dropped as well.
+    """
+    today = (today or date.today()).isoformat()
+    by_date = doc.get("by_date") or {}
+    past = {day: n for day, n in by_date.items() if day < today}
+    unset = {f"by_date.{day}": "" for day, n in by_date.items() if day < today or not n}
+    for field in ("by_quantity", "by_category"):
+        unset.update({f"{field}.{key}": "" for key, n in (doc.get(field) or {}).items() if not n})
+    for category, days in (doc.get("by_category_date") or {}).items():
+        stale = [day for day, n in days.items() if day < today or not n]
+        if len(stale) == len(days):
+            unset[f"by_category_date.{category}"] = ""
+        else:
+            unset.update({f"by_category_date.{category}.{day}": "" for day in stale})
+
+    update = {"$set": {"as_of": today}, "$inc": {"version": 1}}
+    if past:
+        update["$inc"]["past"] = sum(past.values())
+    if unset:
+        update["$unset"] = unset
+    result = PantrySummary._get_collection().update_one({"_id": doc["_id"], "version": doc.get("version", 0)}, update)
+    inc("pantry_summary.folds", result="done" if result.modified_count else "conflict")
+    return bool(result.modified_count)
+
+
+def fold_all(today=None):
+    """Fold every summary not yet folded today; returns (folded, left for later)"""
+    today = today or date.today()
+    folded = conflicts = 0
+    for doc in PantrySummary._get_collection().find({"as_of": {"$ne": today.isoformat()}, "seeded": True}):
+        if fold(doc, today):
+            folded += 1
+        else:
+            conflicts += 1
+    return folded, conflicts
+
+
+def summarize(doc, windows=DEFAULT_WINDOWS, today=None):
+    """expiry_engine.expiry_summary's output, from a summary document"""
+    windows = sorted(set(windows))
+    today = today or date.today()
+    start = today.isoformat()
+    horizons = [(str(n), (today + timedelta(days=n)).isoformat()) for n in windows]
+    soon_end = horizons[-1][1]
+
+    expired = doc.get("past", 0)
+    within = {label: 0 for label, _ in horizons}
+    next_expiration = None
+    for day, n in (doc.get("by_date") or {}).items():
+        if day < start:
+            expired += n
+            continue
+        if n and (next_expiration is None or day < next_expiration):
+            next_expiration = day
+        for label, end in horizons:
+            if day <= end:
+                within[label] += n
+
+    category_days = doc.get("by_category_date") or {}
+    return {
+        "total": doc.get("total", 0),
+        "expired": expired,
+        "expiring_within": within,
+        "next_expiration": next_expiration,
+        "by_category": {
+            _unkey(category): {"total": n, "expiring": sum(count for day, count in category_days.get(category, {}).items()
+                                                          if start <= day <= soon_end)}
+            for category, n in (doc.get("by_category") or {}).items() if n
+        },
+        "by_quantity": {_unkey(quantity): n for quantity, n in (doc.get("by_quantity") or {}).items() if n},
+    }
+
+
+def get_summary(user_id, windows=DEFAULT_WINDOWS, today=None):
+    """The user's expiry summary, read from their PantrySummary"""
+    today = today or date.today()
+    with span("db.pantry_summary"):
+        doc = PantrySummary._get_collection().find_one({"_id": user_id})
+    if doc is None or not doc.get("seeded"):
+        doc = _seed(user_id, doc)
+    if doc.get("seeded") and (doc.get("as_of") or "") < today.isoformat():
+        fold(doc, today)
+    return summarize(doc, windows, today)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    parser = argparse.ArgumentParser(description="Maintain per-user pantry summaries")
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument("--fold", action="store_true", help="fold past days out of every summary")
+    action.add_argument("--rebuild", action="store_true", help="recompute summaries from the food collection")
+    parser.add_argument("--date", type=date.fromisoformat, help="fold as of this day, not after today (default today)")
+    parser.add_argument("--user", type=uuid.UUID, action="append", help="rebuild only this user (repeatable)")
+    args = parser.parse_args()
+
+    if args.fold:
+        folded, conflicts = fold_all(args.date)
+        logger.info("Folded %d summaries, %d changed meanwhile and fold on their next read", folded, conflicts)
+    else:
+        logger.info("Rebuilt %d summaries", rebuild(args.user))
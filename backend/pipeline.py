@@ -0,0 +1,127 @@
+# pipeline.py
+# Timed stages for the upload routes in app.py.
+#
+# Each blocking step (vision call, OCR, USDA validation, DB access, recipe
+# lookup) runs in an executor under its own timeout, so a slow upstream fails
+# that request with a 504 instead of holding its worker for as long as the
+# upstream takes. Tesseract is CPU-bound and goes to a process pool;
+# everything else is I/O and goes to a shared thread pool. The views stay
+# synchronous: the request thread waits on the stage's future.
+#
+# A timeout drops a call still queued for a worker, but one already running
+# finishes in the background, since Python can't interrupt it. Stages that
+# write ("save") therefore have no timeout; a client retrying after a 504
+# would otherwise save its items twice. The driver's own timeouts
+# (models.MONGO_POOL) bound them, and fail in the writing thread, so the
+# outcome is always known.
+#
+# Every stage is timed as the "stage.<name>" span (metrics_helper), queueing
+# for a worker included; thread-pool stages also see the request's trace.
+import contextvars
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeout
+from functools import partial
+
+from metrics_helper import span
+
+IO_WORKERS = int(os.getenv("PIPELINE_IO_WORKERS", "32"))
+OCR_WORKERS = int(os.getenv("PIPELINE_OCR_WORKERS", str(os.cpu_count() or 2)))
+
+# seconds; None (or 0 in the environment) waits as long as the call takes
+STAGE_TIMEOUTS = {
+    "vision": float(os.getenv("VISION_TIMEOUT", "30")) or None,
+    "ocr": float(os.getenv("OCR_TIMEOUT", "30")) or None,
+    "usda": float(os.getenv("USDA_STAGE_TIMEOUT", "20")) or None,
+    "db": float(os.getenv("DB_TIMEOUT", "10")) or None,     # reads
+    "recipes": float(os.getenv("RECIPES_TIMEOUT", "15")) or None,
+    "save": None,                                            # writes, see above
+}
+
+
+class StageTimeout(Exception):
+    def __init__(self, stage):
+        super().__init__(f"{stage} stage timed out after {STAGE_TIMEOUTS[stage]:g}s")
+        self.stage = stage
+
+
+_io_executor = None
+_cpu_executor = None
+_lock = threading.Lock()
+
+
+def io_executor():
+    global _io_executor
+    with _lock:
+        if _io_executor is None:
+            _io_executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="pipeline-io")
+        return _io_executor
+
+
+def cpu_executor():
+    global _cpu_executor
+    with _lock:
+        if _cpu_executor is None:
+            # spawn, not fork: the server process is multi-threaded
+            _cpu_executor = ProcessPoolExecutor(max_workers=OCR_WORKERS,
+                                                mp_context=multiprocessing.get_context("spawn"))
+        return _cpu_executor
+
+
+def _submit(fn, *args, cpu=False, **kwargs):
+    if cpu:
+        return cpu_executor().submit(partial(fn, *args, **kwargs))
+    # spans recorded in the worker thread land in this request's trace
+    return io_executor().submit(contextvars.copy_context().run, partial(fn, *args, **kwargs))
+
+
+def run_stage(stage, fn, *args, cpu=False, **kwargs):
+    """Run fn(*args, **kwargs) in an executor, bounded by STAGE_TIMEOUTS[stage].
+
+    With cpu=True, fn and its arguments must be picklable. Raises StageTimeout
+    when the stage runs past its timeout.
+    """
+    with span(f"stage.{stage}"):
+        future = _submit(fn, *args, cpu=cpu, **kwargs)
+        try:
+            return future.result(STAGE_TIMEOUTS[stage])
+        except FutureTimeout:
+            future.cancel()
+            raise StageTimeout(stage)
+
+
+def map_stage(stage, fn, items, limit, **kwargs):
+    """Run fn(item, **kwargs) for every item, at most `limit` calls at once.
+
+    Each call gets the stage's full timeout from the moment it starts. Returns
+    one entry per item, in order: the call's result, or the exception it
+    raised (StageTimeout when it ran too long).
+    """
+    timeout = STAGE_TIMEOUTS[stage]
+    results = [None] * len(items)
+    waiting = list(enumerate(items))[::-1]
+    running = {}    # future -> (index, deadline)
+    with span(f"stage.{stage}"):
+        while waiting or running:
+            while waiting and len(running) < limit:
+                index, item = waiting.pop()
+                deadline = time.monotonic() + timeout if timeout is not None else None
+                running[_submit(fn, item, **kwargs)] = (index, deadline)
+            deadlines = [deadline for _, deadline in running.values() if deadline is not None]
+            patience = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+            done, _ = wait(running, timeout=patience, return_when=FIRST_COMPLETED)
+            now = time.monotonic()
+            for future, (index, deadline) in list(running.items()):
+                if future in done:
+                    error = future.exception()
+                    results[index] = error if error is not None else future.result()
+                elif deadline is not None and now >= deadline:
+                    future.cancel()
+                    results[index] = StageTimeout(stage)
+                else:
+                    continue
+                del running[future]
+    return results
@@ -0,0 +1,159 @@
+# receipt_ocr.py
+# Receipt image -> text, faster than one Tesseract pass over the raw photo.
+#
+# The photo is converted to grayscale, cropped to the (bright) paper, deskewed
+# and binarized with Otsu's threshold. Tall receipts are then cut into
+# horizontal bands along blank rows between text lines, and the bands are
+# OCR'd in parallel (one single-threaded tesseract process each) and joined
+# back in order. Only Pillow is used; row ink profiles come from shrinking the
+# image to one pixel wide with a BOX filter.
+#
+# Every pipeline OCR worker process (PIPELINE_OCR_WORKERS) may be banding a
+# receipt at once, so each runs at most OCR_BAND_WORKERS bands, by default
+# its share of the cores, keeping the host to about one tesseract per core.
+# With a single band the gain is the preprocessing: benchmarks/
+# bench_receipt_ocr.py reads the fixture receipts as accurately as one pass
+# over the raw image, in less time. RECEIPT_OCR_MODE=single restores that pass.
+import os
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps
+
+from pipeline import OCR_WORKERS
+
+RECEIPT_OCR_MODE = os.getenv("RECEIPT_OCR_MODE", "bands")      # "bands" or "single" (raw, one pass)
+OCR_BAND_WORKERS = int(os.getenv("OCR_BAND_WORKERS", str(max(1, (os.cpu_count() or 2) // OCR_WORKERS))))
+MIN_BAND_HEIGHT = int(os.getenv("OCR_MIN_BAND_HEIGHT", "400"))  # px; shorter receipts are OCR'd whole
+BAND_CONFIG = "--psm 6"                                         # each band is a uniform block of text
+DESKEW_MAX_ANGLE = 5.0
+DESKEW_STEP = 0.5
+
+
+def otsu_threshold(gray):
+    hist = gray.histogram()[:256]
+    total = sum(hist)
+    sum_all = sum(i * h for i, h in enumerate(hist))
+    sum_bg = weight_bg = 0
+    best, threshold = -1.0, 127
+    for i, h in enumerate(hist):
+        weight_bg += h
+        if weight_bg == 0:
+            continue
+        weight_fg = total - weight_bg
+        if weight_fg == 0:
+            break
+        sum_bg += i * h
+        mean_bg = sum_bg / weight_bg
+        mean_fg = (sum_all - sum_bg) / weight_fg
+        between = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+        if between > best:
+            best, threshold = between, i
+    return threshold
+
+
+def row_profile(gray):
+    """Mean brightness of each row (0 = all ink, 255 = blank)"""
+    return list(gray.resize((1, gray.height), Image.BOX).getdata())
+
+
+def crop_to_paper(gray):
+    threshold = otsu_threshold(gray)
+    paper = gray.point(lambda p: 255 if p > threshold else 0)
+    bbox = paper.getbbox()
+    # only crop when the paper is clearly smaller than the photo
+    if bbox and (bbox[2] - bbox[0]) * (bbox[3] - bbox[1]) < 0.9 * gray.width * gray.height:
+        return gray.crop(bbox)
+    return gray
+
+
+def deskew(gray):
+    """Rotate by the small angle whose row profile is sharpest (text lines level)"""
+    small = gray.copy()
+    small.thumbnail((400, 400))
+    threshold = otsu_threshold(small)
+    ink = small.point(lambda p: 255 if p <= threshold else 0)
+
+    def sharpness(angle):
+        profile = row_profile(ink.rotate(angle, resample=Image.BILINEAR, expand=True))
+        mean = sum(profile) / len(profile)
+        return sum((v - mean) ** 2 for v in profile)
+
+    steps = int(DESKEW_MAX_ANGLE / DESKEW_STEP)
+    best = max((i * DESKEW_STEP for i in range(-steps, steps + 1)), key=sharpness)
+    if best == 0:
+        return gray
+    return gray.rotate(best, resample=Image.BICUBIC, expand=True, fillcolor=255)
+
+
+def preprocess_receipt(img):
+    gray = ImageOps.exif_transpose(img).convert("L")
+    gray = deskew(crop_to_paper(gray))
+    threshold = otsu_threshold(gray)
+    return gray.point(lambda p: 255 if p > threshold else 0)
+
+
+def split_bands(binary, parts):
+    """Cut into about `parts` bands, each cut on the blankest row near the even split"""
+    height = binary.height
+    parts = max(1, min(parts, height // MIN_BAND_HEIGHT))
+    if parts == 1:
+        return [binary]
+    profile = row_profile(binary)
+    window = height // (parts * 4)
+    cuts = [0]
+    for k in range(1, parts):
+        target = k * height // parts
+        lo, hi = max(cuts[-1] + 1, target - window), min(height - 1, target + window)
+        cuts.append(max(range(lo, hi + 1), key=lambda y: (profile[y], -abs(y - target)))
+                    if lo <= hi else target)
+    cuts.append(height)
+    return [binary.crop((0, top, binary.width, bottom)) for top, bottom in zip(cuts, cuts[1:])]
+
+
+# pytesseract pulls in pandas when it is installed, so it is imported by the
+# OCR workers on first use rather than by every process that imports this module
+def image_to_string(img, config=""):
+    import pytesseract
+    # Optional: path to tesseract if not in PATH
+    # pytesseract.pytesseract.tesseract_cmd = r'/usr/local/bin/tesseract'
+    return pytesseract.image_to_string(img, config=config)
+
+
+# pytesseract always hands tesseract this process's environment, so bands run
+# the binary it is configured with directly. The bands already spread over the
+# cores; OMP_THREAD_LIMIT=1 keeps each tesseract from fanning out too.
+def band_to_string(band):
+    import pytesseract
+    with tempfile.TemporaryDirectory() as tmp:
+        image_path, output_base = os.path.join(tmp, "band.png"), os.path.join(tmp, "band")
+        band.save(image_path)
+        proc = subprocess.run([pytesseract.pytesseract.tesseract_cmd, image_path, output_base,
+                               *BAND_CONFIG.split(), "txt"],
+                              env=dict(os.environ, OMP_THREAD_LIMIT="1"), capture_output=True)
+        if proc.returncode:
+            raise pytesseract.TesseractError(proc.returncode, proc.stderr.decode(errors="replace").strip())
+        with open(output_base + ".txt", encoding="utf-8") as f:
+            return f.read()
+
+
+def ocr_single(img):
+    """The original path: one pass over the unprocessed image"""
+    return image_to_string(img)
+
+
+def ocr_bands(img, workers=OCR_BAND_WORKERS):
+    bands = split_bands(preprocess_receipt(img), workers)
+    if len(bands) == 1:
+        return band_to_string(bands[0])
+    # tesseract runs as a subprocess, so threads are enough to use every core
+    with ThreadPoolExecutor(max_workers=min(workers, len(bands))) as pool:
+        texts = pool.map(band_to_string, bands)
+    return "\n".join(text.rstrip("\n") for text in texts)
+
+
+def ocr_image(img):
+    if RECEIPT_OCR_MODE == "single":
+        return ocr_single(img)
+    return ocr_bands(img)
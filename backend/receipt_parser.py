@@ -1,90 +1,239 @@
-import pytesseract
 from PIL import Image
+from receipt_ocr import ocr_image
 import re
 import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import io
+import logging
 import os
+import sqlite3
+import threading
+import time
 
-load_dotenv()  # load USDA_API_KEY from .env
+from metrics_helper import inc, span
 
-# Optional: path to tesseract if not in PATH
-# pytesseract.pytesseract.tesseract_cmd = r'/usr/local/bin/tesseract'
+load_dotenv()  # load USDA_API_KEY from .env
+logger = logging.getLogger(__name__)
 
 usda_api_key = os.getenv("USDA_API_KEY")
+USDA_SEARCH_URL = os.getenv("USDA_API_URL", "https://api.nal.usda.gov/fdc/v1/foods/search")
+USDA_TIMEOUT = float(os.getenv("USDA_TIMEOUT", "5"))              # seconds per request
+USDA_MAX_WORKERS = int(os.getenv("USDA_MAX_WORKERS", "8"))        # concurrent lookups per process
+USDA_CACHE_PATH = os.getenv("USDA_CACHE_PATH", os.path.join(os.path.dirname(__file__), "usda_cache.sqlite3"))
+USDA_CACHE_TTL = int(os.getenv("USDA_CACHE_TTL", str(30 * 24 * 3600)))  # seconds
+
+
+# --- Persistent USDA result cache (item name -> is food) ---
+class FoodValidationCache:
+    def __init__(self, path=USDA_CACHE_PATH, ttl=USDA_CACHE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS usda_foods (name TEXT PRIMARY KEY, is_food INTEGER, checked_at REAL)"
+        )
+        self._conn.commit()
+
+    def get_many(self, names):
+        """Cached answers for names checked within the TTL"""
+        if not names:
+            return {}
+        cutoff = time.time() - self.ttl
+        placeholders = ",".join("?" * len(names))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT name, is_food FROM usda_foods WHERE checked_at >= ? AND name IN ({placeholders})",
+                [cutoff, *names],
+            ).fetchall()
+        return {name: bool(found) for name, found in rows}
+
+    def put_many(self, results):
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO usda_foods (name, is_food, checked_at) VALUES (?, ?, ?)",
+                [(name, int(found), now) for name, found in results.items()],
+            )
+            self._conn.commit()
+
+
+_cache = None
+_session = None
+_executor = None
+_init_lock = threading.Lock()
+
+
+def _get_cache():
+    global _cache
+    with _init_lock:
+        if _cache is None:
+            _cache = FoodValidationCache()
+        return _cache
+
+
+def _get_session():
+    global _session
+    with _init_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=USDA_MAX_WORKERS)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+
+def _get_executor():
+    global _executor
+    with _init_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=USDA_MAX_WORKERS, thread_name_prefix="usda")
+        return _executor
+
+
+def _query_usda(item_name):
+    """One FoodData Central search; None when the lookup itself failed"""
+    params = {"query": item_name, "pageSize": 1, "api_key": usda_api_key}
+    try:
+        with span("usda.request"):
+            response = _get_session().get(USDA_SEARCH_URL, params=params, timeout=USDA_TIMEOUT)
+            response.raise_for_status()
+            return len(response.json().get("foods", [])) > 0
+    except Exception as e:
+        logger.warning("Error querying USDA API: %s", e)
+        return None
+
+
+def validate_foods(item_names):
+    """Map each item name to whether it exists in USDA FoodData Central.
+
+    Names already in the on-disk cache are answered locally; the rest are
+    looked up concurrently (at most USDA_MAX_WORKERS at a time). Failed
+    lookups count as food and are not cached.
+    """
+    names = list(dict.fromkeys(n.strip().lower() for n in item_names))
+    if not usda_api_key:
+        logger.warning("USDA_API_KEY not set. Skipping food validation.")
+        return {name: True for name in names}  # fallback: consider all items food
+
+    cache = _get_cache()
+    with span("usda.cache"):
+        results = cache.get_many(names)
+    missing = [name for name in names if name not in results]
+    inc("usda.cache", len(results), result="hit")
+    inc("usda.cache", len(missing), result="miss")
+    if missing:
+        fetched = dict(zip(missing, _get_executor().map(_query_usda, missing)))
+        cache.put_many({name: found for name, found in fetched.items() if found is not None})
+        results.update({name: found is not False for name, found in fetched.items()})
+    return results
 
 
 def is_food(item_name):
     """Check if item_name exists in USDA FoodData Central"""
-    if not usda_api_key:
-        print("Warning: USDA_API_KEY not set. Skipping food validation.")
-        return True  # fallback: consider all items food
-    query = item_name
-    url = f"https://api.nal.usda.gov/fdc/v1/foods/search?query={query}&api_key={usda_api_key}"
-    try:
-        response = requests.get(url).json()
-        return len(response.get("foods", [])) > 0
-    except Exception as e:
-        print(f"Error querying USDA API: {e}")
-        return True  # fallback
+    return validate_foods([item_name])[item_name.strip().lower()]
 
 
-def parse_receipt(image_path):
-    img = Image.open(image_path)
-    text = pytesseract.image_to_string(img)
-    lines = text.split("\n")
+def ocr_receipt(image):
+    """Receipt text from a file path, raw bytes or a file-like object"""
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        image = io.BytesIO(image)
+    elif hasattr(image, "seek"):
+        image.seek(0)
+    with Image.open(image) as img:
+        return ocr_image(img)
 
-    result = {"store": None, "date": None, "items": []}
 
-    for line in lines:
-        if line.strip():
-            result["store"] = line.strip()
-            break
+def parse_receipt(image):
+    return parse_receipt_text(ocr_receipt(image))
+
 
-    date_patterns = [
-        r"(\d{1,2}/\d{1,2}/\d{4})",       # MM/DD/YYYY
-        r"(\d{4}-\d{1,2}-\d{1,2})"        # YYYY-MM-DD
-    ]
+# --- Receipt line classification ---
+# Every line is tagged in one pass: the first non-blank line is the header
+# (store name, and the date when it is printed there too), then date, total
+# (total/cash/change/loyalty), tax or item.
+# Cheap substring checks run before any regex, and item lines are parsed
+# lowercased so the patterns don't need re.I.
+HEADER, DATE, TOTAL, TAX, ITEM = "header", "date", "total", "tax", "item"
+
+DATE_RE = re.compile(r"\d{1,2}/\d{1,2}/\d{4}|\d{4}-\d{1,2}-\d{1,2}")   # MM/DD/YYYY, YYYY-MM-DD
+PRICE_RE = re.compile(r"\$?\d+\.\d{2}")
+# "2lbs", "3oz", "12ct" (no unit); a unit must end its word, so "2 large" is 2 of "large"
+QUANTITY_RE = re.compile(r"(\d+)\s*(?:(oz|lb|g|kg|ml|l)s?\b)?|x(\d+)")
+
+ReceiptLine = namedtuple("ReceiptLine", "kind text fields")
+
+
+def classify_lines(text):
+    """Yield a ReceiptLine for each non-blank line of OCR text.
+
+    Item lines carry fields {"name", "quantity", "unit"}; date lines {"date"},
+    and so does the header when a date is printed on it.
+    """
+    search_date = DATE_RE.search
+    lines = iter(text.split("\n"))
     for line in lines:
-        for pattern in date_patterns:
-            match = re.search(pattern, line)
-            if match:
-                result["date"] = match.group(1)
-                break
-        if result["date"]:
+        line = line.strip()
+        if line:
+            date_match = search_date(line)
+            yield ReceiptLine(HEADER, line, {"date": date_match.group(0)} if date_match else {})
             break
 
-    # --- Detect items with quantities ---
-    quantity_pattern = r"(\d+\s*(?:oz|lb|g|kg|ml|l)?)|x(\d+)"
-    price_pattern = r"\$?\d+\.\d{2}"
-
-    raw_items = []
     for line in lines:
         line = line.strip()
-        if not line or re.search(r"total|cash|change|tax|loyalty", line, re.I):
+        if not line:
             continue
-
-        # Remove price from line
-        line_no_price = re.sub(price_pattern, "", line)
-
-        # Find quantity
-        qty_match = re.search(quantity_pattern, line_no_price, re.I)
-        if qty_match:
-            quantity = qty_match.group(0)
-            name = line_no_price.replace(quantity, "").strip()
+        date_match = search_date(line) if ("/" in line or "-" in line) else None
+        if date_match:
+            yield ReceiptLine(DATE, line, {"date": date_match.group(0)})
+            continue
+        low = line.lower()
+        if "total" in low or "cash" in low or "change" in low or "loyalty" in low:
+            yield ReceiptLine(TOTAL, line, {})
+        elif "tax" in low:
+            yield ReceiptLine(TAX, line, {})
         else:
-            quantity = "1"
-            name = line_no_price.strip()
+            fields = parse_item_line(low)
+            if fields:
+                yield ReceiptLine(ITEM, line, fields)
+
+
+def parse_item_line(line):
+    """{"name", "quantity", "unit"} for an item line, or None if no name is left"""
+    line = line.lower()
+    if "." in line:
+        line = PRICE_RE.sub("", line)
+    qty_match = QUANTITY_RE.search(line)
+    if qty_match:
+        quantity = qty_match.group(1) or qty_match.group(3)
+        unit = qty_match.group(2)
+        line = line[:qty_match.start()] + " " + line[qty_match.end():]
+    else:
+        quantity, unit = "1", None
+    name = " ".join(line.split())
+    if not name:
+        return None
+    return {"name": name, "quantity": quantity, "unit": unit}
+
+
+def parse_receipt_text(text):
+    result = {"store": None, "date": None, "items": []}
 
-        if name:
-            raw_items.append({"name": name.lower(), "quantity": quantity})
+    raw_items = []
+    for line in classify_lines(text):
+        if line.kind == ITEM:
+            raw_items.append(line.fields)
+        elif line.kind == HEADER:
+            result["store"] = line.text
+            result["date"] = line.fields.get("date")
+        elif line.kind == DATE and result["date"] is None:
+            result["date"] = line.fields["date"]
 
     # --- Filter items to keep only foods ---
-    filtered_items = []
-    for item in raw_items:
-        if is_food(item["name"]):
-            filtered_items.append(item)
-
-    result["items"] = filtered_items
+    food_names = validate_foods([item["name"] for item in raw_items])
+    result["items"] = [item for item in raw_items if food_names[item["name"].strip().lower()]]
     return result
 
 
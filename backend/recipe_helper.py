@@ -0,0 +1,133 @@
+# recipe_helper.py
+# Spoonacular findByIngredients lookups and the zero-waste recipe built from
+# them, for both detected (image) and stored (pantry) items.
+#
+# Results are cached in memory (LRU + TTL) keyed on the sorted, normalized
+# ingredient set and the number of recipes asked for, so "Milk, eggs" and
+# "eggs,milk" share an entry. Concurrent identical lookups are coalesced into
+# one upstream request, and requests go through one pooled session with a
+# timeout. Failed lookups return [] and are not cached.
+import logging
+import os
+import re
+import threading
+
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+from cache_helper import TTLCache, SingleFlight
+from recipe_ranking import PantryIndex, rank_recipes
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+spoonacular_api_key = os.getenv("SPOONACULAR_API_KEY")
+SPOONACULAR_URL = os.getenv("SPOONACULAR_API_URL", "https://api.spoonacular.com/recipes/findByIngredients")
+SPOONACULAR_TIMEOUT = float(os.getenv("SPOONACULAR_TIMEOUT", "5"))        # seconds per request
+SPOONACULAR_POOL_SIZE = int(os.getenv("SPOONACULAR_POOL_SIZE", "8"))      # pooled connections
+RECIPE_CANDIDATES = int(os.getenv("RECIPE_CANDIDATES", "10"))             # recipes fetched, then ranked locally
+RECIPE_TOP_K = int(os.getenv("RECIPE_TOP_K", "3"))                         # best one in full, the rest by title
+
+RECIPE_CACHE = TTLCache(maxsize=int(os.getenv("RECIPE_CACHE_SIZE", "512")),
+                        ttl=int(os.getenv("RECIPE_CACHE_TTL", str(6 * 3600))))
+_inflight = SingleFlight()
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def _get_session():
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=SPOONACULAR_POOL_SIZE)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+
+def normalize_ingredients(ingredients):
+    """Sorted, de-duplicated, lowercased ingredient names (Food objects or strings)"""
+    names = (getattr(item, "name", item) for item in ingredients)
+    return sorted({re.sub(r"\s+", " ", name).strip().lower() for name in names if name and name.strip()})
+
+
+def recipe_cache_key(ingredients, number):
+    return f"{number}|{','.join(ingredients)}"
+
+
+def _fetch_recipes(ingredients, number):
+    """One findByIngredients request; None when it failed"""
+    params = {"ingredients": ",".join(ingredients), "number": number, "apiKey": spoonacular_api_key}
+    try:
+        response = _get_session().get(SPOONACULAR_URL, params=params, timeout=SPOONACULAR_TIMEOUT)
+        response.raise_for_status()
+        recipes = response.json()
+    except Exception as e:
+        logger.warning("Error querying Spoonacular API: %s", e)
+        return None
+    # errors (quota, bad key) come back as a JSON object rather than a list
+    return recipes if isinstance(recipes, list) else None
+
+
+def get_recipes(expiring_items, number: int = 3, use_cache: bool = True):
+    """Recipes using the given items (Food objects or names); [] when none were found."""
+    ingredients = normalize_ingredients(expiring_items)
+    if not ingredients:
+        return []
+    key = recipe_cache_key(ingredients, number)
+    if use_cache:
+        cached = RECIPE_CACHE.get(key)
+        if cached is not None:
+            return cached
+
+    def fetch():
+        if use_cache:
+            cached = RECIPE_CACHE.get(key)      # set by a lookup that finished after our check
+            if cached is not None:
+                return cached
+        recipes = _fetch_recipes(ingredients, number)
+        if recipes is None:
+            return []
+        RECIPE_CACHE.set(key, recipes)
+        return recipes
+
+    return _inflight.do(key, fetch)
+
+
+def recipe_stats():
+    return {"cache": RECIPE_CACHE.stats(), "upstream": _inflight.stats()}
+
+
+# -------------------- Ranking & Scaling --------------------
+def scale_recipe(recipe, fridge_items):
+    """One recipe's ingredients scaled to the fridge items, as "name: amount unit" lines"""
+    return rank_recipes([recipe], PantryIndex(fridge_items), k=1)[0]["ingredients"]
+
+
+def zero_waste_recipe(expiring, use_cache: bool = True) -> str:
+    """The best-ranked recipe for the expiring items (objects with name and quantity), as text"""
+    recipes = get_recipes(expiring, number=RECIPE_CANDIDATES, use_cache=use_cache)
+
+    if not recipes:
+        # Fallback message if Spoonacular returns nothing --> next best?
+        ingredient_list = ", ".join([f"{item.quantity} {item.name}" for item in expiring])
+        fallback_recipe = (
+            "No recipes found for your expiring items. "
+            f"Try combining the following items in a simple dish: {ingredient_list}. "
+        )
+        return fallback_recipe
+
+    best, *others = rank_recipes(recipes, PantryIndex(expiring), k=RECIPE_TOP_K)
+    recipe = best["recipe"]
+
+    output = f"Zero-Waste Recipe: {recipe.get('title', 'Untitled')}\n\nIngredients (scaled to your fridge items):\n"
+    output += "\n".join(best["ingredients"])
+    output += "\n\nInstructions: " + recipe.get('instructions', 'Refer to Spoonacular for full instructions.')
+    if others:
+        output += "\n\nAlso uses your expiring items: " + ", ".join(
+            other["recipe"].get("title", "Untitled") for other in others)
+
+    return output
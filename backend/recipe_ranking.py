@@ -0,0 +1,214 @@
+# recipe_ranking.py
+# Rank and scale candidate recipes against what is in the pantry.
+#
+# The pantry is indexed once: item names are tokenized (lowercase words,
+# made singular) into a token -> items index, and quantities such as
+# "500g", "1.5 l" or "2 cups" are parsed into grams, millilitres or a count
+# via UNITS. A recipe ingredient matches an item when every token of the
+# item's name appears in the ingredient's name ("cheddar cheese" matches
+# "shredded cheddar cheese", "egg" does not match "eggplant"). The soonest
+# expiring match wins. Matches are memoized per ingredient name, so hundreds
+# of recipes sharing ingredients cost one lookup each.
+#
+# A recipe scores the urgency of every distinct pantry item it uses, where an
+# item expiring today or earlier counts 1, tomorrow 1/2, in two days 1/3...
+# Each missing ingredient costs MISSING_PENALTY. Scaling takes the scarcest
+# matched ingredient (pantry amount / recipe amount, same dimension only),
+# clamped to [MIN_SCALE, MAX_SCALE].
+import heapq
+import re
+from datetime import date, datetime
+
+from text_helper import singular
+
+MISSING_PENALTY = 0.05
+MIN_SCALE, MAX_SCALE = 0.25, 4.0
+
+MASS, VOLUME, COUNT = "g", "ml", "count"
+
+# unit -> (dimension, amount of the base unit)
+UNITS = {
+    "mg": (MASS, 0.001), "g": (MASS, 1.0), "gram": (MASS, 1.0), "kg": (MASS, 1000.0), "kilogram": (MASS, 1000.0),
+    "oz": (MASS, 28.3495), "ounce": (MASS, 28.3495), "lb": (MASS, 453.592), "lbs": (MASS, 453.592),
+    "pound": (MASS, 453.592),
+    "ml": (VOLUME, 1.0), "milliliter": (VOLUME, 1.0), "millilitre": (VOLUME, 1.0), "cl": (VOLUME, 10.0),
+    "dl": (VOLUME, 100.0), "l": (VOLUME, 1000.0), "liter": (VOLUME, 1000.0), "litre": (VOLUME, 1000.0),
+    "tsp": (VOLUME, 4.92892), "teaspoon": (VOLUME, 4.92892), "tbsp": (VOLUME, 14.7868),
+    "tablespoon": (VOLUME, 14.7868), "fl oz": (VOLUME, 29.5735), "cup": (VOLUME, 236.588),
+    "pint": (VOLUME, 473.176), "pt": (VOLUME, 473.176), "quart": (VOLUME, 946.353), "qt": (VOLUME, 946.353),
+    "gallon": (VOLUME, 3785.41), "gal": (VOLUME, 3785.41),
+    "": (COUNT, 1.0), "piece": (COUNT, 1.0), "pc": (COUNT, 1.0), "pcs": (COUNT, 1.0), "whole": (COUNT, 1.0),
+    "each": (COUNT, 1.0), "large": (COUNT, 1.0), "medium": (COUNT, 1.0), "small": (COUNT, 1.0),
+    "dozen": (COUNT, 12.0),
+}
+
+AMOUNT_RE = re.compile(r"^\s*(\d+(?:\.\d+)?|\d+/\d+)\s*([a-z]+(?: oz)?)?\.?\s*$")
+WORD_RE = re.compile(r"[a-z]+")
+
+
+def tokens(name):
+    return frozenset(singular(word) for word in WORD_RE.findall(name.lower()))
+
+
+def unit_info(unit):
+    """(dimension, factor to the base unit) for a unit name, or None if unknown"""
+    unit = (unit or "").strip().lower().rstrip(".")
+    if unit in UNITS:
+        return UNITS[unit]
+    if unit.endswith("s") and unit[:-1] in UNITS:
+        return UNITS[unit[:-1]]
+    return None
+
+
+def to_base(amount, unit):
+    """(dimension, amount in g/ml/count), or None when the unit isn't convertible"""
+    info = unit_info(unit)
+    if info is None or amount is None:
+        return None
+    return info[0], float(amount) * info[1]
+
+
+def parse_quantity(quantity):
+    """A free-text quantity ("500g", "1.5 L", "2 cups", "12") in base units, or None"""
+    match = AMOUNT_RE.match(str(quantity or "").lower())
+    if not match:
+        return None
+    number, unit = match.groups()
+    if "/" in number:
+        numerator, denominator = number.split("/")
+        amount = float(numerator) / float(denominator) if float(denominator) else None
+    else:
+        amount = float(number)
+    return to_base(amount, unit)
+
+
+def _field(item, name):
+    return item.get(name) if isinstance(item, dict) else getattr(item, name, None)
+
+
+def _days_left(expiration, today):
+    if expiration is None:
+        return None
+    if isinstance(expiration, str):
+        expiration = date.fromisoformat(expiration[:10])
+    elif isinstance(expiration, datetime):
+        expiration = expiration.date()
+    return (expiration - today).days
+
+
+class PantryItem:
+    __slots__ = ("name", "tokens", "amount", "days_left", "urgency")
+
+    def __init__(self, name, quantity, days_left):
+        self.name = name
+        self.tokens = tokens(name)
+        self.amount = parse_quantity(quantity)
+        self.days_left = days_left
+        # unknown expiry ranks below anything with a date
+        self.urgency = 0.01 if days_left is None else 1.0 / (1 + max(days_left, 0))
+
+
+class PantryIndex:
+    """Token index over pantry items (objects or dicts with name, quantity and
+    expiration/expiration_date), soonest expiring first."""
+
+    def __init__(self, items, today=None):
+        today = today or date.today()
+        self.items = []
+        for item in items:
+            name = _field(item, "name")
+            if not name or not tokens(name):
+                continue
+            expiration = _field(item, "expiration") or _field(item, "expiration_date")
+            self.items.append(PantryItem(name, _field(item, "quantity"), _days_left(expiration, today)))
+        self.items.sort(key=lambda i: (i.days_left is None, i.days_left if i.days_left is not None else 0))
+
+        self._by_token = {}
+        for position, item in enumerate(self.items):
+            for token in item.tokens:
+                self._by_token.setdefault(token, []).append(position)
+        self._matches = {}
+
+    def __len__(self):
+        return len(self.items)
+
+    def match(self, ingredient_name):
+        """The soonest-expiring item whose name tokens all appear in ingredient_name, or None"""
+        key = ingredient_name.lower()
+        if key in self._matches:
+            return self._matches[key]
+        ingredient_tokens = tokens(key)
+        candidates = set()
+        for token in ingredient_tokens:
+            candidates.update(self._by_token.get(token, ()))
+        best = None
+        for position in sorted(candidates):
+            if self.items[position].tokens <= ingredient_tokens:
+                best = self.items[position]
+                break
+        self._matches[key] = best
+        return best
+
+
+def _ingredients(recipe):
+    return list(recipe.get("usedIngredients") or []) + list(recipe.get("missedIngredients") or [])
+
+
+def _scale(matched):
+    factors = []
+    for ingredient, item in matched:
+        need = to_base(ingredient.get("amount"), ingredient.get("unit"))
+        if need and item.amount and need[0] == item.amount[0] and need[1] > 0:
+            factors.append(item.amount[1] / need[1])
+    if not factors:
+        return 1.0
+    return min(MAX_SCALE, max(MIN_SCALE, min(factors)))
+
+
+def score_recipe(recipe, pantry):
+    """(score, [(ingredient, pantry item or None)]) for one recipe"""
+    pairs = [(ingredient, pantry.match(ingredient.get("name", ""))) for ingredient in _ingredients(recipe)]
+    used = {id(item): item for _, item in pairs if item is not None}
+    missing = len(pairs) - sum(1 for _, item in pairs if item is not None)
+    return sum(item.urgency for item in used.values()) - MISSING_PENALTY * missing, pairs
+
+
+def _ingredient_line(ingredient, scale):
+    """One ingredient as "name: amount unit". Spoonacular sends "amount": null /
+    "unit": null for some; without an amount the line is "name: unit" or "name"."""
+    amount, unit = ingredient.get("amount"), ingredient.get("unit") or ""
+    if amount is None:
+        return f"{ingredient['name']}: {unit}" if unit else ingredient["name"]
+    return f"{ingredient['name']}: {amount * scale:.2f} {unit}".rstrip()
+
+
+def scaled_ingredients(pairs, scale):
+    return [_ingredient_line(ingredient, scale) for ingredient, _ in pairs]
+
+
+def rank_recipes(recipes, pantry, k=3):
+    """The top k recipes for the pantry (a PantryIndex or its items), best first.
+
+    Each result has recipe, score, scale, expiring_used (pantry names, soonest
+    first) and ingredients (scaled, as "name: amount unit" lines).
+    """
+    if not isinstance(pantry, PantryIndex):
+        pantry = PantryIndex(pantry)
+    scored = []
+    for position, recipe in enumerate(recipes):
+        score, pairs = score_recipe(recipe, pantry)
+        # ties keep Spoonacular's order
+        scored.append((score, -position, pairs, recipe))
+    results = []
+    for score, _, pairs, recipe in heapq.nlargest(k, scored, key=lambda s: (s[0], s[1])):
+        scale = _scale([(ingredient, item) for ingredient, item in pairs if item is not None])
+        used = sorted({id(item): item for _, item in pairs if item is not None}.values(),
+                      key=lambda i: i.urgency, reverse=True)
+        results.append({
+            "recipe": recipe,
+            "score": round(score, 4),
+            "scale": round(scale, 3),
+            "expiring_used": [item.name for item in used],
+            "ingredients": scaled_ingredients(pairs, scale),
+        })
+    return results
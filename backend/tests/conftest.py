@@ -0,0 +1,31 @@
+# Shared test setup: the backend on an in-memory mongomock database (emptied
+# before every test), with its on-disk caches in a scratch directory and the
+# offline stand-ins from benchmarks/ importable.
+# Run from backend/: python -m pytest -q
+import os
+import sys
+import tempfile
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TESTS_DIR, ".."))
+sys.path.insert(0, os.path.join(TESTS_DIR, "..", "benchmarks"))
+
+SCRATCH_DIR = tempfile.mkdtemp(prefix="freshly-yours-tests-")
+os.environ.setdefault("VISION_CACHE_PATH", os.path.join(SCRATCH_DIR, "vision_cache.sqlite3"))
+os.environ.setdefault("USDA_CACHE_PATH", os.path.join(SCRATCH_DIR, "usda_cache.sqlite3"))
+os.environ.setdefault("JOB_DB_PATH", os.path.join(SCRATCH_DIR, "jobs.sqlite3"))
+
+import mongoengine
+import pytest
+
+from fakes import use_mongomock
+
+use_mongomock()
+
+
+@pytest.fixture(autouse=True)
+def empty_database():
+    db = mongoengine.get_db()
+    for name in db.list_collection_names():
+        db.drop_collection(name)
+    yield
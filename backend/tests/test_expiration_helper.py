@@ -0,0 +1,40 @@
+import pytest
+
+import expiration_helper
+from expiration_helper import EXPIRATION_CACHE, normalize_name, resolve_food
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    EXPIRATION_CACHE.clear()
+    yield
+    EXPIRATION_CACHE.clear()
+
+
+def test_normalize_name_leaves_single_spaces_only():
+    assert normalize_name("  Whole\nMilk\t 2% ") == "whole milk 2"
+    assert normalize_name("bnls.chkn-brst/2%") == "bnls chkn brst 2"
+
+
+@pytest.mark.parametrize("name", ["bnls.chkn.brst", "bnls-chkn-brst", "chkn/brst", "BNLS CHKN BRST"])
+def test_punctuated_abbreviations_resolve_to_chicken(name):
+    row, kind, _ = expiration_helper.match_product(name)
+    assert kind == "fuzzy"
+    assert row["Name"] == "Chicken parts"
+
+
+@pytest.mark.parametrize("names", [("chkn.brst", "chkn brst"), ("chkn brst", "chkn.brst")])
+def test_names_sharing_a_cache_key_resolve_alike_in_any_order(names):
+    first, second = names
+    assert normalize_name(first) == normalize_name(second)
+    resolved = resolve_food(first)
+    EXPIRATION_CACHE.clear()
+    assert resolve_food(second) == resolved
+
+
+def test_fuzzy_matching_sees_the_normalized_name(monkeypatch):
+    seen = []
+    index = expiration_helper.get_fuzzy_index()
+    monkeypatch.setattr(index, "match", lambda name: seen.append(name) or (None, 0.0))
+    expiration_helper.match_product("Qwzx-Vrrp 12CT!")
+    assert seen == ["qwzx vrrp 12ct"]
@@ -0,0 +1,77 @@
+import random
+import uuid
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from expiry_sweep import ExpirySweep, run_sweep
+from models import ExpiryDigest, Food, SweepCheckpoint
+
+RUN_DATE = date(2026, 6, 1)
+
+
+@pytest.fixture
+def pantry():
+    """400 food rows over 25 users, expiring within two weeks either side of RUN_DATE"""
+    rng = random.Random(15)
+    users = [uuid.uuid4() for _ in range(25)]
+    base = datetime.combine(RUN_DATE, datetime.min.time())
+    docs = [{"user": rng.choice(users), "name": f"item {i}", "quantity": "small",
+             "expiration_date": base + timedelta(days=rng.randint(-14, 14), hours=rng.randint(0, 23))}
+            for i in range(400)]
+    Food._get_collection().insert_many(docs)
+    return docs
+
+
+def in_window(sweep, rows):
+    return [row for row in rows if sweep.window[0] <= row["expiration_date"] < sweep.window[1]]
+
+
+def assert_digested_once(sweep, rows):
+    expected = in_window(sweep, rows)
+    digests = list(ExpiryDigest._get_collection().find({"run": sweep.run}))
+    assert Counter(d["user"] for d in digests) == Counter({user: 1 for user in {row["user"] for row in expected}})
+    assert sum(d["expired"] + d["expiring"] for d in digests) == len(expected)
+    listed = [item["food_id"] for d in digests for item in d["items"]]
+    assert len(listed) == len(set(listed))
+    assert SweepCheckpoint.objects.get(id=sweep.run).rows == len(expected)
+
+
+def test_a_sweep_cut_short_resumes_where_it_stopped(pantry):
+    sweep = ExpirySweep(RUN_DATE, batch_rows=50)
+    total = len(in_window(sweep, pantry))
+
+    first = sweep.run_once(max_rows=total // 3)
+    assert first["status"] == "running"
+    assert total // 3 <= first["rows_read"] < total
+    second = sweep.run_once(max_rows=total // 3)
+    last = sweep.run_once()
+
+    assert last["status"] == "done"
+    assert first["rows_read"] + second["rows_read"] + last["rows_read"] == total
+    assert_digested_once(sweep, pantry)
+    assert sweep.run_once()["rows_read"] == 0
+
+
+def test_replaying_from_an_earlier_checkpoint_writes_no_digest_twice(pantry):
+    sweep = ExpirySweep(RUN_DATE, batch_rows=50)
+    sweep.run_once(max_rows=100)
+    earlier = SweepCheckpoint._get_collection().find_one({"_id": sweep.run})
+    sweep.run_once()
+
+    # as if the sweep died after writing digests but before its checkpoint
+    SweepCheckpoint._get_collection().replace_one({"_id": sweep.run}, earlier)
+    assert sweep.run_once()["status"] == "done"
+    assert_digested_once(sweep, pantry)
+
+
+def test_restart_discards_the_checkpoint_and_digests(pantry):
+    first = run_sweep(RUN_DATE, max_rows=100, batch_rows=50)
+    assert SweepCheckpoint.objects.get(id=RUN_DATE.isoformat()).last_user is not None
+
+    again = run_sweep(RUN_DATE, restart=True, batch_rows=50)
+
+    sweep = ExpirySweep(RUN_DATE)
+    assert again["rows_read"] == len(in_window(sweep, pantry)) > first["rows_read"]
+    assert_digested_once(sweep, pantry)
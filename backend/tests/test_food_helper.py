@@ -0,0 +1,65 @@
+from datetime import datetime
+
+from bson import ObjectId
+
+from food_helper import bulk_save_foods, item_key, merge_detected_items
+from models import Food, User
+
+
+def make_user():
+    return User(username="sam", name="Sam", password="x").save()
+
+
+def make_food(user, name, quantity="medium", **fields):
+    return Food(user=user, name=name, quantity=quantity, expiration_date=datetime(2030, 1, 1), **fields)
+
+
+def test_bulk_save_reports_invalid_items_by_input_index():
+    user = make_user()
+    foods = [make_food(user, "milk"), make_food(user, "eggs", quantity="huge"), make_food(user, None)]
+
+    saved, failed = bulk_save_foods(foods)
+
+    assert [food.name for food in saved] == ["milk"]
+    assert [(f["index"], f["name"]) for f in failed] == [(1, "eggs"), (2, None)]
+    assert Food.objects(user=user).count() == 1
+
+
+def test_bulk_save_maps_write_errors_back_to_input_indexes():
+    user = make_user()
+    taken = ObjectId()
+    Food._get_collection().insert_one({"_id": taken, "user": user.id, "name": "old", "quantity": "small",
+                                       "expiration_date": datetime(2030, 1, 1)})
+    foods = [make_food(user, "bad quantity", quantity="huge"), make_food(user, "milk"),
+             make_food(user, "duplicate", id=taken), make_food(user, "eggs")]
+
+    saved, failed = bulk_save_foods(foods)
+
+    # the unordered insert keeps going past the duplicate key
+    assert [food.name for food in saved] == ["milk", "eggs"]
+    assert [(f["index"], f["name"]) for f in failed] == [(0, "bad quantity"), (2, "duplicate")]
+    assert "duplicate key" in failed[1]["error"].lower()
+    assert sorted(food.name for food in Food.objects(user=user)) == ["eggs", "milk", "old"]
+
+
+def test_bulk_saved_foods_carry_their_stored_ids():
+    user = make_user()
+    saved, _ = bulk_save_foods([make_food(user, "milk"), make_food(user, "eggs")])
+
+    for food in saved:
+        assert Food.objects.get(id=food.id).name == food.name
+
+
+def test_item_key_merges_spellings_without_eating_words():
+    assert item_key("Fresh Eggs") == item_key("egg") == "egg"
+    assert item_key("Cabbage") == "cabbage"
+    assert item_key("Cabbage") != item_key("Cae")
+
+
+def test_merge_detected_items_across_photos():
+    merged = merge_detected_items([[("Eggs", "small"), ("Cabbage", "medium")],
+                                   [("egg", "large"), ("red cabbage", "small")]])
+
+    assert merged == [{"name": "Eggs", "quantity": "large", "images": [0, 1]},
+                      {"name": "Cabbage", "quantity": "medium", "images": [0]},
+                      {"name": "red cabbage", "quantity": "small", "images": [1]}]
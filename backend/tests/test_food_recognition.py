@@ -0,0 +1,59 @@
+import io
+from datetime import date, timedelta
+
+import pytest
+from PIL import Image
+
+import food_recognition
+from fakes import FakeOpenAI
+
+
+@pytest.fixture
+def vision(monkeypatch):
+    fake = FakeOpenAI(items=(("milk", "1"), ("eggs", "12")))
+    monkeypatch.setattr(food_recognition, "client", fake)
+    food_recognition.RECOGNITION_CACHE.clear()
+    return fake
+
+
+def photo(color):
+    buf = io.BytesIO()
+    Image.new("RGB", (800, 600), color).save(buf, "JPEG")
+    return buf.getvalue()
+
+
+def test_repeat_images_are_answered_from_the_cache(vision):
+    first = food_recognition.detect_items(photo((200, 10, 10)))
+    again = food_recognition.detect_items(io.BytesIO(photo((200, 10, 10))))
+
+    assert vision.calls == 1
+    assert again == first
+    assert [item.name for item in again.items] == ["milk", "eggs"]
+
+
+def test_different_images_and_use_cache_false_call_the_model(vision):
+    food_recognition.detect_items(photo((200, 10, 10)))
+    food_recognition.detect_items(photo((10, 200, 10)))
+    food_recognition.detect_items(photo((200, 10, 10)), use_cache=False)
+
+    assert vision.calls == 3
+
+
+def test_cache_survives_the_memory_tier(vision):
+    food_recognition.detect_items(photo((200, 10, 10)))
+    food_recognition.RECOGNITION_CACHE.memory.clear()
+    food_recognition.detect_items(photo((200, 10, 10)))
+
+    assert vision.calls == 1
+
+
+def test_expirations_are_recomputed_on_cache_hits(vision, monkeypatch):
+    in_a_week = date.today() + timedelta(days=7)
+    monkeypatch.setattr(food_recognition, "get_food_expiration", lambda name: {"expiration_date": in_a_week})
+    first = food_recognition.recognize_items(photo((200, 10, 10)))
+    monkeypatch.setattr(food_recognition, "get_food_expiration", lambda name: {"expiration_date": None})
+    again = food_recognition.recognize_items(photo((200, 10, 10)))
+
+    assert vision.calls == 1
+    assert {item.expiration for item in first.items} == {in_a_week}
+    assert {item.expiration for item in again.items} == {date.today() + timedelta(days=1)}
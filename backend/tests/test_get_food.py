@@ -0,0 +1,55 @@
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+import app as backend
+from food_helper import DEFAULT_PAGE_SIZE
+from models import Food
+
+
+@pytest.fixture
+def client():
+    return backend.app.test_client()
+
+
+def add_user_with_food(client, n):
+    user_id = client.post("/add-user", json={"username": "sam", "name": "Sam", "password": "x"}).json["id"]
+    start = datetime(2030, 1, 1)
+    # stored latest expiry first, so stored order and expiry order differ
+    Food._get_collection().insert_many([
+        {"user": uuid.UUID(user_id), "name": f"item {i}", "quantity": "medium",
+         "expiration_date": start - timedelta(days=i)}
+        for i in range(n)
+    ])
+    return user_id
+
+
+def test_get_food_returns_everything_in_stored_order_by_default(client):
+    n = DEFAULT_PAGE_SIZE + 1
+    user_id = add_user_with_food(client, n)
+
+    body = client.get(f"/get-food/{user_id}").json
+
+    assert [item["name"] for item in body["food_items"]] == [f"item {i}" for i in range(n)]
+    assert body["next_cursor"] is None
+
+
+def test_get_food_pages_by_expiry_when_asked(client):
+    user_id = add_user_with_food(client, 7)
+
+    names, cursor = [], None
+    while True:
+        params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+        body = client.get(f"/get-food/{user_id}", query_string=params).json
+        names += [item["name"] for item in body["food_items"]]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+
+    assert names == [f"item {i}" for i in reversed(range(7))]
+
+
+def test_get_food_rejects_a_bad_limit(client):
+    user_id = add_user_with_food(client, 1)
+    assert client.get(f"/get-food/{user_id}?limit=0").status_code == 400
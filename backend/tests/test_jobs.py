@@ -0,0 +1,179 @@
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import pytest
+
+import app as backend
+import jobs
+from jobs import DONE, RUNNING, JobQueue, JobStore
+from models import Food, User
+
+DEAD_PID = 999_999_999
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.sqlite3"))
+
+
+@pytest.fixture
+def user():
+    return User(username="sam", name="Sam", password="x").save()
+
+
+def backdate(store, job_id, seconds):
+    store._conn.execute("UPDATE jobs SET updated_at = updated_at - ? WHERE id = ?", (seconds, job_id))
+    store._conn.commit()
+
+
+def running_job(store, user, owner):
+    job_id = store.create("detect-food", str(user.id), b"photo", {}, owner)
+    assert store.claim(job_id, owner) is not None
+    return job_id
+
+
+def wait_for(store, job_id, status, timeout=5):
+    deadline = time.time() + timeout
+    while store.get(job_id)["status"] != status:
+        assert time.time() < deadline, store.get(job_id)
+        time.sleep(0.01)
+
+
+def test_only_jobs_with_an_expired_lease_are_taken_over(store, user, monkeypatch):
+    monkeypatch.setitem(jobs.HANDLERS, "detect-food", lambda user, payload, options, report: ([], {"ok": True}))
+    alive = running_job(store, user, owner=DEAD_PID - 1)
+    dead = running_job(store, user, owner=DEAD_PID)
+    backdate(store, dead, jobs.JOB_LEASE + 1)
+
+    queue = JobQueue(store)
+    assert queue.resume() == 1
+
+    wait_for(store, dead, DONE)
+    assert store.get(dead)["result"] == {"ok": True, "items_saved": [], "items_failed": []}
+    assert store.get(alive)["status"] == RUNNING
+
+
+def test_a_renewed_lease_is_not_taken_over(store, user):
+    job_id = running_job(store, user, owner=DEAD_PID)
+    backdate(store, job_id, jobs.JOB_LEASE + 1)
+    store.renew([job_id], DEAD_PID)
+
+    assert store.take_over_expired(owner=1) == []
+
+
+def test_an_expired_job_goes_to_one_process_only(store, user):
+    job_id = running_job(store, user, owner=DEAD_PID)
+    backdate(store, job_id, jobs.JOB_LEASE + 1)
+
+    assert store.take_over_expired(owner=1) == [job_id]
+    assert store.take_over_expired(owner=2) == []
+    assert store.claim(job_id, owner=2) is None
+    assert store.claim(job_id, owner=1) is not None
+
+
+def test_finished_jobs_are_purged_after_the_retention_period(store, user):
+    old = running_job(store, user, owner=1)
+    store.finish(old, result={})
+    backdate(store, old, jobs.JOB_RETENTION + 1)
+    recent = running_job(store, user, owner=1)
+    store.finish(recent, result={})
+    unfinished = running_job(store, user, owner=1)
+    backdate(store, unfinished, jobs.JOB_RETENTION + 1)
+
+    assert store.purge_finished() == 1
+    assert store.get(old) is None
+    assert store.get(recent) is not None and store.get(unfinished) is not None
+
+
+class Killed(BaseException):
+    """The process dying: not caught by the job's error handling"""
+
+
+@pytest.fixture
+def detect_handler(monkeypatch):
+    calls = []
+
+    def handler(user, payload, options, report):
+        calls.append(payload)
+        return ([Food(user=user, name=name, quantity="medium", expiration_date=datetime(2030, 1, 1))
+                 for name in ("milk", "eggs", "bread")], {"result": "success"})
+
+    monkeypatch.setitem(jobs.HANDLERS, "detect-food", handler)
+    return calls
+
+
+def die_then_resume(store, user, job_id):
+    assert store.get(job_id)["status"] == RUNNING
+    backdate(store, job_id, jobs.JOB_LEASE + 1)
+    assert JobQueue(store).resume() == 1
+    wait_for(store, job_id, DONE)
+    return store.get(job_id)["result"]
+
+
+def test_a_job_killed_after_its_save_is_not_saved_again(store, user, detect_handler, monkeypatch):
+    queue = JobQueue(store)
+    job_id = store.create("detect-food", str(user.id), b"photo", {}, queue.owner)
+
+    def killed(job_id, result=None, error=None):
+        raise Killed()
+
+    with monkeypatch.context() as patch:
+        patch.setattr(store, "finish", killed)
+        with pytest.raises(Killed):
+            queue._run(job_id)
+    assert Food.objects(user=user).count() == 3
+
+    result = die_then_resume(store, user, job_id)
+
+    assert len(detect_handler) == 1
+    assert Food.objects(user=user).count() == 3
+    assert sorted(item["food_id"] for item in result["items_saved"]) == \
+        sorted(str(food.id) for food in Food.objects(user=user))
+    assert result["result"] == "success"
+
+
+def test_a_job_killed_during_its_save_stores_each_food_once(store, user, detect_handler, monkeypatch):
+    queue = JobQueue(store)
+    job_id = store.create("detect-food", str(user.id), b"photo", {}, queue.owner)
+
+    save = jobs.bulk_save_foods
+
+    def partial_save(foods):
+        save(foods[:1])
+        raise Killed()
+
+    with monkeypatch.context() as patch:
+        patch.setattr(jobs, "bulk_save_foods", partial_save)
+        with pytest.raises(Killed):
+            queue._run(job_id)
+    assert [food.name for food in Food.objects(user=user)] == ["milk"]
+
+    result = die_then_resume(store, user, job_id)
+
+    assert len(detect_handler) == 1
+    assert sorted(food.name for food in Food.objects(user=user)) == ["bread", "eggs", "milk"]
+    assert [item["name"] for item in result["items_saved"]] == ["milk", "eggs", "bread"]
+    assert result["items_failed"] == []
+
+
+def test_importing_the_app_starts_no_job_queue():
+    code = "import threading, app; print(app.job_queue, [t.name for t in threading.enumerate()][1:])"
+    backend_dir = os.path.dirname(jobs.__file__)
+    out = subprocess.run([sys.executable, "-c", code], cwd=backend_dir, capture_output=True, text=True,
+                         check=True, env=dict(os.environ, PYTHONPATH=backend_dir)).stdout
+    assert out.split()[:1] == ["None"]
+    assert "jobs-heartbeat" not in out
+
+
+def test_jobs_are_only_shown_to_the_user_who_uploaded_them(store, user, monkeypatch):
+    monkeypatch.setattr(backend, "job_queue", JobQueue(store))
+    job_id = store.create("detect-food", str(user.id), b"photo", {}, owner=1)
+    other = User(username="alex", name="Alex", password="x").save()
+    client = backend.app.test_client()
+
+    assert client.get(f"/jobs/{job_id}?user_id={user.id}").json["status"] == "queued"
+    assert client.get(f"/jobs/{job_id}?user_id={other.id}").status_code == 404
+    assert client.get(f"/jobs/{job_id}").status_code == 400
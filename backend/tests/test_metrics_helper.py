@@ -0,0 +1,26 @@
+from metrics_helper import server_timing
+
+
+def test_spans_with_one_name_are_combined():
+    spans = [("stage.vision", 0.2), ("foodkeeper.match", 0.001), ("foodkeeper.match", 0.002),
+             ("stage.save", 0.01)]
+
+    assert server_timing(spans) == ('stage_vision;dur=200.0, foodkeeper_match;dur=3.0;desc="x2", '
+                                    'stage_save;dur=10.0')
+
+
+def test_header_is_capped_keeping_the_longest_entries():
+    spans = [(f"step{i}", i / 1000) for i in range(1, 301)] + [("stage.db", 5.0)]
+
+    header = server_timing(spans, max_length=120)
+
+    assert len(header) <= 120
+    entries = header.split(", ")
+    assert entries[-1] == "stage_db;dur=5000.0"
+    assert entries[:-1] == sorted(entries[:-1], key=lambda e: int(e.split(";")[0][4:]))
+    assert "step300;dur=300.0" in entries
+
+
+def test_a_large_request_fits_the_default_cap():
+    spans = [("foodkeeper.match", 0.0001)] * 300 + [(f"stage.{i}", 0.1) for i in range(300)]
+    assert len(server_timing(spans)) <= 1024
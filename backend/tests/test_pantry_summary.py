@@ -0,0 +1,72 @@
+import uuid
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import app as backend
+import pantry_summary
+from expiry_engine import expiry_summary
+from models import Food, PantrySummary
+
+
+@pytest.fixture
+def client():
+    return backend.app.test_client()
+
+
+@pytest.fixture
+def user_id(client):
+    return client.post("/add-user", json={"username": "sam", "name": "Sam", "password": "x"}).json["id"]
+
+
+def insert_raw_food(user_id, n):
+    start = datetime.combine(date.today(), datetime.min.time())
+    Food._get_collection().insert_many([
+        {"user": uuid.UUID(user_id), "name": "milk", "quantity": "medium", "expiration_date": start + timedelta(days=i)}
+        for i in range(n)
+    ])
+
+
+def test_food_written_before_the_summary_existed_is_counted(client, user_id):
+    insert_raw_food(user_id, 50)
+    client.post("/add-foods", json={"_id": user_id, "foods": [{"name": "eggs", "quantity": "small"}]})
+
+    summary = client.get(f"/pantry-summary/{user_id}").json["summary"]
+
+    assert summary["total"] == 51
+    assert summary == expiry_summary(uuid.UUID(user_id))
+
+
+def test_writes_after_seeding_are_counted_once(client, user_id):
+    insert_raw_food(user_id, 5)
+    client.get(f"/pantry-summary/{user_id}")
+    food_id = client.post("/add-food", json={"_id": user_id, "name": "eggs", "quantity": "small"}).json["food_id"]
+    client.delete(f"/food/{food_id}?user_id={user_id}")
+    client.post("/add-foods", json={"_id": user_id, "foods": [{"name": "bread"}, {"name": "ham"}]})
+
+    assert client.get(f"/pantry-summary/{user_id}").json["summary"] == expiry_summary(uuid.UUID(user_id))
+
+
+def test_summaries_created_by_earlier_writes_are_reseeded(client, user_id):
+    insert_raw_food(user_id, 10)
+    # as left by the old upserting writes: one item counted, not marked seeded
+    PantrySummary._get_collection().insert_one({"_id": uuid.UUID(user_id), "total": 1, "version": 1})
+
+    assert client.get(f"/pantry-summary/{user_id}").json["summary"]["total"] == 10
+
+
+def test_a_write_during_the_seed_scan_makes_it_rescan(client, user_id, monkeypatch):
+    insert_raw_food(user_id, 3)
+    scan, scans = pantry_summary._scan, []
+
+    def scan_with_a_concurrent_write(query):
+        scans.append(query)
+        result = scan(query)
+        if len(scans) == 1:
+            client.post("/add-food", json={"_id": user_id, "name": "eggs", "quantity": "small"})
+        return result
+
+    monkeypatch.setattr(pantry_summary, "_scan", scan_with_a_concurrent_write)
+    assert pantry_summary.get_summary(uuid.UUID(user_id))["total"] == 4
+    assert len(scans) == 2
+    assert PantrySummary._get_collection().find_one({"_id": uuid.UUID(user_id)})["total"] == 4
@@ -0,0 +1,61 @@
+import time
+
+import pytest
+
+import pipeline
+from pipeline import StageTimeout, map_stage, run_stage
+
+
+@pytest.fixture(autouse=True)
+def short_vision_timeout(monkeypatch):
+    monkeypatch.setitem(pipeline.STAGE_TIMEOUTS, "vision", 0.05)
+
+
+def test_a_slow_stage_times_out():
+    with pytest.raises(StageTimeout) as raised:
+        run_stage("vision", time.sleep, 0.5)
+    assert raised.value.stage == "vision"
+
+
+def test_a_stage_returns_its_result():
+    assert run_stage("vision", sum, [1, 2, 3]) == 6
+
+
+def test_writes_are_never_cut_off():
+    written = []
+
+    def slow_write():
+        time.sleep(0.2)
+        written.append("row")
+        return len(written)
+
+    assert run_stage("save", slow_write) == 1
+    assert written == ["row"]
+
+
+def test_map_stage_keeps_order_and_reports_failures_per_item():
+    def call(delay):
+        if delay < 0:
+            raise ValueError("bad photo")
+        time.sleep(delay)
+        return delay
+
+    results = map_stage("vision", call, [0.02, 0.5, -1, 0], limit=2)
+
+    assert results[0] == 0.02 and results[3] == 0
+    assert isinstance(results[1], StageTimeout)
+    assert isinstance(results[2], ValueError)
+
+
+def test_map_stage_runs_at_most_limit_calls_at_once():
+    running, peak = [], []
+
+    def call(item):
+        running.append(item)
+        peak.append(len(running))
+        time.sleep(0.01)
+        running.remove(item)
+        return item
+
+    assert map_stage("vision", call, list(range(8)), limit=3) == list(range(8))
+    assert max(peak) <= 3
@@ -0,0 +1,78 @@
+import os
+import shutil
+import stat
+import sys
+
+import pytest
+import pytesseract
+from PIL import Image, ImageDraw
+
+import receipt_ocr
+from bench_receipt_ocr import FIXTURES, line_accuracy, load_fixture
+from pipeline import OCR_WORKERS
+
+# Called as: tesseract <image> <output base> [options...] txt; "reads" the
+# band's height and the OpenMP thread limit it was started with
+FAKE_TESSERACT = """#!{python}
+import os, sys
+from PIL import Image
+with open(sys.argv[2] + ".txt", "w") as out:
+    out.write(f"{{Image.open(sys.argv[1]).height}} {{os.environ.get('OMP_THREAD_LIMIT')}}\\n")
+"""
+
+
+@pytest.fixture
+def tesseract(tmp_path, monkeypatch):
+    path = tmp_path / "tesseract"
+    path.write_text(FAKE_TESSERACT.format(python=sys.executable))
+    path.chmod(path.stat().st_mode | stat.S_IXUSR)
+    monkeypatch.setattr(pytesseract.pytesseract, "tesseract_cmd", str(path))
+    monkeypatch.delenv("OMP_THREAD_LIMIT", raising=False)
+    return path
+
+
+def tall_receipt(lines=60):
+    img = Image.new("L", (600, 40 * lines), 255)
+    draw = ImageDraw.Draw(img)
+    for i in range(lines):
+        draw.text((20, 40 * i + 10), f"ITEM {i}  $1.{i:02d}", fill=0, font_size=24)
+    return img.convert("RGB")
+
+
+def test_band_workers_share_the_cores_across_ocr_processes():
+    assert receipt_ocr.OCR_BAND_WORKERS * OCR_WORKERS <= max(os.cpu_count() or 2, OCR_WORKERS)
+
+
+def test_bands_run_single_threaded_without_touching_this_process(tesseract):
+    text = receipt_ocr.ocr_bands(tall_receipt(), workers=3)
+
+    lines = text.splitlines()
+    assert len(lines) == 3
+    assert all(line.endswith(" 1") for line in lines)
+    assert "OMP_THREAD_LIMIT" not in os.environ
+
+
+def test_bands_see_the_environment_at_call_time(tesseract, monkeypatch):
+    monkeypatch.setenv("OMP_THREAD_LIMIT", "8")
+    tesseract.write_text(FAKE_TESSERACT.replace("OMP_THREAD_LIMIT", "TESSDATA_PREFIX").format(python=sys.executable))
+    monkeypatch.setenv("TESSDATA_PREFIX", "/set/after/import")
+
+    assert receipt_ocr.ocr_bands(tall_receipt(), workers=1).split() == ["2400", "/set/after/import"]
+    assert os.environ["OMP_THREAD_LIMIT"] == "8"
+
+
+def test_band_failures_raise_tesseract_errors(tesseract):
+    tesseract.write_text("#!/bin/sh\necho 'bad image' >&2\nexit 1\n")
+    with pytest.raises(pytesseract.TesseractError, match="bad image"):
+        receipt_ocr.ocr_bands(tall_receipt(), workers=1)
+
+
+@pytest.mark.skipif(not shutil.which("tesseract"), reason="needs the tesseract binary")
+@pytest.mark.parametrize("name", FIXTURES)
+def test_bands_read_fixture_receipts_as_well_as_a_single_pass(name):
+    img, expected = load_fixture(name)
+    single = line_accuracy(expected, receipt_ocr.ocr_single(img))
+    bands = line_accuracy(expected, receipt_ocr.ocr_bands(img))
+
+    assert bands >= 0.95
+    assert bands >= single - 0.02
@@ -0,0 +1,112 @@
+import pytest
+
+import receipt_parser
+from stub_servers import StubServer, usda_respond
+
+
+@pytest.fixture
+def usda(monkeypatch, tmp_path):
+    """validate_foods against a local FoodData Central stub, from an empty cache"""
+    with StubServer(usda_respond) as stub:
+        monkeypatch.setattr(receipt_parser, "usda_api_key", "test")
+        monkeypatch.setattr(receipt_parser, "USDA_SEARCH_URL", stub.url + "/fdc/v1/foods/search")
+        monkeypatch.setattr(receipt_parser, "_cache",
+                            receipt_parser.FoodValidationCache(str(tmp_path / "usda.sqlite3")))
+        yield stub
+
+
+def test_validate_foods_asks_usda_once_per_name(usda):
+    results = receipt_parser.validate_foods(["Milk", " milk ", "Eggs", "Plastic bag"])
+
+    assert results == {"milk": True, "eggs": True, "plastic bag": False}
+    assert usda.calls == 3
+
+
+def test_validate_foods_answers_repeats_from_the_cache(usda):
+    receipt_parser.validate_foods(["milk", "plastic bag"])
+    results = receipt_parser.validate_foods(["milk", "plastic bag", "bread"])
+
+    assert results == {"milk": True, "plastic bag": False, "bread": True}
+    assert usda.calls == 3
+
+
+def test_failed_lookups_count_as_food_and_are_not_cached(usda, monkeypatch):
+    monkeypatch.setattr(receipt_parser, "USDA_SEARCH_URL", "http://127.0.0.1:9/unreachable")
+    assert receipt_parser.validate_foods(["gift card"]) == {"gift card": True}
+    assert receipt_parser._get_cache().get_many(["gift card"]) == {}
+
+
+def test_without_an_api_key_everything_is_food(monkeypatch):
+    monkeypatch.setattr(receipt_parser, "usda_api_key", None)
+    assert receipt_parser.validate_foods(["milk", "receipt"]) == {"milk": True, "receipt": True}
+
+
+RECEIPT = """
+FRESH MART #112
+10/14/2025 5:42 PM
+ORG BANANAS 3LB  $1.99
+LARGE EGGS 12CT  $4.29
+SUBTOTAL $6.28
+TAX $0.50
+TOTAL $6.78
+CASH $10.00
+CHANGE $3.22
+"""
+
+
+def test_classify_lines_tags_every_non_blank_line():
+    kinds = [(line.kind, line.text) for line in receipt_parser.classify_lines(RECEIPT)]
+
+    assert kinds == [
+        ("header", "FRESH MART #112"),
+        ("date", "10/14/2025 5:42 PM"),
+        ("item", "ORG BANANAS 3LB  $1.99"),
+        ("item", "LARGE EGGS 12CT  $4.29"),
+        ("total", "SUBTOTAL $6.28"),
+        ("tax", "TAX $0.50"),
+        ("total", "TOTAL $6.78"),
+        ("total", "CASH $10.00"),
+        ("total", "CHANGE $3.22"),
+    ]
+
+
+@pytest.mark.parametrize("text, kind, fields", [
+    ("2025-10-14 17:42", "date", {"date": "2025-10-14"}),
+    ("Loyalty savings $1.00", "total", {}),
+    ("Sales Tax 8%", "tax", {}),
+    ("$4.29", None, None),      # a price alone leaves no name: not an item
+])
+def test_classify_lines_after_the_header(text, kind, fields):
+    lines = list(receipt_parser.classify_lines(f"STORE\n{text}"))[1:]
+    assert [(line.kind, line.fields) for line in lines] == ([(kind, fields)] if kind else [])
+
+
+@pytest.mark.parametrize("header, date", [
+    ("FRESH MART 10/14/2025", "10/14/2025"),
+    ("GREEN GROCER 2025-10-14", "2025-10-14"),
+    ("FRESH MART #112", None),
+])
+def test_a_date_printed_on_the_header_line_is_picked_up(header, date, monkeypatch):
+    monkeypatch.setattr(receipt_parser, "usda_api_key", None)
+    header_line = next(receipt_parser.classify_lines(header + "\nMILK $3.49"))
+    assert header_line.kind == "header"
+
+    parsed = receipt_parser.parse_receipt_text(header + "\nMILK $3.49\n01/01/2020")
+    assert parsed["store"] == header
+    assert parsed["date"] == (date or "01/01/2020")
+
+
+@pytest.mark.parametrize("line, fields", [
+    ("milk $3.49", {"name": "milk", "quantity": "1", "unit": None}),
+    ("ORG BANANAS 3LB $1.99", {"name": "org bananas", "quantity": "3", "unit": "lb"}),
+    ("ground beef 2lbs $7.98", {"name": "ground beef", "quantity": "2", "unit": "lb"}),
+    ("greek yogurt 32 oz", {"name": "greek yogurt", "quantity": "32", "unit": "oz"}),
+    ("cheddar 3oz", {"name": "cheddar", "quantity": "3", "unit": "oz"}),
+    ("olive oil 500ml 5.99", {"name": "olive oil", "quantity": "500", "unit": "ml"}),
+    ("large eggs 12ct $4.29", {"name": "large eggs ct", "quantity": "12", "unit": None}),
+    ("2 large avocados", {"name": "large avocados", "quantity": "2", "unit": None}),
+    ("limes x4", {"name": "limes", "quantity": "4", "unit": None}),
+    ("$4.29", None),
+])
+def test_parse_item_line(line, fields):
+    assert receipt_parser.parse_item_line(line) == fields
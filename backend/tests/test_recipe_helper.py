@@ -0,0 +1,73 @@
+import threading
+import time
+
+import pytest
+
+import recipe_helper
+from cache_helper import SingleFlight, TTLCache
+from stub_servers import StubServer, spoonacular_respond
+
+THREADS = 16
+
+
+@pytest.fixture
+def spoonacular(monkeypatch):
+    """get_recipes against a slow local findByIngredients stub, from an empty cache"""
+    with StubServer(spoonacular_respond, latency=0.2) as stub:
+        monkeypatch.setattr(recipe_helper, "spoonacular_api_key", "test")
+        monkeypatch.setattr(recipe_helper, "SPOONACULAR_URL", stub.url + "/recipes/findByIngredients")
+        monkeypatch.setattr(recipe_helper, "RECIPE_CACHE", TTLCache(maxsize=16, ttl=60))
+        monkeypatch.setattr(recipe_helper, "_inflight", SingleFlight())
+        yield stub
+
+
+def concurrently(call, args):
+    results = [None] * len(args)
+    start = threading.Barrier(len(args))
+
+    def run(i):
+        start.wait()
+        results[i] = call(args[i])
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(args))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_concurrent_lookups_of_one_ingredient_set_hit_upstream_once(spoonacular):
+    spellings = [["milk", "Eggs"], ["EGGS", " milk "], ["eggs", "milk", "milk"]]
+    results = concurrently(recipe_helper.get_recipes, [spellings[i % 3] for i in range(THREADS)])
+
+    assert spoonacular.calls == 1
+    assert all(result == results[0] for result in results)
+    assert [recipe["title"] for recipe in results[0]] == ["eggs dish 0", "eggs dish 1", "eggs dish 2"]
+
+
+def test_repeats_are_answered_from_the_cache_until_the_ttl_runs_out(spoonacular, monkeypatch):
+    monkeypatch.setattr(recipe_helper, "RECIPE_CACHE", TTLCache(maxsize=16, ttl=0.3))
+    recipe_helper.get_recipes(["milk", "eggs"])
+    recipe_helper.get_recipes(["eggs", "milk"])
+    assert spoonacular.calls == 1
+
+    time.sleep(0.35)
+    recipe_helper.get_recipes(["milk", "eggs"])
+    assert spoonacular.calls == 2
+
+
+def test_use_cache_false_asks_upstream_every_time_but_still_coalesces(spoonacular):
+    recipe_helper.get_recipes(["milk", "eggs"])
+    recipe_helper.get_recipes(["milk", "eggs"], use_cache=False)
+    recipe_helper.get_recipes(["milk", "eggs"], use_cache=False)
+    assert spoonacular.calls == 3
+
+    concurrently(lambda names: recipe_helper.get_recipes(names, use_cache=False), [["milk", "eggs"]] * THREADS)
+    assert spoonacular.calls == 4
+
+
+def test_failed_lookups_return_nothing_and_are_not_cached(spoonacular, monkeypatch):
+    monkeypatch.setattr(recipe_helper, "SPOONACULAR_URL", "http://127.0.0.1:9/unreachable")
+    assert recipe_helper.get_recipes(["milk"]) == []
+    assert recipe_helper.RECIPE_CACHE.stats()["size"] == 0
@@ -0,0 +1,81 @@
+from datetime import date, timedelta
+
+import pytest
+
+from recipe_helper import scale_recipe
+from recipe_ranking import MAX_SCALE, MIN_SCALE, PantryIndex, rank_recipes
+
+TODAY = date(2026, 6, 1)
+
+
+def in_days(days):
+    return TODAY + timedelta(days=days)
+
+
+def recipe(title, used, missed=()):
+    return {"title": title,
+            "usedIngredients": [{"name": name, "amount": amount, "unit": unit} for name, amount, unit in used],
+            "missedIngredients": [{"name": name, "amount": amount, "unit": unit} for name, amount, unit in missed]}
+
+
+def test_scale_recipe_lists_null_amounts_by_name_and_unit():
+    recipe = {"usedIngredients": [{"name": "milk", "amount": 2, "unit": "cups"},
+                                  {"name": "eggs", "amount": None, "unit": None}],
+              "missedIngredients": [{"name": "salt"}, {"name": "pepper", "amount": None, "unit": "pinch"}]}
+    fridge = [{"name": "milk", "quantity": "1 cup", "expiration": date.today() + timedelta(days=1)},
+              {"name": "eggs", "quantity": "6", "expiration": date.today() + timedelta(days=2)}]
+
+    lines = scale_recipe(recipe, fridge)
+
+    assert lines == ["milk: 1.00 cups", "eggs", "salt", "pepper: pinch"]
+
+
+def test_recipes_using_the_soonest_expiring_items_rank_first():
+    pantry = PantryIndex([{"name": "spinach", "quantity": "200g", "expiration": in_days(0)},
+                          {"name": "cheddar cheese", "quantity": "100g", "expiration": in_days(1)},
+                          {"name": "rice", "quantity": "1kg", "expiration": in_days(300)}], today=TODAY)
+    recipes = [recipe("rice bowl", [("rice", 100, "g")]),
+               recipe("cheese toast", [("shredded cheddar cheese", 50, "g")], [("bread", 2, "slices")]),
+               recipe("spinach omelette", [("baby spinach", 50, "g")], [("eggs", 2, "")]),
+               recipe("eggplant stew", [], [("eggplant", 1, ""), ("tomatoes", 2, "")])]
+
+    ranked = rank_recipes(recipes, pantry, k=4)
+
+    assert [r["recipe"]["title"] for r in ranked] == ["spinach omelette", "cheese toast", "rice bowl", "eggplant stew"]
+    assert ranked[1]["expiring_used"] == ["cheddar cheese"]
+    assert ranked[-1]["expiring_used"] == [] and ranked[-1]["score"] < 0
+
+
+def test_ties_keep_spoonacular_order_and_k_limits_the_results():
+    pantry = [{"name": "milk", "quantity": "1 l", "expiration": in_days(2)}]
+    recipes = [recipe(f"latte {i}", [("milk", 200, "ml")]) for i in range(5)]
+
+    ranked = rank_recipes(recipes, PantryIndex(pantry, today=TODAY), k=3)
+
+    assert [r["recipe"]["title"] for r in ranked] == ["latte 0", "latte 1", "latte 2"]
+
+
+@pytest.mark.parametrize("have, need, scale", [
+    ("100 g", (200, "g"), 0.5),
+    ("10 g", (1, "kg"), MIN_SCALE),
+    ("5 kg", (100, "g"), MAX_SCALE),
+    ("2 cups", (1, "cup"), 2.0),
+    ("6", (2, "large"), 3.0),
+    ("500 ml", (100, "g"), 1.0),        # different dimensions: left unscaled
+])
+def test_scale_follows_the_scarcest_ingredient_within_bounds(have, need, scale):
+    pantry = PantryIndex([{"name": "flour", "quantity": have, "expiration": in_days(1)}], today=TODAY)
+
+    [ranked] = rank_recipes([recipe("bread", [("flour", *need)])], pantry, k=1)
+
+    assert ranked["scale"] == scale
+
+
+def test_missed_ingredients_are_listed_and_scaled_too():
+    pantry = PantryIndex([{"name": "milk", "quantity": "500 ml", "expiration": in_days(1)}], today=TODAY)
+
+    [ranked] = rank_recipes([recipe("pancakes", [("milk", 250, "ml")], [("flour", 100, "g"), ("eggs", 2, "")])],
+                            pantry, k=1)
+
+    assert ranked["scale"] == 2.0
+    assert ranked["ingredients"] == ["milk: 500.00 ml", "flour: 200.00 g", "eggs: 4.00"]
@@ -0,0 +1,13 @@
+from text_helper import normalize_name, singular
+
+
+def test_noise_words_are_removed_as_whole_words_only():
+    assert normalize_name("Fresh Organic Spinach (bag)") == "spinach"
+    assert normalize_name("Cabbage") == "cabbage"
+    assert normalize_name("Freshly sliced ham") == "freshly ham"
+    assert normalize_name("Backpack snacks") == "backpack snacks"
+
+
+def test_singular():
+    assert [singular(w) for w in ("berries", "tomatoes", "peaches", "eggs", "glass", "bus")] == \
+        ["berry", "tomato", "peach", "egg", "glass", "bus"]
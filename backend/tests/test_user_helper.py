@@ -0,0 +1,83 @@
+from collections import Counter
+
+import pytest
+
+import app as backend
+import user_helper
+from fakes import count_mongo_operations
+from models import User
+from user_helper import get_user
+
+
+@pytest.fixture(scope="module")
+def operations():
+    return count_mongo_operations()
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(user_helper, "USER_CACHE_ENABLED", True)
+    user_helper.USER_CACHE.clear()
+
+
+def queries(operations, fn):
+    before = Counter(operations)
+    fn()
+    return sum(operations.values()) - sum(before.values())
+
+
+def make_user():
+    return User(username="sam", name="Sam", password="x").save()
+
+
+def test_a_repeated_lookup_costs_no_queries(operations):
+    user = make_user()
+
+    assert queries(operations, lambda: get_user(user.id)) == 1
+    assert queries(operations, lambda: get_user(user.id)) == 0
+    assert get_user(user.id).name == "Sam"
+
+
+def test_unknown_users_are_not_cached(operations):
+    user = make_user()
+    user.delete()
+
+    assert get_user(user.id) is None
+    assert queries(operations, lambda: get_user(user.id)) == 1
+
+
+def test_saving_the_user_drops_the_cached_copy(operations):
+    user = make_user()
+    get_user(user.id)
+
+    User.objects.get(id=user.id).update(name="Stale")  # queryset updates bypass the signals
+    assert get_user(user.id).name == "Sam"
+
+    renamed = User.objects.get(id=user.id)
+    renamed.name = "Renamed"
+    renamed.save()
+    assert queries(operations, lambda: get_user(user.id)) == 1
+    assert get_user(user.id).name == "Renamed"
+
+
+def test_deleting_the_user_drops_the_cached_copy():
+    user = make_user()
+    get_user(user.id)
+
+    user.delete()
+    assert get_user(user.id) is None
+
+
+def test_requests_after_the_first_skip_the_users_query(operations, monkeypatch):
+    client = backend.app.test_client()
+    user_id = client.post("/add-user", json={"username": "sam", "name": "Sam", "password": "x"}).json["id"]
+
+    def users_queries():
+        before = operations["users.find"]
+        assert client.get(f"/get-food/{user_id}").status_code == 200
+        return operations["users.find"] - before
+
+    monkeypatch.setattr(user_helper, "USER_CACHE_ENABLED", False)
+    assert [users_queries() for _ in range(3)] == [1, 1, 1]
+    monkeypatch.setattr(user_helper, "USER_CACHE_ENABLED", True)
+    assert [users_queries() for _ in range(3)] == [1, 0, 0]
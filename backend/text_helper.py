@@ -0,0 +1,25 @@
+# text_helper.py
+# Food-name normalization shared by the FoodKeeper lookup (expiration_helper),
+# item merging (food_helper), fuzzy matching and recipe ranking.
+
+# Words that describe how food is sold, not what it is. Removed as whole
+# words only, so "cabbage" keeps its "bag" and "freshly" stays as it is.
+NOISE_WORDS = frozenset(["fresh", "organic", "bag", "pack", "slice", "sliced"])
+
+
+# Normalize text: lowercase, letters/digits only, noise words dropped, words
+# separated by single spaces. Punctuation separates words like a space does,
+# so "bnls.chkn-brst" keeps its three words.
+def normalize_name(name_raw: str) -> str:
+    name = "".join(c if c.isalnum() else " " for c in name_raw.lower())
+    return " ".join(word for word in name.split() if word not in NOISE_WORDS)
+
+
+def singular(word):
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 4 and word.endswith(("oes", "ches", "shes", "sses", "xes")):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
@@ -0,0 +1,48 @@
+# user_helper.py
+# Resolving the user every route and job is given, without a users query per
+# request. Found User documents are kept in a small LRU with a short TTL, keyed
+# by UUID. Saving or deleting a User (document.save()/delete(), which fire
+# mongoengine signals) drops its entry in this process; other processes see
+# the change once their entry expires, after at most USER_CACHE_TTL seconds.
+# Queryset-level User updates bypass the signals and rely on the TTL too.
+# Cached documents are shared between requests: read them, don't modify them.
+import os
+
+from mongoengine import signals
+
+from cache_helper import TTLCache
+from metrics_helper import inc
+from models import User
+
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "1024"))
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", "30"))       # seconds
+USER_CACHE_ENABLED = os.getenv("USER_CACHE", "on") != "off"
+
+USER_CACHE = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+
+def get_user(user_uuid):
+    """The User with this UUID, or None; served from USER_CACHE when possible"""
+    if USER_CACHE_ENABLED:
+        user = USER_CACHE.get(user_uuid)
+        if user is not None:
+            inc("users.cache", result="hit")
+            return user
+        inc("users.cache", result="miss")
+    user = User.objects(id=user_uuid).first()
+    if user is not None and USER_CACHE_ENABLED:
+        USER_CACHE.set(user_uuid, user)
+    return user
+
+
+def invalidate_user(user_uuid):
+    USER_CACHE.delete(user_uuid)
+
+
+def _on_user_write(sender, document, **kwargs):
+    if document.pk is not None:
+        invalidate_user(document.pk)
+
+
+signals.post_save.connect(_on_user_write, sender=User)
+signals.post_delete.connect(_on_user_write, sender=User)